@@ -3,8 +3,24 @@ import pandas as pd
 import numpy as np
 import altair as alt
 import time
-import requests
-import re
+import os
+
+from lotto539 import indexes
+from lotto539.combos import (
+    build_combinations, build_combo_features, build_combo_history, calc_rule_points, rank_combinations
+)
+from lotto539.csvstore import CSV_FILE
+from lotto539.ktuples import KTupleCounter, top_ktuples
+from lotto539.memo import MemoCache
+from lotto539.montecarlo import evaluate_strategies, exact_star_probs
+from lotto539.profiling import Profiler, activate, append_profile_log
+from lotto539.indexes import (
+    calc_heatmap_bins, calc_heatmap_cells, calc_skips, query_subset, ranges_window_counts, select_row_ranges
+)
+from lotto539.scoring import BACKTEST_STRATEGIES, backtest_hits, recommend_numbers
+from lotto539.scheduler import UpdateScheduler
+from lotto539.shared import DatasetRegistry
+from lotto539.sweep import build_sweep_tasks, iter_param_sweep, rank_sweep_results
 
 # ==========================================
 # 1. 頁面基礎設定與 CSS 美化
@@ -170,259 +186,160 @@ st.markdown("<h1>539 頂級數據分析室</h1>", unsafe_allow_html=True)
 # ==========================================
 # 2. 資料處理與爬蟲核心
 # ==========================================
-CSV_FILE = '539_data.csv'
+# 計算核心都在 lotto539 套件 (不依賴 Streamlit，CLI 與背景程序共用)，這裡只包上快取與錯誤顯示
+# 分析結果以 (資料版本, 篩選範圍, 參數) 記憶化，整個 process 共用；調整無關的控制項不會重算
+@st.cache_resource
+def get_memo_cache():
+    # 筆數與總大小都有上限；組合規則這類每組參數各有一份大陣列的分析，合計超過 256 MB 就淘汰最久沒用的結果
+    return MemoCache(maxsize=256, max_bytes=256 * 2**20)
+
+memo_cache = get_memo_cache()
+
+# 開獎資料與開出矩陣、位元索引、累積次數等衍生索引每個資料版本只建一次，所有連線唯讀共用
+# 每次重跑借用目前的版本，資料更新時整份切換；舊版本等所有連線都換到新版本後才釋放，並丟掉它的分析結果
+@st.cache_resource
+def get_dataset_registry():
+    return DatasetRegistry(CSV_FILE, on_retire=memo_cache.drop_version)
+
+dataset_registry = get_dataset_registry()
+
+# 效能診斷 (側邊欄最下方開啟)：記錄這次重跑各區段的耗時、掃過期數、記憶體配置與快取命中
+PROFILE_LOG = f"{CSV_FILE}.profile.jsonl"
+profiler = Profiler(
+    st.session_state.get('profiling_enabled', False) or os.environ.get('LOTTO539_PROFILE') == '1',
+    cache_stats=memo_cache.stats,
+)
+activate(profiler)
+
+# 記憶化呼叫：key 為這個分析的篩選範圍與參數 (需可雜湊)，資料版本自動帶入
+def memoized(name, key, func, *args):
+    return memo_cache.get_or_compute(name, current_version, key, lambda: func(*args))
 
-@st.cache_data
+# 借用目前版本的資料集：先借到新的再歸還這個連線上一次重跑借的，連線只保留一份借用
 def load_and_process_data():
     try:
-        # 讀取 CSV，確保所有欄位先以字串讀取避免格式跑掉
-        df = pd.read_csv(CSV_FILE, encoding='utf-8', dtype=str)
-        
-        # 欄位對應清洗
-        cols_map = {
-            '年份': 'Year', '日期': 'Date', '期數': 'Draw_Num',
-            '球號 1': 'N1', '球號 1': 'N1',
-            '球號 2': 'N2', '球號 2': 'N2',
-            '球號 3': 'N3', '球號 3': 'N3',
-            '球號 4': 'N4', '球號 4': 'N4',
-            '球號 5': 'N5', '球號 5': 'N5',
-            '總期數': 'Total_ID'
-        }
-        
-        clean_cols = {}
-        for c in df.columns:
-            clean_c = c.strip()
-            if clean_c in cols_map:
-                clean_cols[c] = cols_map[clean_c]
-        
-        df = df.rename(columns=clean_cols)
-        
-        # 確保必要欄位存在，轉換數字
-        num_cols = ['N1', 'N2', 'N3', 'N4', 'N5']
-        for col in num_cols:
-            df[col] = pd.to_numeric(df[col], errors='coerce')
-        
-        # 清除無效行
-        df = df.dropna(subset=num_cols)
-        df = df.reset_index(drop=True)
-        
-        # 特徵工程
-        df['Sum'] = df[num_cols].sum(axis=1)
-        df['Big_Count'] = df[num_cols].apply(lambda x: sum(n >= 20 for n in x), axis=1)
-        df['Odd_Count'] = df[num_cols].apply(lambda x: sum(n % 2 != 0 for n in x), axis=1)
-        
-        def check_consecutive(row):
-            nums = sorted(row.values)
-            diffs = np.diff(nums)
-            return 1 if np.any(diffs == 1) else 0
-        df['Has_Consecutive'] = df[num_cols].apply(check_consecutive, axis=1)
-
-        return df, num_cols
+        lease = dataset_registry.acquire()
     except Exception as e:
         st.error(f"讀取資料錯誤: {e}")
-        return pd.DataFrame(), []
-
-# 強健版爬蟲更新函數
-def update_data_from_web():
-    url = "https://www.pilio.idv.tw/lto539/list539APP.asp"
-    
-    try:
-        # 1. 讀取現有 CSV (確保格式一致)
-        std_columns = ['總期數', '年份', '日期', '期數', '球號 1', '球號 2', '球號 3', '球號 4', '球號 5', '出牌次數', '數字', '次數高至低']
-        try:
-            current_csv = pd.read_csv(CSV_FILE, dtype=str)
-            current_csv.columns = [c.strip() for c in current_csv.columns]
-            
-            # 補齊缺失欄位
-            for col in std_columns:
-                if col not in current_csv.columns:
-                    current_csv[col] = ""
-            current_csv = current_csv[std_columns] # 排序
-            
-            # 取得最後日期
-            if not current_csv.empty:
-                # 排除空行
-                valid_csv = current_csv.dropna(subset=['年份', '日期'])
-                if not valid_csv.empty:
-                    last_row = valid_csv.iloc[-1]
-                    d_str = str(last_row['日期']).replace('月', '/').replace('日', '')
-                    last_date_str = f"{last_row['年份']}/{d_str}"
-                    last_record_date = pd.to_datetime(last_date_str)
-                    
-                    try:
-                        last_total_id = int(last_row['總期數'])
-                    except:
-                        last_total_id = len(current_csv)
-                    try:
-                        last_draw_id = int(last_row['期數'])
-                    except:
-                        last_draw_id = 0
-                else:
-                    raise ValueError("Empty Data")
-            else:
-                raise ValueError("Empty CSV")
-                
-        except:
-            # 如果讀取失敗或為空，設初始值
-            last_record_date = pd.to_datetime("2000/01/01")
-            last_total_id = 0
-            last_draw_id = 0
-            current_csv = pd.DataFrame(columns=std_columns)
-
-        # 2. 抓取網頁資料
-        headers = {"User-Agent": "Mozilla/5.0"}
-        response = requests.get(url, headers=headers)
-        response.encoding = 'big5'
-        
-        # 強制無表頭讀取
-        dfs = pd.read_html(response.text, header=None)
-        target_df = None
-        for df in dfs:
-            if df.shape[1] == 2: # 找兩欄的表格
-                sample = df.head(3).to_string()
-                if "/" in sample and "," in sample:
-                    target_df = df
-                    break
-        
-        if target_df is None:
-            return "❌ 抓不到網頁表格，請檢查網站結構"
-
-        # 3. 解析新資料
-        new_rows = []
-        for index, row in target_df.iterrows():
-            try:
-                date_raw = str(row[0]) # 第1欄 日期
-                nums_raw = str(row[1]) # 第2欄 號碼
-                
-                date_match = re.search(r'(\d{4})[/-](\d{1,2})[/-](\d{1,2})', date_raw)
-                if not date_match: continue
-                
-                current_date = pd.to_datetime(date_match.group(0))
-                
-                # 若網頁日期 <= CSV日期，跳過
-                if current_date <= last_record_date:
-                    continue
-                
-                # 解析號碼
-                nums = [n.strip() for n in nums_raw.replace('，', ',').split(',') if n.strip().isdigit()]
-                if len(nums) != 5: continue
-                
-                new_rows.append({
-                    'dt': current_date,
-                    '年份': str(current_date.year),
-                    '日期': f"{current_date.month}月{current_date.day}日",
-                    '球號 1': nums[0], '球號 2': nums[1], '球號 3': nums[2], '球號 4': nums[3], '球號 5': nums[4]
-                })
-            except:
-                continue
-        
-        if not new_rows:
-            return "✅ 資料已是最新"
-
-        # 4. 合併與存檔
-        new_rows.sort(key=lambda x: x['dt'])
-        
-        rows_to_add = []
-        for item in new_rows:
-            last_total_id += 1
-            last_draw_id += 1
-            
-            row_data = {
-                '總期數': str(last_total_id),
-                '年份': item['年份'],
-                '日期': item['日期'],
-                '期數': str(last_draw_id),
-                '球號 1': item['球號 1'],
-                '球號 2': item['球號 2'],
-                '球號 3': item['球號 3'],
-                '球號 4': item['球號 4'],
-                '球號 5': item['球號 5'],
-                '出牌次數': '', '數字': '', '次數高至低': ''
-            }
-            rows_to_add.append(row_data)
-            
-        df_new = pd.DataFrame(rows_to_add)
-        
-        # 確保順序
-        df_new = df_new[std_columns]
-        
-        # 合併
-        final_df = pd.concat([current_csv, df_new], ignore_index=True)
-        
-        # --- 新增防呆保護 ---
-        if len(final_df) < len(current_csv):
-            return f"⚠️ 更新失敗：新資料總數 ({len(final_df)}) 少於原資料 ({len(current_csv)})，系統拒絕存檔以保護歷史數據。"
-            
-        if len(final_df) < 1000:
-             return f"⚠️ 警告：資料庫似乎遺失，目前僅有 {len(final_df)} 筆資料。請重新匯入歷史大檔。"
-        # --------------------
-
-        # 存檔
-        final_df.to_csv(CSV_FILE, index=False, encoding='utf-8')
-        st.cache_data.clear()
-        
-        return f"🎉 成功更新 {len(rows_to_add)} 筆資料！(最新: {new_rows[-1]['年份']}/{new_rows[-1]['date_str']})"
-
-    except Exception as e:
-        return f"❌ 更新錯誤: {str(e)}"
+        return None
+    previous = st.session_state.get('dataset_lease')
+    st.session_state['dataset_lease'] = lease
+    if previous is not None:
+        previous.release()
+    return lease.dataset
+
+# 全組合陣列 (uint8) 與其固定特徵和資料無關，所有連線共用同一份
+@st.cache_resource
+def load_combinations():
+    combos = build_combinations()
+    return combos, build_combo_features(combos)
+
+# 全歷史的號碼組合計數由所有連線共用，資料附加新期數後只數新的部分
+@st.cache_resource
+def get_tuple_counter():
+    return KTupleCounter((2, 3, 4))
+
+# 棋盤熱力圖超過這麼多期就改為分段顯示
+HEATMAP_MAX_COLUMNS = 150
+
+# 輸出 Altair 圖表 (規格序列化並送到瀏覽器) 另外計時
+def render_chart(chart, label):
+    with profiler.section(f"圖表輸出：{label}"):
+        st.altair_chart(chart, use_container_width=True)
+
+# 線上更新改由整個 process 共用的背景排程負責 (週一到週六晚上自動抓)，成功寫入新資料後只丟掉舊版本的分析結果
+# 設定環境變數 LOTTO539_AUTO_UPDATE=0 可關閉自動排程，只在按下更新按鈕時抓
+@st.cache_resource
+def get_update_scheduler():
+    return UpdateScheduler(
+        CSV_FILE, on_update=dataset_registry.refresh,
+        auto=os.environ.get('LOTTO539_AUTO_UPDATE') != '0'
+    ).start()
+
+update_scheduler = get_update_scheduler()
 
 # ==========================================
 # 3. 主程式邏輯
 # ==========================================
 
 # 載入資料
-df, num_cols = load_and_process_data()
+profiler.begin("載入資料")
+dataset = load_and_process_data()
 
-if df.empty:
+if dataset is None or len(dataset) == 0:
     st.warning("請確認 '539_data.csv' 檔案是否存在。")
     st.stop()
 
 # 全域變數
-total_draws = len(df)
-last_draw = df.iloc[-1]
-last_nums = last_draw[num_cols].astype(int).tolist()
+current_version = dataset.version
+store = dataset.store
+total_draws = len(store)
+last_nums = store.balls[-1].tolist()
+hit_matrix = dataset.hits
+number_bitsets = dataset.bitsets
+cum_counts = dataset.cum
 
 # --- 側邊欄設計 ---
+profiler.begin("側邊欄", rows=total_draws)
 st.sidebar.markdown(f"<h3 style='text-align:center; color:#555;'>戰情控制台</h3>", unsafe_allow_html=True)
 
-# 更新按鈕
-if st.sidebar.button("🔄 線上更新最新開獎"):
-    with st.sidebar.status("連線中...", expanded=True) as status:
-        msg = update_data_from_web()
-        if "成功" in msg:
-            status.update(label="更新完成", state="complete", expanded=False)
-            st.sidebar.success(msg)
-            time.sleep(1)
-            st.rerun()
-        elif "已是最新" in msg:
-            status.update(label="無需更新", state="complete", expanded=False)
-            st.sidebar.info(msg)
-        else:
-            status.update(label="錯誤", state="error")
-            st.sidebar.error(msg)
+# 更新按鈕：只叫醒背景排程去抓，這次重跑不等網路；新資料寫入後各連線下次重跑就會讀到
+update_status = update_scheduler.status()
+if st.sidebar.button("🔄 線上更新最新開獎", disabled=update_status['busy']):
+    update_scheduler.trigger()
+    st.sidebar.info("已在背景更新，稍後重新整理頁面即可看到新資料")
+elif update_status['busy']:
+    st.sidebar.info("⏳ 背景更新中...")
+if update_status['last_message']:
+    st.sidebar.caption(f"{update_status['last_message']} ({update_status['last_checked']:%m/%d %H:%M} 檢查)")
+if update_status['next_poll'] is not None:
+    st.sidebar.caption(f"下次自動檢查：{update_status['next_poll']:%m/%d %H:%M}")
 
 # 最新開獎卡片
 last_nums_html = "".join([f"<span class='sidebar-ball'>{n}</span>" for n in last_nums])
 st.sidebar.markdown(f"""
 <div style="background-color: white; border-radius: 8px; padding: 15px; box-shadow: 0 2px 5px rgba(0,0,0,0.05); text-align: center; margin-bottom: 20px; border: 1px solid #eee;">
-    <div style="font-size: 11px; color: #999; margin-bottom: 5px;">LATEST DRAW ({last_draw['Date']})</div>
+    <div style="font-size: 11px; color: #999; margin-bottom: 5px;">LATEST DRAW ({store.date_label(-1)})</div>
     <div style="display: flex; justify-content: center; flex-wrap: wrap;">{last_nums_html}</div>
 </div>
 """, unsafe_allow_html=True)
 
-# 資料過濾
+# 資料過濾：年份與日期區間先轉成列範圍，只有一段時直接切片共用原本的陣列，不複製資料
+draw_dates, year_offsets = dataset.dates, dataset.year_offsets
 with st.sidebar.expander("📅 資料時光機 (篩選年份)", expanded=False):
-    all_years = sorted(df['Year'].unique().tolist(), reverse=True)
+    all_years = sorted(year_offsets, reverse=True)
     selected_years = st.multiselect("選擇年份 (留空則分析所有資料)：", all_years)
-    
-    if selected_years:
-        current_df = df[df['Year'].isin(selected_years)]
-        st.caption(f"已篩選 {len(current_df)} 筆資料")
+    date_range = st.date_input(
+        "指定日期區間 (可與年份同時使用)：", value=(), format="YYYY/MM/DD",
+        min_value=draw_dates[0].astype(object), max_value=draw_dates[-1].astype(object)
+    )
+    start_date, end_date = (tuple(date_range) + (None, None))[:2]
+
+    row_ranges = select_row_ranges(year_offsets, draw_dates, selected_years, start_date, end_date)
+    if not row_ranges:
+        st.warning("這個範圍沒有開獎資料，改為分析全歷史")
+        row_ranges = [(0, total_draws)]
+    if row_ranges != [(0, total_draws)]:
+        st.caption(f"已篩選 {sum(b - a for a, b in row_ranges)} 筆資料")
     else:
-        current_df = df
-        st.caption(f"分析全歷史 {len(df)} 期")
-
-current_total_draws = len(current_df)
+        st.caption(f"分析全歷史 {total_draws} 期")
+
+# 篩選結果依列範圍記憶化，相同篩選的連線共用同一份
+range_key = tuple(row_ranges)
+current_store, current_hits = memoized('rows', range_key, dataset.take, row_ranges)
+current_total_draws = len(current_store)
+
+# 近期統計期數：熱度、近 N 期次數都以這個區間計算
+recent_window = st.sidebar.slider("近期統計期數", 10, 200, 30, step=10)
+# 熱門門檻以近 30 期開出 5 次為基準，依區間長度等比例調整
+hot_threshold = max(1, round(5 * recent_window / 30))
+
+# 篩選範圍的開出矩陣、遺漏與近 N 期次數 (每次重跑只算一次，各區塊共用)
+# 近 N 期次數由全歷史的累積次數逐段相減取得，不必重新加總區間
+current_skips = memoized('skips', range_key, calc_skips, current_hits)
+current_recent_freq = memoized(
+    'recent_freq', (range_key, recent_window), ranges_window_counts, cum_counts, row_ranges, recent_window
+)
 
 # 號碼快搜
 st.sidebar.markdown("---")
@@ -430,15 +347,13 @@ st.sidebar.markdown("#### 🔍 號碼快搜")
 quick_search_num = st.sidebar.number_input("輸入號碼查看狀態", 1, 39, 1, label_visibility="collapsed")
 
 if current_total_draws > 0:
-    is_hit = current_df[num_cols].isin([quick_search_num]).any(axis=1)
-    if is_hit.sum() > 0:
+    if current_hits[:, quick_search_num].any():
         # 計算遺漏 (以篩選資料的最後一筆為準)
-        last_hit_pos = np.where(is_hit)[0][-1] 
-        draws_since = (len(current_df) - 1) - last_hit_pos
-        recent_freq = current_df.tail(30)[num_cols].isin([quick_search_num]).any(axis=1).sum()
-        
+        draws_since = int(current_skips[quick_search_num])
+        recent_freq = int(current_recent_freq[quick_search_num])
+
         status_html = ""
-        if recent_freq >= 5: status_html = "<span class='status-badge status-hot'>🔥 熱門</span>"
+        if recent_freq >= hot_threshold: status_html = "<span class='status-badge status-hot'>🔥 熱門</span>"
         elif draws_since > 15: status_html = "<span class='status-badge status-cold'>🧊 遺漏</span>"
         else: status_html = "<span class='status-badge status-normal'>一般</span>"
         
@@ -446,7 +361,7 @@ if current_total_draws > 0:
         <div style="font-size: 14px; margin-top: 5px;">
             狀態：{status_html}<br>
             目前遺漏：<b>{draws_since}</b> 期<br>
-            近30期開出：<b>{recent_freq}</b> 次
+            近{recent_window}期開出：<b>{recent_freq}</b> 次
         </div>
         """, unsafe_allow_html=True)
     else:
@@ -458,13 +373,13 @@ st.sidebar.markdown("#### ⭐ 我的關注")
 watchlist = st.sidebar.multiselect("釘選常追號碼", list(range(1, 40)), default=[1, 8])
 
 if watchlist and current_total_draws > 0:
-    st.sidebar.markdown("<div style='font-size:12px; color:#888; margin-bottom:5px;'>近 30 期出現次數</div>", unsafe_allow_html=True)
+    st.sidebar.markdown(f"<div style='font-size:12px; color:#888; margin-bottom:5px;'>近 {recent_window} 期出現次數</div>", unsafe_allow_html=True)
     for num in watchlist:
-        freq = current_df.tail(30)[num_cols].isin([num]).any(axis=1).sum()
-        st.sidebar.progress(min(freq / 10, 1.0), text=f"{num} 號：{freq} 次")
+        freq = int(current_recent_freq[num])
+        st.sidebar.progress(min(freq / (2 * hot_threshold), 1.0), text=f"{num} 號：{freq} 次")
 
 st.sidebar.markdown("---")
-analysis_range = st.sidebar.slider("趨勢圖表顯示期數", 10, 100, 50)
+analysis_range = st.sidebar.slider("趨勢圖表顯示期數", 10, 3000, 50)
 
 # ==========================================
 # 4. 主要內容分頁
@@ -478,6 +393,7 @@ tab1, tab2, tab3, tab4, tab5 = st.tabs([
 ])
 
 # --- TAB 1: 號碼健檢 ---
+profiler.begin("號碼健檢", rows=current_total_draws)
 with tab1:
     st.markdown("## 號碼健康度檢查")
     col_input, col_score = st.columns([1, 1])
@@ -495,7 +411,7 @@ with tab1:
         u_sum = sum(u_nums)
         u_odd = sum(1 for n in u_nums if n % 2 != 0)
         u_consecutive = 1 if np.any(np.diff(u_nums) == 1) else 0
-        hist_count = df.apply(lambda row: set(row[num_cols]).issuperset(set(u_nums)), axis=1).sum()
+        hist_count = len(memoized('subset', tuple(sorted(u_nums)), query_subset, hit_matrix, number_bitsets, u_nums)[0])
         
         score = 60 
         reasons = []
@@ -514,10 +430,7 @@ with tab1:
             score -= 10
             reasons.append("⚠️ **單雙失衡**：全單或全雙，屬於極端牌型。")
         
-        hot_count = 0
-        for n in u_nums:
-            recent_hits = current_df.tail(30)[num_cols].isin([n]).any(axis=1).sum()
-            if recent_hits >= 5: hot_count += 1
+        hot_count = int((current_recent_freq[u_nums] >= hot_threshold).sum())
         
         if 1 <= hot_count <= 3: 
             score += 10
@@ -558,7 +471,54 @@ with tab1:
     else:
         st.info("👈 請選滿 5 個號碼")
 
+    st.markdown("---")
+    with st.expander("🏆 全組合排行：以健檢規則為全部 575,757 組號碼評分", expanded=False):
+        combos, combo_features = load_combinations()
+        w1, w2, w3, w4 = st.columns(4)
+        rule_weights = {
+            'sum': w1.slider("總和權重", 0.0, 2.0, 1.0, 0.1),
+            'odd': w2.slider("單雙權重", 0.0, 2.0, 1.0, 0.1),
+            'hot': w3.slider("冷熱權重", 0.0, 2.0, 1.0, 0.1),
+            'history': w4.slider("歷史頭獎權重", 0.0, 2.0, 1.0, 0.1),
+        }
+        f1, f2 = st.columns(2)
+        sum_band = f1.slider("「總和漂亮」的區間", 15, 185, (80, 120))
+        sum_range = f2.slider("只看總和在此範圍的組合", 15, 185, (15, 185))
+        f3, f4, f5 = st.columns([2, 2, 1])
+        required_nums = f3.multiselect("一定要有：", list(range(1, 40)), max_selections=4)
+        excluded_nums = f4.multiselect("排除號碼：", [n for n in range(1, 40) if n not in required_nums])
+        top_k = int(f5.number_input("顯示組數", 5, 200, 20, 5))
+
+        # 熱號與近期次數跟著篩選範圍變，歷史頭獎以全歷史計算 (與上方單組評分一致)
+        combo_history = memoized(
+            'combo_history', (range_key, recent_window),
+            lambda: build_combo_history(combos, current_recent_freq, hot_threshold, store.balls)
+        )
+        rule_points = memoized(
+            'combo_points', (range_key, recent_window, sum_band),
+            calc_rule_points, combo_features, combo_history, sum_band
+        )
+        rank_started = time.perf_counter()
+        top_rows, top_scores = rank_combinations(
+            rule_points, combo_history, combo_features, rule_weights, top_k,
+            required_nums, excluded_nums, sum_range
+        )
+        rank_ms = (time.perf_counter() - rank_started) * 1000
+
+        top_combos = combos[top_rows]
+        st.caption(f"評分與排序耗時 {rank_ms:.0f} ms；同分時以 5 個號碼近 {recent_window} 期次數合計較高者優先")
+        st.dataframe(pd.DataFrame({
+            '號碼組合': [' '.join(f"{n:02d}" for n in row) for row in top_combos.tolist()],
+            '評分': top_scores.round(1),
+            '總和': combo_features['sum'][top_rows],
+            '單雙': [f"{o}單 {5 - o}雙" for o in combo_features['odd'][top_rows].tolist()],
+            '近期熱號': combo_history['hot_count'][top_rows],
+            f'近{recent_window}期次數合計': combo_history['heat'][top_rows],
+            '歷史頭獎': combo_history['jackpots'][top_rows],
+        }), hide_index=True, use_container_width=True)
+
 # --- TAB 2: 智能預測 ---
+profiler.begin("智能預測", rows=total_draws)
 with tab2:
     st.markdown("## 🔮 智能預測與補號助手")
     mode = st.radio("模式：", ["🤖 電腦推薦", "🧩 智慧補號"], horizontal=True)
@@ -569,29 +529,22 @@ with tab2:
         w_friend = st.slider("「好朋友」權重 (拖牌)", 0.0, 2.0, 1.2)
         w_miss = st.slider("「冷門補漲」權重 (遺漏)", 0.0, 2.0, 0.3)
         
-        scores = {}
-        for n in last_nums:
-            idx = df[df[num_cols].isin([n]).any(axis=1)].index
-            next_idx = idx + 1
-            next_idx = next_idx[next_idx < len(df)]
-            if len(next_idx) > 0:
-                next_nums = df.iloc[next_idx][num_cols].values.flatten()
-                val_counts = pd.Series(next_nums).value_counts()
-                for num, count in val_counts.items():
-                    scores[num] = scores.get(num, 0) + (count * w_friend)
-
-        for num in range(1, 40):
-            is_hit = current_df[num_cols].isin([num]).any(axis=1)
-            if is_hit.sum() > 0:
-                last_hit_pos = np.where(is_hit)[0][-1]
-                skip = (len(current_df) - 1) - last_hit_pos
-            else:
-                skip = len(current_df)
-            if 5 <= skip <= 12: 
-                scores[num] = scores.get(num, 0) + (50 * w_miss)
-
-        pred_df = pd.DataFrame(list(scores.items()), columns=['號碼', '分數'])
-        top_picks = pred_df.sort_values('分數', ascending=False).head(5)['號碼'].tolist()
+        friend_lag = st.select_slider("拖牌間隔期數", options=[1, 2, 3, 4, 5], value=1,
+                                      help="1 = 以最新一期拖下期；k = 以倒數第 k 期拖下期")
+        friend_window = st.select_slider("拖牌統計期數", options=["全歷史", 10, 20, 30, 50, 100, 300, 1000], value="全歷史",
+                                         help="只統計最近幾段拖牌；對應參數掃描的「參考期數」")
+        miss_range = st.slider("遺漏加分區間", 0, 30, (5, 12), help="目前遺漏期數落在這個區間的號碼加分")
+
+        # 拖牌次數只跟資料、間隔期數與統計期數有關，權重滑桿只重算最後的加權
+        # 統計 w 段間隔 k 期的拖牌需要最近 w + k 期
+        friend_rows = hit_matrix if friend_window == "全歷史" else hit_matrix[-(friend_window + friend_lag):]
+        transition = memoized('transition', (friend_lag, friend_window),
+                              indexes.calc_transition_matrix, friend_rows, friend_lag)
+        top_picks, scores = memoized(
+            'recommend', (range_key, w_friend, w_miss, friend_lag, friend_window, miss_range),
+            lambda: recommend_numbers(hit_matrix, current_skips, w_friend, w_miss, friend_lag, miss_range,
+                                      transition=transition)
+        )
         
         st.markdown(f"""
         <div style="display: flex; flex-wrap: wrap; gap: 15px; justify-content: center; margin: 30px 0;">
@@ -605,14 +558,14 @@ with tab2:
         
         if len(fixed_nums) > 0:
             needed = 5 - len(fixed_nums)
-            mask = df.apply(lambda row: set(row[num_cols]).issuperset(set(fixed_nums)), axis=1)
-            matched_rows = df[mask]
+            matched_rows, co_freq = memoized(
+                'subset', tuple(sorted(fixed_nums)), query_subset, hit_matrix, number_bitsets, fixed_nums
+            )
             
             if len(matched_rows) > 0:
-                all_matched_nums = matched_rows[num_cols].values.flatten()
-                candidates = [n for n in all_matched_nums if n not in fixed_nums]
-                if len(candidates) > 0:
-                    best_matches = pd.Series(candidates).value_counts().head(needed).index.tolist()
+                if co_freq.sum() > 0:
+                    ranked = np.argsort(-co_freq, kind='stable')
+                    best_matches = [int(n) for n in ranked[:needed] if co_freq[n] > 0]
                     final_set = sorted(fixed_nums + best_matches)
                     
                     html_str = '<div style="display: flex; gap: 10px; justify-content: center; margin-top: 30px;">'
@@ -630,152 +583,320 @@ with tab2:
             st.info("請至少選擇 1 個號碼")
 
 # --- TAB 3: 趨勢地圖 ---
+profiler.begin("趨勢地圖", rows=current_total_draws)
 with tab3:
     st.markdown("## 視覺化趨勢")
-    viz_type = st.radio("圖表：", ["棋盤熱力圖", "關係圖"], horizontal=True)
+    viz_type = st.radio("圖表：", ["棋盤熱力圖", "關係圖", "遺漏分佈", "組合探勘"], horizontal=True)
     st.markdown("---")
 
     if "棋盤" in viz_type:
         st.markdown("### 🎲 號碼分佈圖")
-        last_n_draws = current_df.tail(analysis_range).reset_index()
-        heatmap_data = []
-        for idx, row in last_n_draws.iterrows():
-            draw_idx = idx + 1 
-            for col in num_cols:
-                num = row[col]
-                heatmap_data.append({'期數': draw_idx, '號碼': int(num), '開出': 1})
-        
-        hm_df = pd.DataFrame(heatmap_data)
-        chart_heatmap = alt.Chart(hm_df).mark_rect(stroke='white', strokeWidth=0.5).encode(
-            x=alt.X('期數:O', axis=alt.Axis(labels=False)),
-            y=alt.Y('號碼:O'),
-            color=alt.value(hermes_orange),
-            tooltip=['期數', '號碼']
-        ).properties(width='container', height=600)
-        st.altair_chart(chart_heatmap, use_container_width=True)
-        
+        heat_range = min(analysis_range, current_total_draws)
+        if heat_range <= HEATMAP_MAX_COLUMNS:
+            # 逐期：每個開出的號碼一格
+            periods, nums = calc_heatmap_cells(current_store.balls[-heat_range:])
+            hm_df = pd.DataFrame({'期數': periods, '號碼': nums})
+            chart_heatmap = alt.Chart(hm_df).mark_rect(stroke='white', strokeWidth=0.5).encode(
+                x=alt.X('期數:O', axis=alt.Axis(labels=False)),
+                y=alt.Y('號碼:O'),
+                color=alt.value(hermes_orange),
+                tooltip=['期數', '號碼']
+            ).properties(width='container', height=600)
+        else:
+            # 分段：期數太多時在伺服器端每 bucket 期合併一格，送到瀏覽器的格數固定在 HEATMAP_MAX_COLUMNS × 39 以內
+            bucket = -(-heat_range // HEATMAP_MAX_COLUMNS)
+            starts, bin_counts = calc_heatmap_bins(current_hits[-heat_range:], bucket)
+            ends = np.append(starts[1:], heat_range)
+            hm_df = pd.DataFrame({
+                '期數': np.repeat(starts + 1, 39),
+                '期數範圍': np.repeat([f"{a + 1}-{b}" for a, b in zip(starts, ends)], 39),
+                '號碼': np.tile(np.arange(1, 40), len(starts)),
+                '開出次數': bin_counts[:, 1:].ravel(),
+            })
+            st.caption(f"近 {heat_range} 期，每 {bucket} 期合併為一格，顏色越深代表該段開出次數越多")
+            chart_heatmap = alt.Chart(hm_df).mark_rect(stroke='white', strokeWidth=0.5).encode(
+                x=alt.X('期數:O', axis=alt.Axis(labels=False)),
+                y=alt.Y('號碼:O'),
+                color=alt.Color('開出次數:Q', scale=alt.Scale(range=['#FFFFFF', hermes_orange]), legend=None),
+                tooltip=['期數範圍', '號碼', '開出次數']
+            ).properties(width='container', height=600)
+        render_chart(chart_heatmap, "棋盤熱力圖")
+        
+    elif "遺漏" in viz_type:
+        st.markdown("### ⏳ 遺漏分佈")
+        gap_stats, gap_nums, gaps = memoized('gap_stats', range_key, indexes.calc_gap_stats, current_hits)
+        gap_chart_df = gap_stats.reset_index()
+
+        # 灰柱：歷史最大遺漏 / 黑線：P90 / 橘點：目前遺漏
+        base = alt.Chart(gap_chart_df).encode(x=alt.X('號碼:O'))
+        chart_gap = (
+            base.mark_bar(color='#DDDDDD').encode(y=alt.Y('最大遺漏', title='期數'))
+            + base.mark_tick(color=black, thickness=2).encode(y='P90遺漏')
+            + base.mark_circle(size=90, color=hermes_orange).encode(
+                y='目前遺漏', tooltip=['號碼', '目前遺漏', '目前遺漏百分位', '最大遺漏', '最長連開'])
+        ).properties(height=400)
+        render_chart(chart_gap, "遺漏分佈")
+
+        gap_num = st.selectbox("查看單一號碼的遺漏分佈：", list(range(1, 40)))
+        hist_df = pd.Series(gaps[gap_nums == gap_num]).value_counts().sort_index()
+        hist_df = pd.DataFrame({'遺漏期數': hist_df.index, '次數': hist_df.values})
+        chart_hist = alt.Chart(hist_df).mark_bar(color=black).encode(x='遺漏期數:Q', y='次數')
+        current_rule = alt.Chart(pd.DataFrame({'遺漏期數': [int(current_skips[gap_num])]})).mark_rule(
+            color=hermes_orange, strokeWidth=3).encode(x='遺漏期數:Q')
+        render_chart(chart_hist + current_rule, "單號遺漏")
+
+        st.dataframe(gap_stats.round(1), use_container_width=True)
+
+    elif "組合" in viz_type:
+        st.markdown("### 🧮 組合探勘")
+        window_options = sorted({n for n in (100, 300, 1000, 3000) if n < current_total_draws} | {current_total_draws})
+        c1, c2, c3 = st.columns(3)
+        tuple_k = c1.radio("組合大小：", [2, 3, 4], index=1, horizontal=True, format_func=lambda k: f"{k} 碼")
+        tuple_sort = c2.radio("排序：", ["出現次數", "Lift"], horizontal=True,
+                              help="Lift = 實際同期次數 / 依各號碼出現頻率推估的期望次數")
+        tuple_window = c3.select_slider(
+            "分析期數：", options=window_options, value=current_total_draws,
+            format_func=lambda n: f"全部 ({n} 期)" if n == current_total_draws else f"近 {n} 期"
+        )
+        c1, c2, c3 = st.columns(3)
+        tuple_min_count = c1.number_input("最少出現次數", min_value=1, value=2)
+        tuple_top = c2.number_input("顯示筆數", min_value=10, max_value=500, value=50, step=10)
+        tuple_required = c3.multiselect("一定要包含", list(range(1, 40)), max_selections=tuple_k - 1)
+
+        if tuple_window == total_draws:
+            # 全歷史：共用的計數器只數上次之後新附加的期數
+            tuple_counts = get_tuple_counter().sync(store.balls).snapshot(tuple_k)
+        else:
+            tuple_counts = memoized(
+                'ktuples', (range_key, tuple_window, tuple_k),
+                lambda: KTupleCounter((tuple_k,)).extend(current_store.balls[-tuple_window:]).snapshot(tuple_k)
+            )
+        top_tuples = top_ktuples(
+            tuple_counts, tuple_k, tuple_top, tuple_min_count,
+            'count' if tuple_sort == "出現次數" else 'lift', tuple_required
+        )
+        st.caption(f"分析 {tuple_window} 期，依{tuple_sort}列出前 {len(top_tuples['count'])} 組 (至少出現 {tuple_min_count} 次)")
+        st.dataframe(pd.DataFrame({
+            '號碼組合': [" - ".join(f"{n:02d}" for n in row) for row in top_tuples['numbers']],
+            '出現次數': top_tuples['count'],
+            '支持度 (%)': (top_tuples['support'] * 100).round(3),
+            'Lift': top_tuples['lift'].round(3),
+            '最近開出 (期前)': tuple_window - 1 - top_tuples['last_seen'],
+        }), hide_index=True, use_container_width=True)
+
     else:
         st.markdown("### 🔗 號碼關聯圖")
-        # 取最近 500 期
-        recent_corr_df = current_df.tail(500)
-        co_matrix = np.zeros((40, 40))
-        for _, row in recent_corr_df.iterrows():
-            nums = row[num_cols].values
-            for n1 in nums:
-                for n2 in nums:
-                    if n1 != n2:
-                        co_matrix[int(n1)][int(n2)] += 1
-        corr_data = []
-        for i in range(1, 40):
-            for j in range(1, 40):
-                if i < j: 
-                    corr_data.append({'A': i, 'B': j, '次數': co_matrix[i][j]})
-        
-        chart_corr = alt.Chart(pd.DataFrame(corr_data)).mark_rect().encode(
+        window_options = sorted({n for n in (100, 300, 500, 1000, 2000) if n < current_total_draws} | {current_total_draws})
+        corr_window = st.select_slider(
+            "分析期數：", options=window_options,
+            value=500 if 500 in window_options else current_total_draws,
+            format_func=lambda n: f"全部 ({n} 期)" if n == current_total_draws else f"近 {n} 期"
+        )
+        corr_metric = st.radio("關聯指標：", ["次數", "Lift", "PMI"], horizontal=True,
+                               help="Lift = 實際同期次數 / 隨機開獎下的期望次數；PMI = log2(Lift)，0 代表無關聯")
+
+        co_matrix, lift_matrix = memoized(
+            'co_matrix', (range_key, corr_window), indexes.calc_co_matrix, current_hits, corr_window
+        )
+        a, b = np.triu_indices(40, k=1)
+        keep = a >= 1
+        a, b = a[keep], b[keep]
+        with np.errstate(divide='ignore'):
+            pmi = np.log2(lift_matrix[a, b])
+        corr_df = pd.DataFrame({
+            'A': a, 'B': b,
+            '次數': co_matrix[a, b],
+            'Lift': lift_matrix[a, b].round(3),
+            'PMI': np.where(np.isfinite(pmi), pmi, np.nan).round(3)
+        })
+
+        if corr_metric == "次數":
+            color_scale = alt.Scale(scheme='orangered')
+        else:
+            color_scale = alt.Scale(scheme='blueorange', domainMid=1 if corr_metric == "Lift" else 0)
+        chart_corr = alt.Chart(corr_df).mark_rect().encode(
             x='A:O', y='B:O',
-            color=alt.Color('次數', scale=alt.Scale(scheme='orangered')),
-            tooltip=['A', 'B', '次數']
+            color=alt.Color(corr_metric, scale=color_scale),
+            tooltip=['A', 'B', '次數', 'Lift', 'PMI']
         ).properties(width='container', height=700)
-        st.altair_chart(chart_corr, use_container_width=True)
+        render_chart(chart_corr, "關係圖")
 
 # --- TAB 4: 時光機 ---
+profiler.begin("時光機回測", rows=total_draws)
 with tab4:
     st.markdown("## 策略回測")
-    strategy = st.selectbox("策略：", ["🔥 追熱門牌", "❄️ 抓冷門牌", "⚖️ 陰陽調和"])
+    strategy = st.selectbox("策略：", BACKTEST_STRATEGIES)
+    col_lookback, col_periods = st.columns(2)
+    lookback = col_lookback.slider("參考期數 (以前 N 期的次數選號)", 5, 200, 30)
+    max_periods = total_draws - lookback
+    period_options = sorted({n for n in (100, 300, 1000, 3000) if n < max_periods} | {max(max_periods, 1)})
+    backtest_periods = col_periods.select_slider(
+        "回測期數：", options=period_options,
+        value=100 if 100 in period_options else period_options[-1],
+        format_func=lambda n: f"全歷史 ({n} 期)" if n == max_periods else f"近 {n} 期"
+    )
     
-    if st.button("開始回測 (近100期)"):
-        with st.spinner("模擬中..."):
-            if len(df) < 130:
-                st.error("資料不足，無法進行回測")
-            else:
-                backtest_periods = 100
-                start_index = len(df) - backtest_periods
-                results = {0:0, 1:0, 2:0, 3:0, 4:0, 5:0}
-                win_history = []
-                
-                bar = st.progress(0)
-                for i in range(backtest_periods):
-                    current_idx = start_index + i
-                    past_data = df.iloc[current_idx-30 : current_idx]
-                    all_past_nums = past_data[num_cols].values.flatten()
-                    counts = pd.Series(all_past_nums).value_counts()
-                    
-                    my_pick = []
-                    if "熱門" in strategy:
-                        my_pick = counts.head(5).index.tolist()
-                    elif "冷門" in strategy:
-                        all_nums = set(range(1, 40))
-                        not_appeared = list(all_nums - set(counts.index))
-                        if len(not_appeared) >= 5: my_pick = not_appeared[:5]
-                        else: my_pick = not_appeared + counts.tail(5-len(not_appeared)).index.tolist()
-                    elif "陰陽" in strategy:
-                        hot_nums = counts.index.tolist()
-                        odds = [n for n in hot_nums if n % 2 != 0]
-                        evens = [n for n in hot_nums if n % 2 == 0]
-                        if len(odds) >= 3 and len(evens) >= 2: my_pick = odds[:3] + evens[:2]
-                        else: my_pick = hot_nums[:5]
-                    
-                    if len(my_pick) < 5:
-                        remain = [x for x in range(1,40) if x not in my_pick]
-                        my_pick.extend(remain[:5-len(my_pick)])
-                    
-                    winning_nums = df.iloc[current_idx][num_cols].values
-                    hits = len(set(my_pick).intersection(set(winning_nums)))
-                    results[hits] += 1
-                    win_history.append(hits)
-                    bar.progress((i + 1) / backtest_periods)
-                
-                time.sleep(0.5)
-                c1, c2 = st.columns(2)
-                with c1:
-                    res_df = pd.DataFrame.from_dict(results, orient='index', columns=['次數'])
-                    res_df.index = [f"中 {i} 星" for i in res_df.index]
-                    st.dataframe(res_df.T)
-                    total_hits = sum([results[k] for k in [2,3,4,5]])
-                    st.metric("中獎期數 (2星+)", f"{total_hits} 期")
-                with c2:
-                    chart_win = alt.Chart(pd.DataFrame({'期數': range(1, 101), '星數': win_history})).mark_line(color=hermes_orange).encode(x='期數', y='星數')
-                    st.altair_chart(chart_win, use_container_width=True)
+    if st.button("開始回測"):
+        if max_periods < 1:
+            st.error("資料不足，無法進行回測")
+        else:
+            win_history, target_rows = memoized(
+                'backtest', (strategy, lookback, backtest_periods), backtest_hits,
+                hit_matrix, strategy, lookback, backtest_periods
+            )
+            results = np.bincount(win_history, minlength=6)
+
+            c1, c2 = st.columns(2)
+            with c1:
+                res_df = pd.DataFrame({'次數': results}, index=[f"中 {i} 星" for i in range(6)])
+                st.dataframe(res_df.T)
+                total_hits = int(results[2:].sum())
+                st.metric("中獎期數 (2星+)", f"{total_hits} 期")
+            with c2:
+                # 期數太多時改畫每段平均星數，避免圖表資料量隨回測期數暴增
+                # 與熱力圖相同從最新一期往回分段，湊不滿一段的是最舊的那段，最新的期數一定畫得到
+                bucket = max(1, len(win_history) // 200)
+                starts, star_sums = calc_heatmap_bins(win_history, bucket)
+                win_df = pd.DataFrame({
+                    '期數': starts + 1,
+                    '星數': star_sums / np.diff(starts, append=len(win_history))
+                })
+                chart_win = alt.Chart(win_df).mark_line(color=hermes_orange).encode(
+                    x='期數', y=alt.Y('星數', title='星數' if bucket == 1 else f'每 {bucket} 期平均星數'))
+                render_chart(chart_win, "回測走勢")
+
+            st.markdown("#### 各年度命中分佈")
+            year_dist = pd.crosstab(store.years[target_rows], win_history)
+            year_dist = year_dist.reindex(columns=range(6), fill_value=0)
+            year_dist.columns = [f"中 {i} 星" for i in range(6)]
+            year_dist.index.name = '年份'
+            st.dataframe(year_dist.sort_index(ascending=False), use_container_width=True)
+
+    # 顯著性檢定：以相同的參考期數與回測期數，比較三種策略與隨機選號的成績
+    st.markdown("---")
+    with st.expander("🎲 顯著性檢定 (蒙地卡羅)", expanded=False):
+        c1, c2 = st.columns(2)
+        mc_trials = c1.select_slider("模擬趟數", options=[1_000, 10_000, 100_000], value=10_000)
+        mc_seed = c2.number_input("亂數種子", min_value=0, value=539, step=1)
+        mc_periods = min(backtest_periods, max_periods)
+        st.caption(f"每趟模擬 {mc_periods} 期隨機選號對隨機開獎，共 {mc_trials * mc_periods:,} 張彩券；"
+                   "p 值為隨機成績不輸策略的機率，越小越不像運氣")
+
+        if st.button("開始模擬", disabled=max_periods < 1):
+            with st.spinner("模擬中..."):
+                mc_rows, mc_histories, mc_null = memoized(
+                    'montecarlo', (lookback, backtest_periods, mc_trials, mc_seed), evaluate_strategies,
+                    hit_matrix, BACKTEST_STRATEGIES, lookback, backtest_periods, mc_trials, mc_seed
+                )
+            st.dataframe(pd.DataFrame(mc_rows), hide_index=True, use_container_width=True)
+
+            st.markdown("#### 每期命中分佈 (%)")
+            star_dist = pd.DataFrame(
+                {s: np.bincount(h, minlength=6) / len(h) for s, h in mc_histories.items()}
+                | {'隨機模擬': mc_null['star_counts'] / mc_null['star_counts'].sum(), '理論機率': exact_star_probs()},
+                index=[f"中 {i} 星" for i in range(6)]
+            )
+            st.dataframe((star_dist.T * 100).round(3), use_container_width=True)
+
+    # 參數掃描：多核心評估電腦推薦權重與回測策略參考期數
+    st.markdown("---")
+    with st.expander("🧪 參數掃描 (多核心)", expanded=False):
+        c1, c2 = st.columns(2)
+        sweep_w_friend = c1.multiselect("「好朋友」權重", [0.0, 0.4, 0.8, 1.2, 1.6, 2.0], default=[0.8, 1.2, 1.6])
+        sweep_w_miss = c2.multiselect("「冷門補漲」權重", [0.0, 0.3, 0.6, 1.0, 1.5, 2.0], default=[0.0, 0.3, 0.6])
+        sweep_lookbacks = c1.multiselect("參考期數 (拖牌統計 / 回測策略)", [10, 20, 30, 50, 100, 300, 1000], default=[30, 100, 300])
+        sweep_miss_ranges = c2.multiselect("遺漏加分區間", ["3-8", "5-12", "8-15", "10-20"], default=["5-12"])
+        sweep_strategies = st.multiselect("一併掃描的回測策略", BACKTEST_STRATEGIES, default=BACKTEST_STRATEGIES)
+        sweep_periods = st.select_slider("評估期數", options=[100, 300, 1000, 3000], value=300)
+
+        sweep_tasks = build_sweep_tasks(
+            sweep_w_friend, sweep_w_miss,
+            [n for n in sweep_lookbacks if n < total_draws - 1],
+            [tuple(int(x) for x in r.split('-')) for r in sweep_miss_ranges],
+            sweep_strategies
+        )
+        st.caption(f"共 {len(sweep_tasks)} 個任務，使用 {os.cpu_count()} 個核心")
+        st.caption("電腦推薦的掃描結果對應智能預測在拖牌間隔 1 期時的設定：參考期數即「拖牌統計期數」，遺漏區間即「遺漏加分區間」")
+
+        if st.button("開始掃描", disabled=not sweep_tasks):
+            # 掃描途中按下停止會觸發重跑並中斷迴圈，已完成的結果保留在 session_state
+            st.button("⏹ 停止掃描")
+            st.session_state['sweep_rows'] = []
+            st.session_state['sweep_done'] = False
+            sweep_bar = st.progress(0.0, text="掃描中...")
+            sweep_table = st.empty()
+            for done, total, rows in iter_param_sweep(hit_matrix, sweep_tasks, sweep_periods):
+                st.session_state['sweep_rows'].extend(rows)
+                sweep_bar.progress(done / total, text=f"掃描中... {done}/{total}")
+                sweep_table.dataframe(rank_sweep_results(st.session_state['sweep_rows']).head(20), use_container_width=True)
+            st.session_state['sweep_done'] = True
+            sweep_bar.progress(1.0, text="掃描完成")
+            sweep_table.empty()
+
+        if st.session_state.get('sweep_rows'):
+            if not st.session_state.get('sweep_done'):
+                st.warning("掃描已中止，以下為已完成部分的結果")
+            st.dataframe(rank_sweep_results(st.session_state['sweep_rows']), use_container_width=True)
 
 # --- TAB 5: 市場概況 ---
+profiler.begin("市場概況", rows=current_total_draws)
 with tab5:
     st.markdown("## 市場概況")
     col1, col2 = st.columns(2)
     
     with col1:
         st.markdown("### 🔢 尾數強弱")
-        last_range = current_df.tail(10)
-        tails = []
-        for c in num_cols: tails.extend(last_range[c] % 10)
-        tail_counts = pd.Series(tails).value_counts().sort_index()
+        tail_counts = pd.Series(current_store.balls[-10:].ravel() % 10).value_counts().sort_index()
         tail_df = pd.DataFrame({'尾數': tail_counts.index, '次數': tail_counts.values})
         chart_tail = alt.Chart(tail_df).mark_bar().encode(
             x='尾數:O', y='次數', 
             color=alt.condition(alt.datum.次數 >= tail_df['次數'].max(), alt.value(hermes_orange), alt.value(black))
         )
-        st.altair_chart(chart_tail, use_container_width=True)
+        render_chart(chart_tail, "尾數強弱")
 
     with col2:
         st.markdown("### 🥶 冷熱象限")
-        hot_data = []
-        for n in range(1, 40):
-            is_hit = current_df[num_cols].isin([n]).any(axis=1)
-            if is_hit.sum() > 0:
-                last_hit_pos = np.where(is_hit)[0][-1]
-                skip = (len(current_df) - 1) - last_hit_pos
-            else:
-                skip = len(current_df)
-                
-            freq = current_df.tail(30)[num_cols].isin([n]).any(axis=1).sum()
-            hot_data.append({'號碼': n, '遺漏': skip, '熱度': freq})
-        
-        hot_df = pd.DataFrame(hot_data)
+        hot_df = pd.DataFrame({
+            '號碼': range(1, 40),
+            '遺漏': current_skips[1:],
+            '熱度': current_recent_freq[1:]
+        })
         c = alt.Chart(hot_df).mark_circle(size=120, color=black, opacity=0.7).encode(
             x='遺漏', y='熱度', tooltip=['號碼', '遺漏', '熱度']
         ).interactive()
         text = c.mark_text(align='left', dx=6, color=hermes_orange, fontSize=13, fontWeight='bold').encode(text='號碼')
-        st.altair_chart(c + text, use_container_width=True)
+        render_chart(c + text, "冷熱象限")
 
 st.markdown("---")
 st.markdown("<div style='text-align: center; color: #CCC; font-size: 12px;'>COPYRIGHT © 2025 539 PRO ANALYTICS</div>", unsafe_allow_html=True)
 
+# 效能診斷面板：開關放在最後，報告涵蓋這次重跑從載入到所有分頁的計算與圖表輸出
+profile_report = profiler.finish()
+with st.sidebar.expander("🩺 效能診斷", expanded=profile_report is not None):
+    st.toggle("啟用效能診斷", key='profiling_enabled',
+              help=f"記錄每次重跑的耗時與記憶體配置，並附加到 {PROFILE_LOG}；開啟時量測本身會讓重跑變慢")
+    if profile_report:
+        st.caption(f"本次重跑 {profile_report['total_ms']:.0f} ms；記憶體配置以整個程序計算，包含同時間其他連線的配置")
+        st.dataframe(pd.DataFrame(profile_report['sections']).rename(columns={
+            'section': '區段', 'wall_ms': '耗時 (ms)', 'rows': '期數', 'alloc_kb': '配置 (KB)',
+            'cache_hits': '快取命中', 'cache_misses': '快取未命中',
+        }), hide_index=True, use_container_width=True)
+        cache_stats = memo_cache.stats()
+        if cache_stats:
+            st.caption(f"分析快取 {memo_cache.nbytes / 2**20:.1f} / {memo_cache.max_bytes / 2**20:.0f} MB")
+            cache_frame = pd.DataFrame(cache_stats).T
+            cache_frame['bytes'] = (cache_frame['bytes'] / 1024).round(1)
+            st.dataframe(cache_frame.rename_axis('分析').rename(columns={
+                'hits': '命中', 'misses': '未命中', 'evictions': '淘汰', 'entries': '筆數', 'bytes': '大小 (KB)',
+            }), use_container_width=True)
+        # 背景更新在排程執行緒上跑，各區段耗時記在排程自己的 profiler
+        update_profile = update_status['last_profile']
+        if update_profile:
+            st.caption(f"上次線上更新 ({update_profile['time']}) {update_profile['total_ms']:.0f} ms")
+            st.dataframe(pd.DataFrame(update_profile['sections'])[['section', 'wall_ms', 'rows']].rename(columns={
+                'section': '區段', 'wall_ms': '耗時 (ms)', 'rows': '期數',
+            }), hide_index=True, use_container_width=True)
+        try:
+            append_profile_log(PROFILE_LOG, profile_report, data_version=current_version)
+        except OSError:
+            pass  # 記錄檔寫不進去不影響畫面
@@ -0,0 +1,46 @@
+# 539 分析核心：不依賴 Streamlit 的純 NumPy 計算，可在 process pool、CLI 等非 UI 環境直接使用
+# 子模組在第一次取用時才載入，import lotto539 本身不會拉進 numpy / pandas / lxml
+import importlib
+
+# 對外名稱 → 所在子模組
+_EXPORTS = {
+    'CSV_FILE': 'csvstore',
+    'append_rows': 'csvstore',
+    'read_last_record': 'csvstore',
+    'DrawStore': 'store',
+    'load_draw_store': 'data',
+    'load_draws': 'data',
+    'parse_draws_csv': 'data',
+    'calc_draw_features': 'data',
+    'calc_draw_dates': 'data',
+    'build_hit_matrix': 'indexes',
+    'calc_skips': 'indexes',
+    'calc_recent_freq': 'indexes',
+    'build_cum_counts': 'indexes',
+    'window_counts': 'indexes',
+    'calc_gap_stats': 'indexes',
+    'calc_co_matrix': 'indexes',
+    'calc_transition_matrix': 'indexes',
+    'build_number_bitsets': 'indexes',
+    'query_subset': 'indexes',
+    'build_year_offsets': 'indexes',
+    'select_row_ranges': 'indexes',
+    'take_row_ranges': 'indexes',
+    'BACKTEST_STRATEGIES': 'scoring',
+    'recommend_numbers': 'scoring',
+    'backtest_hits': 'scoring',
+    'update_from_web': 'updater',
+}
+
+__all__ = sorted(_EXPORTS)
+
+def __getattr__(name):
+    module_name = _EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module_name}", __name__), name)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
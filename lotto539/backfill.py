@@ -0,0 +1,168 @@
+import argparse
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from urllib.parse import urlsplit
+
+import requests
+
+from .csvstore import CSV_FILE, csv_lock, read_all_records, write_rows_atomic
+from .fetch import DEFAULT_TIMEOUT, create_session, fetch_page, parse_draw_rows
+
+# ==========================================
+# 歷史資料回補：多執行緒分頁抓取 (共用連線池 + 每個主機限速)，
+# 解析後的分頁存到磁碟，中斷後重跑會從未完成的分頁繼續，最後依日期去重合併並整檔重寫 CSV，完成後清掉分頁快取
+# ==========================================
+
+# pilio 的分頁清單網址，{page} 由 1 起算；可用 --url-template 改成其他來源或本機替身伺服器
+DEFAULT_URL_TEMPLATE = "https://www.pilio.idv.tw/lto539/list.asp?indexpage={page}&orderby=new"
+
+class HostRateLimiter:
+    # 每個主機每秒最多 rate 個請求，多執行緒共用
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next_slot = {}
+        self._lock = threading.Lock()
+
+    def wait(self, url):
+        if not self.interval:
+            return
+        host = urlsplit(url).netloc
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+def page_cache_path(cache_dir, url):
+    return os.path.join(cache_dir, hashlib.sha1(url.encode('utf-8')).hexdigest()[:16] + '.json')
+
+def _load_cached_page(cache_dir, url):
+    try:
+        with open(page_cache_path(cache_dir, url), encoding='utf-8') as f:
+            cached = json.load(f)
+        return [(datetime.fromisoformat(d), nums) for d, nums in cached['rows']]
+    except (OSError, ValueError, KeyError):
+        return None
+
+def _save_cached_page(cache_dir, url, rows):
+    path = page_cache_path(cache_dir, url)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({'url': url, 'rows': [(d.isoformat(), nums) for d, nums in rows]}, f)
+    os.replace(tmp_path, path)
+
+# 回補完成後清掉分頁快取：分頁清單由新到舊排，每開一期所有分頁都會往後移，快取只能在同一次回補 (含中斷後重跑) 裡沿用
+def clear_page_cache(cache_dir):
+    try:
+        entries = list(os.scandir(cache_dir))
+    except OSError:
+        return
+    for entry in entries:
+        if entry.is_file() and entry.name.endswith(('.json', '.json.tmp')):
+            os.remove(entry.path)
+    try:
+        os.rmdir(cache_dir)
+    except OSError:
+        pass  # 目錄裡還有別的檔案 (例如 --cache-dir 指到共用目錄) 就留著
+
+# 抓一個分頁：有磁碟快取直接讀，否則限速後抓取解析；空白頁不寫快取 (可能是尚未出現的新頁)
+def fetch_history_page(url, session, limiter, cache_dir, timeout=DEFAULT_TIMEOUT):
+    rows = _load_cached_page(cache_dir, url)
+    if rows is not None:
+        return rows
+    limiter.wait(url)
+    try:
+        page = fetch_page(url, session=session, timeout=timeout, conditional=False)
+    except requests.HTTPError as e:
+        # 超過最後一頁時有些網站回 404，視為空白頁
+        if e.response is not None and e.response.status_code == 404:
+            return []
+        raise
+    rows = parse_draw_rows(page.text)
+    if rows:
+        _save_cached_page(cache_dir, url, rows)
+    return rows
+
+# 依日期去重合併 (既有紀錄優先)，回傳依日期排序的 [(datetime, nums)]
+def merge_draws(*sources):
+    merged = {}
+    for rows in sources:
+        for draw_date, nums in rows:
+            merged.setdefault(draw_date.date(), (draw_date, nums))
+    return [merged[k] for k in sorted(merged)]
+
+# 轉成 CSV 資料列：總期數連續編號，期數每年從 1 起算
+def build_csv_rows(draws):
+    rows = []
+    draw_id, year = 0, None
+    for total_id, (draw_date, nums) in enumerate(draws, 1):
+        draw_id = draw_id + 1 if draw_date.year == year else 1
+        year = draw_date.year
+        rows.append({
+            'total_id': total_id, 'year': str(year), 'date': f"{draw_date.month}月{draw_date.day}日",
+            'draw_id': draw_id, 'nums': list(nums), 'record_date': draw_date.isoformat(),
+        })
+    return rows
+
+# 回補主流程：以 max_workers 個執行緒一批一批抓分頁，直到某批出現空白頁或沒有任何新日期為止
+def backfill_history(csv_path, url_template=DEFAULT_URL_TEMPLATE, max_pages=500, max_workers=4,
+                     rate=2.0, cache_dir=None, session=None, progress=None):
+    cache_dir = cache_dir or f"{csv_path}.backfill"
+    os.makedirs(cache_dir, exist_ok=True)
+    session = session or create_session(pool_size=max_workers)
+    limiter = HostRateLimiter(rate)
+
+    fetched = []
+    seen_dates = set()
+    page = 1
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        while page <= max_pages:
+            urls = [url_template.format(page=p) for p in range(page, min(page + max_workers, max_pages + 1))]
+            results = list(pool.map(lambda u: fetch_history_page(u, session, limiter, cache_dir), urls))
+            page += len(urls)
+
+            new_dates = 0
+            for rows in results:
+                for draw_date, nums in rows:
+                    if draw_date.date() not in seen_dates:
+                        seen_dates.add(draw_date.date())
+                        new_dates += 1
+                fetched.extend(rows)
+            if progress:
+                progress(page - 1, len(seen_dates))
+            if new_dates == 0 or not all(results):
+                break
+
+    # 讀既有紀錄到整檔重寫之間持有 CSV 寫入鎖，期間線上更新附加的資料不會被覆蓋掉
+    with csv_lock(csv_path):
+        existing = [(datetime.fromisoformat(r['record_date']), r['nums']) for r in read_all_records(csv_path)]
+        draws = merge_draws(existing, fetched)
+        if draws:
+            write_rows_atomic(csv_path, build_csv_rows(draws))
+    clear_page_cache(cache_dir)
+    return len(existing), len(draws)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="回補 539 歷史開獎資料")
+    parser.add_argument('--csv', default=CSV_FILE, help="要補齊的 CSV 檔")
+    parser.add_argument('--url-template', default=DEFAULT_URL_TEMPLATE, help="分頁網址，{page} 代入頁碼")
+    parser.add_argument('--max-pages', type=int, default=500)
+    parser.add_argument('--workers', type=int, default=4, help="同時抓取的執行緒數")
+    parser.add_argument('--rate', type=float, default=2.0, help="每個主機每秒最多請求數")
+    parser.add_argument('--cache-dir', default=None, help="分頁快取目錄 (預設為 <csv>.backfill)")
+    args = parser.parse_args(argv)
+
+    before, after = backfill_history(
+        args.csv, args.url_template, args.max_pages, args.workers, args.rate, args.cache_dir,
+        progress=lambda pages, dates: print(f"已處理 {pages} 頁，共 {dates} 期", flush=True)
+    )
+    print(f"完成：{before} 期 → {after} 期")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,288 @@
+import argparse
+import gc
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+from .combos import (
+    build_combinations, build_combo_features, build_combo_history, calc_rule_points, rank_combinations
+)
+from .csvstore import STD_HEADER
+from .data import load_draw_store, read_draw_store
+from .indexes import (
+    build_cum_counts, build_hit_matrix, build_number_bitsets, calc_co_matrix, calc_gap_stats,
+    calc_heatmap_bins, calc_heatmap_cells, calc_skips, query_subset, window_counts
+)
+from .ktuples import KTupleCounter, top_ktuples
+from .montecarlo import evaluate_strategies
+from .scoring import BACKTEST_STRATEGIES, backtest_hits, recommend_numbers
+
+# ==========================================
+# 效能基準測試：以固定亂數種子產生 539 格式的合成 CSV (10³ ~ 10⁷ 期)，
+# 對每個計算區塊量測牆鐘時間與記憶體峰值並輸出 JSON；compare 模式比對兩份結果，標出退步的項目
+# 例：python -m lotto539.bench run --sizes 1000 100000 -o base.json
+#     python -m lotto539.bench compare base.json new.json
+# ==========================================
+
+DEFAULT_SIZES = (1_000, 10_000, 100_000, 1_000_000)
+DEFAULT_SEED = 539
+
+# 與實際檔案相同：球號欄名中間是不換行空白 (U+00A0)，後面接著 出牌次數 / 數字 等統計殘欄
+SYNTHETIC_HEADER = STD_HEADER.replace('球號 ', '球號\u00a0')
+
+# 開獎日曆：以 2007 年 (1/1 為週一) 的週一到週六為範本，每年 313 期；
+# 10⁷ 期會超過西元 9999 年，所以年份直接用整數往上加，不經過 datetime
+def _draw_calendar():
+    start = date(2007, 1, 1)
+    days = (start + timedelta(days=i) for i in range(365))
+    return [f"{d.month}月{d.day}日" for d in days if d.weekday() != 6]
+
+# 產生 n_draws 期的合成 CSV：每期 5 個不重複號碼，總期數連續，期數每年從 1 起算
+def generate_synthetic_csv(path, n_draws, seed=DEFAULT_SEED, chunk_size=100_000):
+    rng = np.random.default_rng(seed)
+    calendar = _draw_calendar()
+    per_year = len(calendar)
+    with open(path, 'w', encoding='utf-8-sig', newline='') as f:
+        f.write(SYNTHETIC_HEADER + '\r\n')
+        for start in range(0, n_draws, chunk_size):
+            size = min(chunk_size, n_draws - start)
+            draws = np.sort(np.argsort(rng.random((size, 39)), axis=1)[:, :5] + 1, axis=1)
+            junk = [',,,,,,'] * size
+            if start == 0:
+                # 前 39 列的統計殘欄：號碼、出牌次數、空白、依次數排序的號碼與次數 (內容不影響解析)
+                counts = np.bincount(draws.ravel(), minlength=40)[1:]
+                order = np.argsort(-counts, kind='stable')
+                for i in range(min(39, size)):
+                    junk[i] = f",,{i + 1},{counts[i]},,{order[i] + 1},{counts[order[i]]}"
+            lines = []
+            for i, nums in enumerate(draws.tolist()):
+                idx = start + i
+                lines.append(
+                    f"{idx + 1},{2007 + idx // per_year},{calendar[idx % per_year]},{idx % per_year + 1},"
+                    f"{nums[0]},{nums[1]},{nums[2]},{nums[3]},{nums[4]}{junk[i]}\r\n"
+                )
+            f.write(''.join(lines))
+    return path
+
+# 取得 (必要時產生) 指定期數的合成 CSV；同樣的期數與種子產生的內容完全相同，可重複使用
+def synthetic_csv_path(data_dir, n_draws, seed=DEFAULT_SEED):
+    path = os.path.join(data_dir, f"synthetic_{n_draws}_{seed}.csv")
+    if not os.path.exists(path):
+        tmp_path = f"{path}.tmp"
+        generate_synthetic_csv(tmp_path, n_draws, seed)
+        os.replace(tmp_path, path)
+    return path
+
+# 每個量測項目只計算 app 每次重跑時實際會做的那一段，前置資料 (ctx) 不列入計時
+def _bench_load_csv(ctx):
+    read_draw_store(ctx['path'])
+
+def _bench_load_cache(ctx):
+    load_draw_store(ctx['path'])
+
+def _bench_hit_matrix(ctx):
+    build_hit_matrix(ctx['draws'])
+
+def _bench_bitsets(ctx):
+    build_number_bitsets(ctx['hits'])
+
+def _bench_cum_counts(ctx):
+    build_cum_counts(ctx['hits'])
+
+# tab1 健檢：遺漏、近 30 期次數 (累積次數相減)，加上整組號碼的歷史同期查詢
+def _bench_health_check(ctx):
+    hits = ctx['hits']
+    calc_skips(hits)
+    window_counts(ctx['cum'], 30)
+    query_subset(hits, ctx['bitsets'], ctx['ticket'])
+
+def _bench_recommend(ctx):
+    hits = ctx['hits']
+    recommend_numbers(hits, calc_skips(hits), 1.0, 1.0)
+
+def _bench_co_matrix(ctx):
+    calc_co_matrix(ctx['hits'])
+
+def _bench_gap_stats(ctx):
+    calc_gap_stats(ctx['hits'])
+
+# tab3 棋盤熱力圖：近 150 期逐期，加上全歷史分段成 150 格
+def _bench_heatmap(ctx):
+    calc_heatmap_cells(ctx['draws'][-150:])
+    calc_heatmap_bins(ctx['hits'], -(-len(ctx['hits']) // 150))
+
+# tab1 全組合排行：575,757 組的資料相關特徵、規則得分與前 20 名 (組合陣列本身與資料無關，不計時)
+def _bench_combo_rank(ctx):
+    combos, features = ctx['combos']
+    recent = window_counts(ctx['cum'], 30)
+    history = build_combo_history(combos, recent, 5, ctx['draws'])
+    points = calc_rule_points(features, history)
+    rank_combinations(points, history, features, {'sum': 1, 'odd': 1, 'hot': 1, 'history': 1}, 20)
+
+def _bench_backtest(ctx):
+    for strategy in BACKTEST_STRATEGIES:
+        backtest_hits(ctx['hits'], strategy, 30)
+
+def _bench_ktuples(ctx):
+    counter = KTupleCounter((2, 3, 4)).extend(ctx['draws'])
+    top_ktuples(counter.snapshot(4), 4, 50, 2)
+
+# 300 期 × 3,334 趟 ≈ 100 萬張隨機彩券，在目前的 process 執行以免量到開 pool 的成本
+def _bench_montecarlo(ctx):
+    evaluate_strategies(ctx['hits'], BACKTEST_STRATEGIES, 30, 300, 3_334, max_workers=1, cum=ctx['cum'])
+
+BENCH_CASES = {
+    'load_csv': _bench_load_csv,
+    'load_cache': _bench_load_cache,
+    'hit_matrix': _bench_hit_matrix,
+    'bitsets': _bench_bitsets,
+    'cum_counts': _bench_cum_counts,
+    'health_check': _bench_health_check,
+    'recommend': _bench_recommend,
+    'co_matrix': _bench_co_matrix,
+    'gap_stats': _bench_gap_stats,
+    'heatmap': _bench_heatmap,
+    'combo_rank': _bench_combo_rank,
+    'backtest': _bench_backtest,
+    'ktuples': _bench_ktuples,
+    'montecarlo': _bench_montecarlo,
+}
+
+def _prepare_context(path, seed):
+    # 第一次載入會寫好二進位快取，load_cache 量到的是之後每次載入的成本
+    draws = load_draw_store(path).balls
+    hits = build_hit_matrix(draws)
+    ticket = sorted(np.random.default_rng(seed).choice(np.arange(1, 40), 5, replace=False).tolist())
+    return {
+        'path': path, 'draws': draws, 'hits': hits, 'bitsets': build_number_bitsets(hits),
+        'cum': build_cum_counts(hits), 'ticket': ticket,
+    }
+
+# 量測一個項目：取 repeat 次中最快的牆鐘時間，另外以 tracemalloc 跑一次記錄記憶體峰值
+# (numpy 的陣列配置也會回報給 tracemalloc)
+def measure(func, ctx, repeat=3):
+    wall_times = []
+    for _ in range(repeat):
+        gc.collect()
+        started = time.perf_counter()
+        func(ctx)
+        wall_times.append(time.perf_counter() - started)
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        func(ctx)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {'wall_s': round(min(wall_times), 6), 'peak_mb': round(peak / 2**20, 3)}
+
+def run_benchmarks(sizes=DEFAULT_SIZES, cases=None, repeat=3, seed=DEFAULT_SEED, data_dir=None, progress=None):
+    data_dir = data_dir or os.path.join(tempfile.gettempdir(), 'lotto539-bench')
+    os.makedirs(data_dir, exist_ok=True)
+    cases = list(cases or BENCH_CASES)
+
+    # 全組合陣列與資料量無關，只建一次
+    combos = None
+    if 'combo_rank' in cases:
+        combos = build_combinations()
+        combos = (combos, build_combo_features(combos))
+
+    results = []
+    for size in sizes:
+        ctx = _prepare_context(synthetic_csv_path(data_dir, size, seed), seed)
+        ctx['combos'] = combos
+        for name in cases:
+            result = {'case': name, 'size': size, **measure(BENCH_CASES[name], ctx, repeat)}
+            results.append(result)
+            if progress:
+                progress(result)
+        del ctx
+    return {
+        'meta': {
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'seed': seed,
+            'repeat': repeat,
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+        },
+        'results': results,
+    }
+
+# 比對兩份結果：時間或記憶體超過基準 × threshold 視為退步；
+# 太短的時間 (min_seconds 以下) 量測雜訊大，不判定時間退步
+def compare_results(baseline, current, threshold=1.25, min_seconds=0.005):
+    base = {(r['case'], r['size']): r for r in baseline['results']}
+    rows = []
+    for r in current['results']:
+        old = base.get((r['case'], r['size']))
+        if old is None:
+            continue
+        wall_ratio = r['wall_s'] / old['wall_s'] if old['wall_s'] else float('inf')
+        peak_ratio = r['peak_mb'] / old['peak_mb'] if old['peak_mb'] else 1.0
+        wall_regressed = wall_ratio > threshold and r['wall_s'] >= min_seconds
+        rows.append({
+            'case': r['case'], 'size': r['size'],
+            'wall_s': r['wall_s'], 'base_wall_s': old['wall_s'], 'wall_ratio': round(wall_ratio, 3),
+            'peak_mb': r['peak_mb'], 'base_peak_mb': old['peak_mb'], 'peak_ratio': round(peak_ratio, 3),
+            'regressed': bool(wall_regressed or peak_ratio > threshold),
+        })
+    return rows
+
+def _format_result(r):
+    return f"{r['case']:<14}{r['size']:>10,}  {r['wall_s'] * 1000:>10.2f} ms  {r['peak_mb']:>9.2f} MB"
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m lotto539.bench', description="539 計算效能基準測試")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p = sub.add_parser('run', help="產生合成資料並量測")
+    p.add_argument('--sizes', type=int, nargs='+', default=list(DEFAULT_SIZES), help="資料期數 (可到 10000000)")
+    p.add_argument('--cases', nargs='+', choices=list(BENCH_CASES), default=None, help="只量測這些項目")
+    p.add_argument('--repeat', type=int, default=3)
+    p.add_argument('--seed', type=int, default=DEFAULT_SEED)
+    p.add_argument('--data-dir', default=None, help="合成 CSV 存放目錄 (預設在系統暫存目錄)")
+    p.add_argument('-o', '--output', default='bench_results.json')
+
+    p = sub.add_parser('compare', help="比對兩份結果並標出退步")
+    p.add_argument('baseline')
+    p.add_argument('current')
+    p.add_argument('--threshold', type=float, default=1.25, help="超過基準幾倍視為退步")
+    p.add_argument('--min-seconds', type=float, default=0.005, help="低於此時間不判定時間退步")
+    args = parser.parse_args(argv)
+
+    if args.command == 'run':
+        report = run_benchmarks(
+            args.sizes, args.cases, args.repeat, args.seed, args.data_dir,
+            progress=lambda r: print(_format_result(r), flush=True)
+        )
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"結果已寫入 {args.output}")
+        return 0
+
+    with open(args.baseline, encoding='utf-8') as f:
+        baseline = json.load(f)
+    with open(args.current, encoding='utf-8') as f:
+        current = json.load(f)
+    rows = compare_results(baseline, current, args.threshold, args.min_seconds)
+    for r in rows:
+        flag = "⚠️ 退步" if r['regressed'] else ""
+        print(f"{r['case']:<14}{r['size']:>10,}  時間 ×{r['wall_ratio']:<7} 記憶體 ×{r['peak_ratio']:<7} {flag}")
+    regressions = sum(r['regressed'] for r in rows)
+    print(f"共 {len(rows)} 項，{regressions} 項退步")
+    return 1 if regressions else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,202 @@
+import argparse
+import json
+import sys
+
+from .csvstore import CSV_FILE
+
+# ==========================================
+# 命令列介面：不開 Streamlit 也能查詢統計、推薦、回測與線上更新
+# 例：python -m lotto539 recommend --w-friend 1.5 --json
+# pandas 等較重的模組在子命令真正執行時才載入
+# ==========================================
+
+def _load(csv_path):
+    from .data import load_draw_store
+    from .indexes import build_hit_matrix
+
+    store = load_draw_store(csv_path)
+    if len(store) == 0:
+        raise SystemExit(f"{csv_path} 沒有可用的開獎資料")
+    return store, build_hit_matrix(store.balls)
+
+def cmd_summary(args):
+    from .indexes import build_cum_counts, calc_skips, window_counts
+
+    store, hits = _load(args.csv)
+    # --as-of：以第 N 期結束時的狀態回答 (只看前 N 期)
+    as_of = min(args.as_of or len(store), len(store))
+    skips = calc_skips(hits[:as_of])
+    recent = window_counts(build_cum_counts(hits), args.window, as_of)
+    return {
+        '總期數': as_of,
+        '最新一期': f"{store.years[as_of - 1]}/{store.date_label(as_of - 1)}",
+        '最新號碼': store.balls[as_of - 1].tolist(),
+        f'近{args.window}期最熱': [int(n) for n in (-recent[1:]).argsort(kind='stable')[:5] + 1],
+        '遺漏最久': [int(n) for n in (-skips[1:]).argsort(kind='stable')[:5] + 1],
+    }
+
+def cmd_gaps(args):
+    from .indexes import build_year_offsets, calc_gap_stats, select_row_ranges, take_row_ranges
+
+    store, hits = _load(args.csv)
+    row_ranges = select_row_ranges(
+        build_year_offsets(store.years), store.dates,
+        [str(y) for y in args.years or ()], args.date_from, args.date_to
+    )
+    stats, _, _ = calc_gap_stats(take_row_ranges(hits, row_ranges))
+    return stats.round(2).reset_index()
+
+def cmd_cooccur(args):
+    import numpy as np
+    import pandas as pd
+
+    from .indexes import calc_co_matrix
+
+    _, hits = _load(args.csv)
+    co_matrix, lift_matrix = calc_co_matrix(hits, args.window)
+    a, b = np.triu_indices(40, k=1)
+    keep = (a >= 1) & (co_matrix[a, b] > 0)
+    a, b = a[keep], b[keep]
+    pairs = pd.DataFrame({
+        '號碼A': a, '號碼B': b, '次數': co_matrix[a, b], 'Lift': lift_matrix[a, b].round(3),
+    })
+    sort_col = '次數' if args.metric == 'count' else 'Lift'
+    return pairs.sort_values([sort_col, '號碼A', '號碼B'], ascending=[False, True, True]).head(args.top)
+
+def cmd_tuples(args):
+    import pandas as pd
+
+    from .ktuples import KTupleCounter, top_ktuples
+
+    store, _ = _load(args.csv)
+    draws = store.balls
+    if args.window:
+        draws = draws[-args.window:]
+    snapshot = KTupleCounter((args.k,)).extend(draws).snapshot(args.k)
+    top = top_ktuples(snapshot, args.k, args.top or None, args.min_count, args.sort, args.include or ())
+    return pd.DataFrame({
+        '號碼組合': [" ".join(str(n) for n in row) for row in top['numbers']],
+        '次數': top['count'],
+        '支持度': top['support'].round(5),
+        'Lift': top['lift'].round(3),
+        '最近開出 (期前)': len(draws) - 1 - top['last_seen'],
+    })
+
+def cmd_recommend(args):
+    from .indexes import calc_skips
+    from .scoring import recommend_numbers
+
+    _, hits = _load(args.csv)
+    top_picks, scores = recommend_numbers(hits, calc_skips(hits), args.w_friend, args.w_miss, args.lag)
+    return {'推薦號碼': top_picks, '分數': {int(n): float(scores[n]) for n in top_picks}}
+
+def cmd_backtest(args):
+    import numpy as np
+
+    from .scoring import backtest_hits
+
+    _, hits = _load(args.csv)
+    win_history, _ = backtest_hits(hits, args.strategy, args.lookback, args.periods)
+    return {
+        '策略': args.strategy,
+        '參考期數': args.lookback,
+        '期數': len(win_history),
+        '各星數期數': {f"{k}星": int(v) for k, v in enumerate(np.bincount(win_history, minlength=6))},
+        '平均星數': round(float(win_history.mean()), 4) if len(win_history) else None,
+    }
+
+def cmd_significance(args):
+    import pandas as pd
+
+    from .montecarlo import evaluate_strategies
+    from .scoring import BACKTEST_STRATEGIES
+
+    _, hits = _load(args.csv)
+    rows, _, _ = evaluate_strategies(
+        hits, BACKTEST_STRATEGIES, args.lookback, args.periods, args.trials, args.seed, max_workers=args.workers
+    )
+    return pd.DataFrame(rows)
+
+def cmd_update(args):
+    from .updater import update_from_web
+
+    return {'訊息': update_from_web(args.csv)}
+
+def _print_result(result, as_json):
+    if hasattr(result, 'to_dict'):
+        if as_json:
+            print(result.to_json(orient='records', force_ascii=False))
+        else:
+            print(result.to_string(index=False))
+        return
+    if as_json:
+        print(json.dumps(result, ensure_ascii=False))
+    else:
+        for key, value in result.items():
+            print(f"{key}: {value}")
+
+def build_parser():
+    from .scoring import BACKTEST_STRATEGIES
+
+    parser = argparse.ArgumentParser(prog='python -m lotto539', description="539 數據分析命令列工具")
+    parser.add_argument('--csv', default=CSV_FILE, help="開獎資料 CSV")
+    parser.add_argument('--json', action='store_true', help="以 JSON 輸出")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p = sub.add_parser('summary', help="資料概況與近期冷熱")
+    p.add_argument('--window', type=int, default=30, help="近期熱門的統計期數")
+    p.add_argument('--as-of', type=int, default=None, help="只看前 N 期 (預設全部)")
+    p.set_defaults(func=cmd_summary)
+
+    p = sub.add_parser('gaps', help="各號碼遺漏統計")
+    p.add_argument('--years', type=int, nargs='*', help="只統計這些年份 (預設全部)")
+    p.add_argument('--from', dest='date_from', default=None, help="起始日期 YYYY-MM-DD")
+    p.add_argument('--to', dest='date_to', default=None, help="結束日期 YYYY-MM-DD (含當天)")
+    p.set_defaults(func=cmd_gaps)
+
+    p = sub.add_parser('cooccur', help="同期開出的號碼組合")
+    p.add_argument('--window', type=int, default=None, help="最近幾期 (預設全部)")
+    p.add_argument('--metric', choices=['count', 'lift'], default='count')
+    p.add_argument('--top', type=int, default=20)
+    p.set_defaults(func=cmd_cooccur)
+
+    p = sub.add_parser('tuples', help="最常一起開出的 k 碼組合")
+    p.add_argument('--k', type=int, choices=[2, 3, 4, 5], default=3, help="組合大小")
+    p.add_argument('--window', type=int, default=None, help="最近幾期 (預設全部)")
+    p.add_argument('--sort', choices=['count', 'lift'], default='count')
+    p.add_argument('--min-count', type=int, default=1, help="至少出現幾次")
+    p.add_argument('--top', type=int, default=50, help="列出幾組 (0 為全部)")
+    p.add_argument('--include', type=int, nargs='*', help="一定要包含的號碼")
+    p.set_defaults(func=cmd_tuples)
+
+    p = sub.add_parser('recommend', help="電腦推薦號碼")
+    p.add_argument('--w-friend', type=float, default=1.0, help="好朋友權重")
+    p.add_argument('--w-miss', type=float, default=1.0, help="冷門權重")
+    p.add_argument('--lag', type=int, default=1, help="拖牌間隔期數")
+    p.set_defaults(func=cmd_recommend)
+
+    p = sub.add_parser('backtest', help="策略回測")
+    p.add_argument('--strategy', choices=BACKTEST_STRATEGIES, default=BACKTEST_STRATEGIES[0])
+    p.add_argument('--lookback', type=int, default=30, help="參考期數")
+    p.add_argument('--periods', type=int, default=None, help="回測最近幾期 (預設全歷史)")
+    p.set_defaults(func=cmd_backtest)
+
+    p = sub.add_parser('significance', help="蒙地卡羅檢定各回測策略是否勝過隨機選號")
+    p.add_argument('--lookback', type=int, default=30, help="參考期數")
+    p.add_argument('--periods', type=int, default=None, help="回測最近幾期 (預設全歷史)")
+    p.add_argument('--trials', type=int, default=10_000, help="模擬趟數")
+    p.add_argument('--seed', type=int, default=0, help="亂數種子")
+    p.add_argument('--workers', type=int, default=None, help="process 數 (預設為核心數)")
+    p.set_defaults(func=cmd_significance)
+
+    p = sub.add_parser('update', help="從網路抓最新開獎並附加到 CSV")
+    p.set_defaults(func=cmd_update)
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    _print_result(args.func(args), args.json)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,106 @@
+import itertools
+from math import comb
+
+import numpy as np
+
+# ==========================================
+# 全組合評分：把 C(39, 5) = 575,757 組號碼一次建成 uint8 陣列，以 號碼健檢 的規則整批評分後取前 k 名
+# 組合依 colex 順序排列，第 r 列就是組合排名 r，歷史開出的號碼組換算成排名即可直接查表
+# ==========================================
+
+MAX_NUMBER = 39
+TICKET_SIZE = 5
+COMBO_COUNT = comb(MAX_NUMBER, TICKET_SIZE)
+
+# 二項式係數表：_BINOM[n, k] = C(n, k)
+_BINOM = np.array([[comb(n, k) for k in range(TICKET_SIZE + 1)] for n in range(MAX_NUMBER + 1)], dtype=np.int64)
+
+# 組合排名 (colex)：combos 為 (M, k) 由小到大排好的號碼 (1~39)，回傳 0 ~ C(39, k) - 1
+def combo_rank(combos):
+    combos = np.asarray(combos, dtype=np.int64) - 1
+    k = combos.shape[-1]
+    return _BINOM[combos, np.arange(1, k + 1)].sum(axis=-1)
+
+# 全部 k 個號碼的組合 (uint8)，第 r 列的組合排名為 r
+def build_combinations(k=TICKET_SIZE):
+    combos = np.fromiter(
+        itertools.chain.from_iterable(itertools.combinations(range(1, MAX_NUMBER + 1), k)),
+        dtype=np.uint8, count=comb(MAX_NUMBER, k) * k
+    ).reshape(-1, k)
+    return combos[np.argsort(combo_rank(combos), kind='stable')]
+
+# 與資料無關的組合特徵，全部連線共用：總和、單數個數、是否有連號、39 位元的號碼遮罩
+def build_combo_features(combos):
+    wide = combos.astype(np.int64)
+    return {
+        'sum': wide.sum(axis=1).astype(np.uint16),
+        'odd': (wide % 2).sum(axis=1).astype(np.uint8),
+        'consecutive': (np.diff(wide, axis=1) == 1).any(axis=1),
+        'mask': np.bitwise_or.reduce(np.left_shift(np.uint64(1), wide.astype(np.uint64)), axis=1),
+    }
+
+# 把號碼清單轉成 39 位元遮罩
+def numbers_mask(nums):
+    mask = 0
+    for n in nums:
+        mask |= 1 << int(n)
+    return np.uint64(mask)
+
+# 與資料有關的組合特徵：近期熱號個數、5 個號碼近期次數合計、歷史頭獎次數
+# recent_freq 為 (40,) 各號近期次數，draws 為歷史 (N, 5) 號碼
+def build_combo_history(combos, recent_freq, hot_threshold, draws):
+    recent_freq = np.asarray(recent_freq)
+    hot = recent_freq >= hot_threshold
+    return {
+        'hot_count': hot[combos].sum(axis=1).astype(np.uint8),
+        'heat': recent_freq[combos].sum(axis=1).astype(np.int32),
+        'jackpots': np.bincount(combo_rank(np.sort(draws, axis=1)), minlength=len(combos)).astype(np.int32),
+    }
+
+# 號碼健檢 的各項規則得分 (與 tab1 單組評分相同)：總和落在區間 ±10、單雙 2:3 或 3:2 ±10、
+# 近期熱號 1~3 個 +10 / 0 或 4 個以上 -5、歷史開出過頭獎 +5
+def calc_rule_points(features, history, sum_band=(80, 120)):
+    in_band = (features['sum'] >= sum_band[0]) & (features['sum'] <= sum_band[1])
+    balanced = (features['odd'] == 2) | (features['odd'] == 3)
+    hot_count = history['hot_count']
+    return {
+        'sum': np.where(in_band, 10, -10).astype(np.int8),
+        'odd': np.where(balanced, 10, -10).astype(np.int8),
+        'hot': np.where((hot_count >= 1) & (hot_count <= 3), 10, -5).astype(np.int8),
+        'history': np.where(history['jackpots'] > 0, 5, 0).astype(np.int8),
+    }
+
+# 依權重加總規則得分後篩選並取前 k 名，回傳 (組合列位置, 分數)
+# weights 為 {規則: 權重}；同分時 5 個號碼近期次數合計高者優先，再依組合排名
+def rank_combinations(points, history, features, weights, k=20, required=(), excluded=(), sum_range=None):
+    score = np.full(len(features['sum']), 60.0)
+    for rule, w in weights.items():
+        if w:
+            score += w * points[rule]
+    np.clip(score, 0, 100, out=score)
+
+    keep = np.ones(len(score), dtype=bool)
+    if required:
+        req = numbers_mask(required)
+        keep &= (features['mask'] & req) == req
+    if excluded:
+        keep &= (features['mask'] & numbers_mask(excluded)) == 0
+    if sum_range is not None:
+        keep &= (features['sum'] >= sum_range[0]) & (features['sum'] <= sum_range[1])
+
+    candidates = np.flatnonzero(keep)
+    heat = history['heat'][candidates]
+    # 分數先換成整數 (精確到 1e-6) 再與近期次數合成一個 int64 排序鍵：分數高者一定在前，同分才比近期次數
+    # 直接用浮點分數乘上倍數時，分數差 0.5 之類的非整數差距會被近期次數的差距蓋過
+    score_units = np.rint(score[candidates] * 1_000_000).astype(np.int64)
+    key = score_units * (int(heat.max(initial=0)) + 1) + heat.astype(np.int64)
+    if k < len(candidates):
+        # 取第 k 大的值為門檻，門檻上的同分組合依排名取，結果不受 partition 演算法影響
+        threshold = np.partition(key, len(key) - k)[len(key) - k]
+        above = np.flatnonzero(key > threshold)
+        ties = np.flatnonzero(key == threshold)[:k - len(above)]
+        picked = np.concatenate([above, ties])
+    else:
+        picked = np.arange(len(candidates))
+    picked = picked[np.lexsort((picked, -key[picked]))]
+    return candidates[picked], score[candidates[picked]]
@@ -0,0 +1,240 @@
+import csv
+import io
+import json
+import os
+import re
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:  # Windows 沒有 fcntl，只做 process 內的互斥
+    fcntl = None
+
+# ==========================================
+# 539_data.csv 的增量寫入：只在檔尾附加新資料，不重寫整個檔案
+# 1. 新資料先寫入 .wal (write-ahead) 並 fsync，再附加到 CSV 並 fsync，最後刪除 .wal
+# 2. 上次中斷留下的 .wal 會在下次寫入前依 CSV 大小判斷重做或略過
+# 3. 最後一筆紀錄另存在 .last.json，下次更新不必解析整個 CSV
+# 4. 所有寫入者 (線上更新、回補) 都持有 csv_lock：process 內以 RLock、跨 process 以 .update.lock 檔案鎖互斥
+# ==========================================
+
+CSV_FILE = '539_data.csv'
+DATE_PATTERN = re.compile(r'(\d{1,2})月(\d{1,2})日')
+BALL_FIELDS = 5
+RECORD_FIELDS = 4 + BALL_FIELDS  # 總期數, 年份, 日期, 期數, 球號 1~5
+STD_HEADER = "總期數,年份,日期,期數,球號 1,球號 2,球號 3,球號 4,球號 5,,出牌次數,,,數字,次數高至低"
+
+def wal_path_for(csv_path):
+    return f"{csv_path}.wal"
+
+def last_record_path_for(csv_path):
+    return f"{csv_path}.last.json"
+
+def lock_path_for(csv_path):
+    return f"{csv_path}.update.lock"
+
+class _CsvLock:
+    __slots__ = ('rlock', 'depth', 'file')
+
+    def __init__(self):
+        self.rlock = threading.RLock()
+        self.depth = 0
+        self.file = None
+
+_csv_locks = {}
+_csv_locks_guard = threading.Lock()
+
+def _lock_for(csv_path):
+    with _csv_locks_guard:
+        return _csv_locks.setdefault(os.path.abspath(csv_path), _CsvLock())
+
+# CSV 寫入鎖：同一個 CSV 同時只有一個寫入者；同一個執行緒可重複進入 (例如先鎖住再呼叫 append_rows)
+# blocking=False 時拿不到鎖 (其他執行緒或其他 process 正在寫) 就 yield False，不等待
+@contextmanager
+def csv_lock(csv_path, blocking=True):
+    lock = _lock_for(csv_path)
+    if not lock.rlock.acquire(blocking=blocking):
+        yield False
+        return
+    try:
+        if lock.depth == 0:
+            f = open(lock_path_for(csv_path), 'a')
+            if fcntl is not None:
+                try:
+                    fcntl.flock(f, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+                except OSError:
+                    f.close()
+                    yield False
+                    return
+            lock.file = f
+        lock.depth += 1
+        try:
+            yield True
+        finally:
+            lock.depth -= 1
+            if lock.depth == 0:
+                if fcntl is not None:
+                    fcntl.flock(lock.file, fcntl.LOCK_UN)
+                lock.file.close()
+                lock.file = None
+    finally:
+        lock.rlock.release()
+
+def _fsync_write(path, data):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+# 解析一行 CSV 紀錄，格式不符 (表頭、空行、殘缺資料) 回傳 None
+def parse_record_line(line):
+    text = line.decode('utf-8-sig', errors='replace').strip()
+    if not text:
+        return None
+    fields = next(csv.reader([text]))
+    if len(fields) < RECORD_FIELDS:
+        return None
+    total_id, year, date_str, draw_id = (f.strip() for f in fields[:4])
+    balls = [f.strip() for f in fields[4:RECORD_FIELDS]]
+    date_match = DATE_PATTERN.fullmatch(date_str)
+    if not (year.isdigit() and date_match and all(b.isdigit() for b in balls)):
+        return None
+    return {
+        'total_id': int(total_id) if total_id.isdigit() else None,
+        'year': year,
+        'date': date_str,
+        'draw_id': int(draw_id) if draw_id.isdigit() else None,
+        'record_date': datetime(int(year), int(date_match.group(1)), int(date_match.group(2))).isoformat(),
+        'nums': balls,
+    }
+
+# 由檔尾往前逐塊讀取，找到最後一筆合法紀錄；同時回傳檔案的換行符號
+def read_tail_record(csv_path, block_size=4096):
+    with open(csv_path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        pos = f.tell()
+        data = b''
+        while pos > 0:
+            step = min(block_size, pos)
+            pos -= step
+            f.seek(pos)
+            data = f.read(step) + data
+            lines = data.split(b'\n')
+            # 還沒讀到檔頭時，第一段可能是被切斷的半行
+            for line in reversed(lines if pos == 0 else lines[1:]):
+                record = parse_record_line(line)
+                if record:
+                    record['newline'] = '\r\n' if line.endswith(b'\r') else '\n'
+                    return record
+            data = lines[0] if pos > 0 else b''
+    return None
+
+def _file_signature(csv_path):
+    stat = os.stat(csv_path)
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+# 取得最後一筆紀錄：.last.json 與 CSV 的大小 / mtime 一致就直接採用，否則讀檔尾重建
+def read_last_record(csv_path):
+    if not os.path.exists(csv_path):
+        return None
+    signature = _file_signature(csv_path)
+    try:
+        with open(last_record_path_for(csv_path), encoding='utf-8') as f:
+            cached = json.load(f)
+        if {k: cached.get(k) for k in signature} == signature:
+            return cached
+    except (OSError, ValueError):
+        pass
+
+    record = read_tail_record(csv_path)
+    if record is not None:
+        record.update(signature)
+        _fsync_write(last_record_path_for(csv_path), json.dumps(record, ensure_ascii=False).encode('utf-8'))
+    return record
+
+def _header_field_count(csv_path):
+    with open(csv_path, 'rb') as f:
+        return len(next(csv.reader([f.readline().decode('utf-8-sig')])))
+
+# 把新資料列轉成與現有檔案相同欄數、相同換行符號的 CSV 文字
+def format_rows(rows, field_count, newline):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator=newline)
+    for row in rows:
+        fields = [row['total_id'], row['year'], row['date'], row['draw_id'], *row['nums']]
+        writer.writerow([str(v) for v in fields] + [''] * max(0, field_count - len(fields)))
+    return buffer.getvalue().encode('utf-8')
+
+# 處理上次中斷的寫入：附加到一半 (比寫入前大、但還沒寫完) 則截回原大小再附加一次
+# 檔案已達原大小 + payload (或更長，之後又有別的附加落地) 代表這次附加已完成，不可截斷，只清掉 .wal
+# CSV 比寫入前還短代表檔案已被其他方式改寫，此時 .wal 已過期，直接丟棄
+def recover_pending_append(csv_path):
+    wal_path = wal_path_for(csv_path)
+    if not os.path.exists(wal_path):
+        return False
+    with open(wal_path, 'rb') as f:
+        header, payload = f.read().split(b'\n', 1)
+    base_size = json.loads(header)['base_size']
+    size = os.path.getsize(csv_path)
+    if base_size <= size < base_size + len(payload):
+        with open(csv_path, 'r+b') as f:
+            f.truncate(base_size)
+            f.seek(base_size)
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+    os.remove(wal_path)
+    return True
+
+# 附加新資料列 (每列為 dict：total_id, year, date, draw_id, nums)，回傳更新後的最後一筆紀錄
+def append_rows(csv_path, rows, last_record=None):
+    with csv_lock(csv_path):
+        recover_pending_append(csv_path)
+        last_record = last_record or read_last_record(csv_path) or {}
+        newline = last_record.get('newline', '\n')
+
+        base_size = os.path.getsize(csv_path)
+        payload = format_rows(rows, _header_field_count(csv_path), newline)
+        with open(csv_path, 'rb') as f:
+            f.seek(max(0, base_size - 1))
+            if base_size > 0 and f.read(1) != b'\n':
+                payload = newline.encode() + payload
+
+        # 先寫 WAL，確保附加到一半當機時能還原
+        wal_header = json.dumps({'base_size': base_size}).encode('utf-8')
+        _fsync_write(wal_path_for(csv_path), wal_header + b'\n' + payload)
+        with open(csv_path, 'ab') as f:
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        os.remove(wal_path_for(csv_path))
+
+        last = rows[-1]
+        record = {
+            'total_id': last['total_id'], 'year': str(last['year']), 'date': last['date'],
+            'draw_id': last['draw_id'], 'record_date': last['record_date'], 'newline': newline,
+            **_file_signature(csv_path),
+        }
+        _fsync_write(last_record_path_for(csv_path), json.dumps(record, ensure_ascii=False).encode('utf-8'))
+        return record
+
+# 逐行讀出 CSV 中所有合法紀錄 (回補歷史時用來合併既有資料)
+def read_all_records(csv_path):
+    if not os.path.exists(csv_path):
+        return []
+    with open(csv_path, 'rb') as f:
+        return [r for r in (parse_record_line(line) for line in f) if r]
+
+# 整檔重寫：寫到暫存檔並 fsync 後再 rename 取代原檔，任何時刻磁碟上都是完整的檔案
+def write_rows_atomic(csv_path, rows, header=STD_HEADER, newline='\r\n'):
+    with csv_lock(csv_path):
+        field_count = len(next(csv.reader([header])))
+        payload = ('\ufeff' + header + newline).encode('utf-8') + format_rows(rows, field_count, newline)
+        _fsync_write(csv_path, payload)
+        for stale in (wal_path_for(csv_path), last_record_path_for(csv_path)):
+            if os.path.exists(stale):
+                os.remove(stale)
@@ -0,0 +1,137 @@
+import numpy as np
+import pandas as pd
+
+from .csvstore import CSV_FILE
+from .datacache import csv_signature, load_column_cache, save_column_cache
+from .store import NUM_COLS, DrawStore
+
+# ==========================================
+# 資料載入與特徵工程
+# CSV 解析成 DataFrame 後轉成精簡的 DrawStore (小整數陣列)，app 與快取都只保留 DrawStore
+# ==========================================
+
+# 欄位對應清洗
+COLUMN_MAP = {
+    '年份': 'Year', '日期': 'Date', '期數': 'Draw_Num',
+    '球號 1': 'N1', '球號 1': 'N1',
+    '球號 2': 'N2', '球號 2': 'N2',
+    '球號 3': 'N3', '球號 3': 'N3',
+    '球號 4': 'N4', '球號 4': 'N4',
+    '球號 5': 'N5', '球號 5': 'N5',
+    '總期數': 'Total_ID'
+}
+
+# 號碼特徵：draws 為 (N, 5) 整數陣列，一次算完所有期數
+def calc_draw_features(draws):
+    draws = np.sort(draws, axis=1)
+    diffs = np.diff(draws, axis=1)
+    tails = np.sort(draws % 10, axis=1)
+    zones = (draws - 1) // 10
+
+    # AC 值：任兩號差值的相異個數 - (號碼數 - 1)
+    i, j = np.triu_indices(draws.shape[1], k=1)
+    pair_diffs = np.sort(draws[:, j] - draws[:, i], axis=1)
+    distinct_diffs = 1 + (np.diff(pair_diffs, axis=1) != 0).sum(axis=1)
+
+    features = {
+        'Sum': draws.sum(axis=1),
+        'Big_Count': (draws >= 20).sum(axis=1),
+        'Odd_Count': (draws % 2 != 0).sum(axis=1),
+        'Has_Consecutive': (diffs == 1).any(axis=1).astype(int),
+        'Span': draws[:, -1] - draws[:, 0],
+        'Tail_Count': 1 + (np.diff(tails, axis=1) != 0).sum(axis=1),
+        'AC': distinct_diffs - (draws.shape[1] - 1),
+    }
+    # 區間分佈：01-10 / 11-20 / 21-30 / 31-39
+    for z in range(4):
+        features[f'Zone{z + 1}'] = (zones == z).sum(axis=1)
+    return features
+
+# 開獎日期：由 年份 與 日期 (「1月5日」，少數閏日寫成「02/ 29」) 組成 datetime64[D] 陣列
+# 原始資料偶有登打錯誤的日期 (例如 2024 年 7/1 排在 7/3 之後)，以列的先後為準取累積最大值，
+# 確保陣列遞增、可以二分搜尋
+# 直接以月份數與天數組出日期，不經過 datetime64[ns] (只到 2262 年)，大型合成資料的年份也不會變成 NaT
+def calc_draw_dates(df):
+    month_day = df['Date'].str.extract(r'(\d{1,2})\s*[月/]\s*(\d{1,2})').astype(float)
+    year = pd.to_numeric(df['Year'], errors='coerce').to_numpy(dtype=float)
+    month, day = month_day[0].to_numpy(), month_day[1].to_numpy()
+    valid = ~np.isnan(year + month + day) & (month >= 1) & (month <= 12) & (day >= 1)
+    months = np.where(valid, (year - 1970) * 12 + month - 1, 0).astype(np.int64).astype('datetime64[M]')
+    dates = months.astype('datetime64[D]') + np.where(valid, day - 1, 0).astype(np.int64)
+    # 不存在的日期 (例如 2 月 30 日) 會跑到下個月，與無法解析的日期一樣沿用前一期
+    dates[~valid | (dates.astype('datetime64[M]') != months)] = np.datetime64('NaT')
+    return np.maximum.accumulate(np.where(np.isnat(dates), np.datetime64('1970-01-01'), dates))
+
+# 讀取 CSV 並清洗欄位，只保留 COLUMN_MAP 對應到的欄位，號碼轉成整數 (不含特徵)
+def _read_draws_frame(csv_path):
+    # 讀取 CSV，確保所有欄位先以字串讀取避免格式跑掉
+    df = pd.read_csv(csv_path, encoding='utf-8', dtype=str)
+
+    clean_cols = {}
+    for c in df.columns:
+        clean_c = c.strip()
+        if clean_c in COLUMN_MAP:
+            clean_cols[c] = COLUMN_MAP[clean_c]
+
+    df = df.rename(columns=clean_cols)
+    # 只保留對應到的欄位，丟掉 出牌次數 / 數字 等統計殘欄與空白欄
+    df = df[[c for c in df.columns if c in COLUMN_MAP.values()]]
+
+    # 確保必要欄位存在，轉換數字
+    for col in NUM_COLS:
+        df[col] = pd.to_numeric(df[col], errors='coerce')
+
+    # 清除無效行
+    df = df.dropna(subset=NUM_COLS)
+    df = df.reset_index(drop=True)
+    df[NUM_COLS] = df[NUM_COLS].to_numpy(dtype=int)
+    return df
+
+# 解析 CSV 並計算特徵，回傳 (df, num_cols)
+def parse_draws_csv(csv_path=CSV_FILE):
+    df = _read_draws_frame(csv_path)
+    # 特徵工程 (整批陣列運算，不逐列 apply)
+    for name, values in calc_draw_features(df[NUM_COLS].to_numpy()).items():
+        df[name] = values
+    return df, list(NUM_COLS)
+
+# 清洗後的 DataFrame 轉成 DrawStore：字串欄位 (年份、日期、期數) 轉成整數，特徵都在 0~255 之間，存成 uint8
+# 年份存成 int32：合成資料到 1,000 萬期時年份會超過 int16 的 32767
+def build_draw_store(df, num_cols=NUM_COLS):
+    balls = np.ascontiguousarray(df[num_cols].to_numpy(dtype=np.uint8))
+    days = calc_draw_dates(df).astype(np.int32)
+    features = {name: values.astype(np.uint8) for name, values in calc_draw_features(balls.astype(np.int16)).items()}
+
+    def small_ints(col, dtype):
+        return pd.to_numeric(df[col], errors='coerce').fillna(0).to_numpy(dtype=dtype)
+
+    return DrawStore(
+        balls, days, small_ints('Year', np.int32), small_ints('Draw_Num', np.int16),
+        small_ints('Total_ID', np.int32), features
+    )
+
+# 直接解析 CSV 成 DrawStore (不經過快取)
+def read_draw_store(csv_path=CSV_FILE):
+    return build_draw_store(_read_draws_frame(csv_path))
+
+# 載入資料：CSV 沒有變動時直接以 memory map 讀二進位快取，免去重新解析與特徵計算
+def load_draw_store(csv_path=CSV_FILE):
+    columns = load_column_cache(csv_path)
+    if columns is not None:
+        return DrawStore.from_columns(columns)
+
+    # 簽章在解析前取：解析途中 CSV 被附加新資料時，這次的結果不會被當成新檔案的快取
+    signature = csv_signature(csv_path)
+    store = read_draw_store(csv_path)
+    try:
+        if not save_column_cache(csv_path, store.to_columns(), signature):
+            return store  # CSV 在解析途中變了，不寫快取，下次載入會重新解析
+    except OSError:
+        return store  # 快取寫不進去 (例如唯讀目錄) 不影響本次載入
+    # 改用剛寫好的快取：與之後的載入一樣是唯讀的 memory map，多個 process 共用同一份 page cache
+    columns = load_column_cache(csv_path)
+    return store if columns is None else DrawStore.from_columns(columns)
+
+# 舊介面：回傳 (DataFrame, num_cols)
+def load_draws(csv_path=CSV_FILE):
+    return load_draw_store(csv_path).to_frame(), list(NUM_COLS)
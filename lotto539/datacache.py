@@ -0,0 +1,134 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+
+import numpy as np
+
+# ==========================================
+# CSV 的二進位欄位快取：每個陣列存成一個 .npy，讀取時以 memory map 開啟
+# CSV 仍是唯一的正本，快取以 CSV 的 mtime / 大小 / SHA-256 判斷是否有效
+# 欄位檔依 CSV 內容雜湊放在各自的子目錄 (generation)，寫好後才整個改名上線、之後不再改寫，
+# 已經 memory map 舊版本的讀者不會讀到新資料；舊的子目錄由 prune_column_cache 清除
+# ==========================================
+
+CACHE_FORMAT = 4
+
+def cache_dir_for(csv_path):
+    return f"{csv_path}.cache"
+
+def file_sha256(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _read_meta(cache_dir):
+    try:
+        with open(os.path.join(cache_dir, 'meta.json'), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+# 暫存檔名帶 process / 執行緒編號，多個連線同時更新 meta 時不會互相覆蓋
+def _write_meta(cache_dir, meta):
+    tmp_path = os.path.join(cache_dir, f"meta.json.{os.getpid()}.{threading.get_ident()}.tmp")
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(meta, f, ensure_ascii=False)
+    os.replace(tmp_path, os.path.join(cache_dir, 'meta.json'))
+
+# 快取有效則回傳 {欄名: 陣列}，否則回傳 None
+# mtime 與大小相同直接採用；只有 mtime 變了 (例如被 touch) 再比對內容雜湊
+def load_column_cache(csv_path):
+    cache_dir = cache_dir_for(csv_path)
+    meta = _read_meta(cache_dir)
+    if meta is None or meta.get('format') != CACHE_FORMAT:
+        return None
+
+    stat = os.stat(csv_path)
+    if (stat.st_mtime_ns, stat.st_size) != (meta['mtime_ns'], meta['size']):
+        if stat.st_size != meta['size'] or file_sha256(csv_path) != meta['sha256']:
+            return None
+        meta['mtime_ns'] = stat.st_mtime_ns
+        _write_meta(cache_dir, meta)
+
+    gen_dir = os.path.join(cache_dir, meta['generation'])
+    try:
+        columns = {
+            name: np.load(os.path.join(gen_dir, f"{i}.npy"), mmap_mode='r')
+            for i, name in enumerate(meta['columns'])
+        }
+    except (OSError, ValueError):
+        return None
+    if any(len(arr) != meta['rows'] for arr in columns.values()):
+        return None
+    return columns
+
+# CSV 的快取簽章 (mtime / 大小 / SHA-256)：要在解析 CSV 之前取，寫快取時才能確認解析的就是這個內容
+def csv_signature(csv_path):
+    stat = os.stat(csv_path)
+    return {'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size, 'sha256': file_sha256(csv_path)}
+
+# 寫入快取：欄位檔先寫進暫存目錄再一次改名成 generation 子目錄，最後才換掉 meta
+# 同內容的 generation 已經存在就直接沿用，不覆寫別人可能正在 memory map 的檔案
+# columns 為 {欄名: 陣列}，各陣列第一維皆為期數；signature 為解析前取的 csv_signature()
+# CSV 在解析途中被改動 (例如線上更新剛好附加新資料) 時不寫入，回傳 False，避免舊資料掛在新檔案的簽章下
+def save_column_cache(csv_path, columns, signature):
+    stat = os.stat(csv_path)
+    if (stat.st_mtime_ns, stat.st_size) != (signature['mtime_ns'], signature['size']):
+        return False
+    cache_dir = cache_dir_for(csv_path)
+    os.makedirs(cache_dir, exist_ok=True)
+    sha256 = signature['sha256']
+    generation = f"{CACHE_FORMAT}-{sha256[:16]}"  # 換格式時不沿用舊格式寫的欄位檔
+    gen_dir = os.path.join(cache_dir, generation)
+
+    if not os.path.isdir(gen_dir):
+        tmp_dir = os.path.join(cache_dir, f"{generation}.{os.getpid()}.{threading.get_ident()}.tmp")
+        os.makedirs(tmp_dir, exist_ok=True)
+        try:
+            for i, values in enumerate(columns.values()):
+                np.save(os.path.join(tmp_dir, f"{i}.npy"), np.ascontiguousarray(values))
+            os.rename(tmp_dir, gen_dir)
+        except OSError:
+            if not os.path.isdir(gen_dir):
+                raise
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)  # 別人先改名成功時，丟掉自己這份
+
+    _write_meta(cache_dir, {
+        'format': CACHE_FORMAT,
+        **signature,
+        'generation': generation,
+        'rows': len(next(iter(columns.values()), ())),
+        'columns': list(columns),
+    })
+    return True
+
+# 陣列若是從快取 memory map 出來的，回傳它所在的 generation，否則回傳 None
+def mapped_generation(arr):
+    filename = getattr(arr, 'filename', None)
+    return os.path.basename(os.path.dirname(filename)) if filename else None
+
+# 刪掉目前 meta 用的以外、也不在 keep 裡的 generation (以及舊格式直接放在快取目錄下的欄位檔)
+# 只應在確定沒有讀者還在用舊版本時呼叫 (DatasetRegistry 退休舊版本時)
+def prune_column_cache(csv_path, keep=()):
+    cache_dir = cache_dir_for(csv_path)
+    meta = _read_meta(cache_dir)
+    keep = set(keep)
+    if meta is not None and meta.get('format') == CACHE_FORMAT:
+        keep.add(meta['generation'])
+    try:
+        entries = list(os.scandir(cache_dir))
+    except OSError:
+        return
+    for entry in entries:
+        if entry.is_dir() and not entry.name.endswith('.tmp') and entry.name not in keep:
+            shutil.rmtree(entry.path, ignore_errors=True)
+        elif entry.is_file() and entry.name.endswith('.npy'):
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
@@ -0,0 +1,95 @@
+import re
+from collections import namedtuple
+from datetime import datetime
+
+import lxml.html
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# ==========================================
+# 開獎網頁抓取：共用連線池、連線 / 讀取逾時、失敗重試、ETag / If-Modified-Since 條件式請求
+# 網址與 session 皆可替換，方便改連本機的替身伺服器測試
+# ==========================================
+
+PILIO_URL = "https://www.pilio.idv.tw/lto539/list539APP.asp"
+DEFAULT_TIMEOUT = (5, 20)  # (連線, 讀取) 秒
+PAGE_ENCODING = 'big5'
+
+DATE_PATTERN = re.compile(r'(\d{4})[/-](\d{1,2})[/-](\d{1,2})')
+
+PageResult = namedtuple('PageResult', ['url', 'not_modified', 'text', 'etag', 'last_modified'])
+
+_session = None
+# 每個網址上次「成功處理」時的驗證標頭，只有呼叫端確認處理完才記錄
+_page_validators = {}
+
+def create_session(pool_size=8, retries=3, backoff=0.5):
+    session = requests.Session()
+    retry = Retry(
+        total=retries, connect=retries, read=retries, backoff_factor=backoff,
+        status_forcelist=(429, 500, 502, 503, 504), allowed_methods=frozenset(['GET', 'HEAD']),
+        respect_retry_after_header=True,
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.headers['User-Agent'] = "Mozilla/5.0"
+    return session
+
+# 整個 process 共用一個 session，重複更新時沿用已建立的連線
+def get_session():
+    global _session
+    if _session is None:
+        _session = create_session()
+    return _session
+
+# 抓取網頁；帶上次記錄的 ETag / Last-Modified，伺服器回 304 時 not_modified 為 True 且不含內文
+def fetch_page(url=PILIO_URL, session=None, timeout=DEFAULT_TIMEOUT, conditional=True):
+    session = session or get_session()
+    headers = {}
+    validators = _page_validators.get(url, {}) if conditional else {}
+    if validators.get('etag'):
+        headers['If-None-Match'] = validators['etag']
+    if validators.get('last_modified'):
+        headers['If-Modified-Since'] = validators['last_modified']
+
+    response = session.get(url, headers=headers, timeout=timeout)
+    if response.status_code == 304:
+        return PageResult(url, True, None, validators.get('etag'), validators.get('last_modified'))
+    response.raise_for_status()
+    return PageResult(
+        url, False, response.content.decode(PAGE_ENCODING, errors='replace'),
+        response.headers.get('ETag'), response.headers.get('Last-Modified')
+    )
+
+def remember_validators(page):
+    if page.etag or page.last_modified:
+        _page_validators[page.url] = {'etag': page.etag, 'last_modified': page.last_modified}
+
+def forget_validators(url=None):
+    if url is None:
+        _page_validators.clear()
+    else:
+        _page_validators.pop(url, None)
+
+# 直接以 XPath 取出「日期 | 號碼」兩欄的資料列，回傳 [(datetime, [5 個號碼字串]), ...]
+def parse_draw_rows(html):
+    if not html or not html.strip():
+        return []
+    tree = lxml.html.fromstring(html)
+    draw_rows = []
+    for tr in tree.xpath("//tr[count(td) = 2][contains(td[1], '/') or contains(td[1], '-')]"):
+        date_cell, nums_cell = (td.text_content() for td in tr.xpath('td'))
+        date_match = DATE_PATTERN.search(date_cell)
+        if not date_match:
+            continue
+        nums = [str(int(n)) for n in nums_cell.replace('，', ',').split(',') if n.strip().isdigit()]
+        if len(nums) != 5:
+            continue
+        try:
+            draw_date = datetime(*(int(g) for g in date_match.groups()))
+        except ValueError:
+            continue
+        draw_rows.append((draw_date, nums))
+    return draw_rows
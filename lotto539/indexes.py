@@ -0,0 +1,185 @@
+import numpy as np
+
+# ==========================================
+# 開出矩陣與其衍生索引：遺漏、近期次數、組合查詢、共現、拖牌
+# 開出矩陣 hits 為 (N, 40) 布林陣列，第 0 欄不使用，直接以號碼當欄位索引
+# ==========================================
+
+# 開出矩陣：hits[i, n] 代表第 i 期是否開出 n 號
+def build_hit_matrix(draws):
+    hits = np.zeros((len(draws), 40), dtype=bool)
+    hits[np.arange(len(draws))[:, None], draws] = True
+    return hits
+
+# 各號碼目前遺漏期數 (以最後一期為準，從未開出則為總期數)
+def calc_skips(hits):
+    total = len(hits)
+    if total == 0:
+        return np.zeros(40, dtype=int)
+    last_hit_pos = (total - 1) - np.argmax(hits[::-1], axis=0)
+    return np.where(hits.any(axis=0), (total - 1) - last_hit_pos, total)
+
+# 各號碼近 N 期出現次數
+def calc_recent_freq(hits, window=30):
+    return hits[-window:].sum(axis=0)
+
+# 累積次數：cum[i, n] = 前 i 期 n 號的開出次數，任一區間 [i, j) 的次數 = cum[j] - cum[i]
+def build_cum_counts(hits):
+    cum = np.zeros((len(hits) + 1, 40), dtype=np.int32)
+    np.cumsum(hits, axis=0, out=cum[1:])
+    return cum
+
+# 區間次數：一次取出 [stop - window, stop) 內每個號碼的開出次數 (第 0 欄不使用)
+# stop 預設為最後一期之後；可傳入陣列一次查多個時間點，回傳 (M, 40)；window 為 None 或超出開頭時從第 0 期算起
+def window_counts(cum, window=None, stop=None):
+    stop = len(cum) - 1 if stop is None else np.asarray(stop)
+    start = 0 if window is None else np.maximum(stop - window, 0)
+    return cum[stop] - cum[start]
+
+# 遺漏引擎：一次算出 39 個號碼在 [start, stop) 範圍內的完整遺漏序列
+# 回傳 (各號碼統計表, 遺漏序列所屬號碼, 遺漏序列)；遺漏值 0 代表連續兩期開出
+def calc_gap_stats(hits, start=0, stop=None):
+    import pandas as pd
+
+    hits = hits[start:stop]
+    total = len(hits)
+    skips = calc_skips(hits)
+
+    # 同號碼相鄰兩次開出的間隔 - 1 即為一段遺漏
+    hit_num, hit_pos = np.nonzero(hits.T)
+    same_num = hit_num[1:] == hit_num[:-1]
+    gap_nums = hit_num[1:][same_num]
+    gaps = np.diff(hit_pos)[same_num] - 1
+
+    # 連開：補上首尾空列後找出每段連續開出的起訖
+    padded = np.zeros((total + 2, 40), dtype=np.int8)
+    padded[1:-1] = hits
+    edges = np.diff(padded, axis=0).T
+    run_num, run_start = np.nonzero(edges == 1)
+    run_len = np.nonzero(edges == -1)[1] - run_start
+    longest_streak = np.zeros(40, dtype=int)
+    np.maximum.at(longest_streak, run_num, run_len)
+
+    grouped = pd.Series(gaps).groupby(gap_nums)
+    gap_count = np.bincount(gap_nums, minlength=40)
+    below_current = np.bincount(gap_nums, weights=gaps < skips[gap_nums], minlength=40)
+
+    stats = pd.DataFrame({
+        '開出次數': hits.sum(axis=0),
+        '目前遺漏': skips,
+        '最大遺漏': np.maximum(grouped.max().reindex(range(40), fill_value=0), skips),
+        '平均遺漏': grouped.mean().reindex(range(40)),
+        '中位遺漏': grouped.quantile(0.5).reindex(range(40)),
+        'P90遺漏': grouped.quantile(0.9).reindex(range(40)),
+        '目前遺漏百分位': np.where(gap_count > 0, below_current / np.maximum(gap_count, 1) * 100, np.nan),
+        '最長連開': longest_streak,
+    }).iloc[1:]
+    stats.index.name = '號碼'
+    return stats, gap_nums, gaps
+
+# 共現矩陣：以開出矩陣相乘一次算出最近 window 期 (None 為全部) 任兩號同期開出次數
+# 回傳 (次數矩陣, Lift 矩陣)；Lift = 同期次數 × 總期數 / (a 開出次數 × b 開出次數)，
+# 再乘上 5×38 / (4×39) 修正「同一期不重複開出」，讓純隨機開獎的 Lift 期望值為 1
+def calc_co_matrix(hits, window=None):
+    if window:
+        hits = hits[-window:]
+    # 以 float64 相乘走 BLAS (整數矩陣乘法沒有 BLAS，百萬期時慢上百倍)；次數在 2^53 以內結果是精確的
+    counts_hits = hits.astype(np.float64)
+    co_matrix = (counts_hits.T @ counts_hits).astype(np.int64)
+    num_counts = np.diag(co_matrix).copy()
+    np.fill_diagonal(co_matrix, 0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        lift_matrix = co_matrix * len(hits) / np.outer(num_counts, num_counts) * (5 * 38) / (4 * 39)
+    return co_matrix, np.nan_to_num(lift_matrix)
+
+# 拖牌矩陣：T[a, b] = 開出 a 的那期之後第 lag 期開出 b 的次數
+def calc_transition_matrix(hits, lag=1):
+    counts_hits = hits.astype(np.float64)  # 與 calc_co_matrix 相同，以 float64 走 BLAS 後轉回整數
+    return (counts_hits[:-lag].T @ counts_hits[lag:]).astype(np.int64)
+
+# 號碼位元索引：每個號碼一列，把開出矩陣的每一期壓成 1 bit
+def build_number_bitsets(hits):
+    return np.packbits(hits.T, axis=1)
+
+# 組合查詢：找出同時包含 nums (1~5 個號碼) 的所有期數
+# 回傳 (符合的列位置, 各號碼在這些期數中同期開出的次數；nums 本身記為 0)
+def query_subset(hits, bitsets, nums):
+    nums = list(nums)
+    if nums:
+        mask = np.bitwise_and.reduce(bitsets[nums], axis=0)
+        rows = np.flatnonzero(np.unpackbits(mask, count=len(hits)))
+    else:
+        rows = np.arange(len(hits))
+    co_freq = hits[rows].sum(axis=0)
+    co_freq[nums] = 0
+    return rows, co_freq
+
+# 棋盤熱力圖 (逐期)：把 (N, 5) 號碼陣列直接攤平成長表，回傳 (期數, 號碼)，期數由 1 起算
+def calc_heatmap_cells(draws):
+    draws = np.asarray(draws)
+    periods = np.repeat(np.arange(1, len(draws) + 1), draws.shape[1])
+    return periods, draws.ravel()
+
+# 棋盤熱力圖 (分段)：每 bucket 期合併成一格，回傳 (各段起始列位置, 各段各號開出次數 (段數, 40))
+# 分段從最後一期往前切，最新的一段一定是完整的，不足 bucket 期的零頭落在最舊的一段
+def calc_heatmap_bins(hits, bucket):
+    total = len(hits)
+    if total == 0:
+        return np.zeros(0, dtype=int), np.zeros((0, 40), dtype=int)
+    starts = np.maximum(np.arange(total, 0, -bucket)[::-1] - bucket, 0)
+    return starts, np.add.reduceat(hits, starts, axis=0, dtype=np.int32)
+
+# 年份索引：資料依時間排序，每個年份都是連續的一段列，回傳 {年份: (起始列, 結束列)}
+def build_year_offsets(years):
+    years = np.asarray(years)
+    if len(years) == 0:
+        return {}
+    change = np.flatnonzero(years[1:] != years[:-1]) + 1
+    starts = np.concatenate([[0], change])
+    stops = np.concatenate([change, [len(years)]])
+    return {str(years[a]): (int(a), int(b)) for a, b in zip(starts, stops)}
+
+# 日期區間 → 列範圍 [start, stop)，包含 start_date 與 end_date 當天；dates 需為遞增的 datetime64[D]
+def date_range_rows(dates, start_date=None, end_date=None):
+    start = 0 if start_date is None else int(np.searchsorted(dates, np.datetime64(start_date, 'D'), 'left'))
+    stop = len(dates) if end_date is None else int(np.searchsorted(dates, np.datetime64(end_date, 'D'), 'right'))
+    return start, max(start, stop)
+
+# 篩選條件 → 排序且不重疊的列範圍清單：選定年份 (空的代表全部) 與日期區間取交集，相鄰的段會合併
+def select_row_ranges(year_offsets, dates, years=(), start_date=None, end_date=None):
+    if years:
+        ranges = sorted(year_offsets[y] for y in years if y in year_offsets)
+    else:
+        ranges = [(0, len(dates))]
+    low, high = date_range_rows(dates, start_date, end_date)
+    merged = []
+    for a, b in ranges:
+        a, b = max(a, low), min(b, high)
+        if a >= b:
+            continue
+        if merged and merged[-1][1] >= a:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], b))
+        else:
+            merged.append((a, b))
+    return merged
+
+# 依列範圍取出資料：只有一段時直接回傳切片 (共用同一塊記憶體，不複製)，跨多段才串接
+def take_row_ranges(arr, ranges):
+    if len(ranges) == 1:
+        a, b = ranges[0]
+        return arr[a:b]
+    if not ranges:
+        return arr[:0]
+    return np.concatenate([arr[a:b] for a, b in ranges])
+
+# 列範圍內最後 window 期的各號次數：直接用全歷史的累積次數逐段相減，不必取出篩選後的資料
+def ranges_window_counts(cum, ranges, window):
+    counts = np.zeros(cum.shape[1], dtype=cum.dtype)
+    remaining = window
+    for a, b in reversed(ranges):
+        if remaining <= 0:
+            break
+        take = min(remaining, b - a)
+        counts += cum[b] - cum[b - take]
+        remaining -= take
+    return counts
@@ -0,0 +1,115 @@
+import threading
+from itertools import combinations
+from math import comb
+
+import numpy as np
+
+from .combos import _BINOM, MAX_NUMBER, TICKET_SIZE, combo_rank
+
+# ==========================================
+# 號碼組合探勘：找出歷史上最常一起開出的 2 ~ 4 碼組合
+# 每期 5 個號碼的所有 k 碼子集換算成組合排名 (colex)，以 np.bincount 一次數完；
+# 次數陣列長度為 C(39, k) (4 碼 82,251 格)，不必把組合逐一放進 Python set / dict
+# 新資料附加到檔尾時只需數新的期數 (KTupleCounter.sync)
+# ==========================================
+
+# 5 個號碼中取 k 個的欄位組合，例如 k=2 為 (0, 1), (0, 2), ...
+def _subset_columns(k):
+    return np.array(list(combinations(range(TICKET_SIZE), k)))
+
+# 每期所有 k 碼子集的組合排名：draws 為 (N, 5) 號碼，回傳 (N, C(5, k))
+def draw_subset_ranks(draws, k):
+    draws = np.sort(np.asarray(draws), axis=1)
+    return combo_rank(draws[:, _subset_columns(k)])
+
+# 組合排名轉回號碼 (colex 反查)，回傳 (M, k) 由小到大的號碼
+def unrank_combinations(ranks, k):
+    ranks = np.array(ranks, dtype=np.int64)
+    numbers = np.empty((len(ranks), k), dtype=np.int64)
+    for i in range(k, 0, -1):
+        n = np.searchsorted(_BINOM[:, i], ranks, side='right') - 1
+        numbers[:, i - 1] = n + 1
+        ranks -= _BINOM[n, i]
+    return numbers
+
+# Lift = 實際同期次數 / 依各號碼出現頻率推估的期望次數，與 calc_co_matrix 的 2 碼 Lift 定義相同
+# 期望次數以不放回抽樣修正：隨機開獎時 k 個號碼同期開出的機率為 C(39-k, 5-k) / C(39, 5)
+def calc_tuple_lift(numbers, counts, n_draws, number_counts):
+    k = numbers.shape[1]
+    together = comb(MAX_NUMBER - k, TICKET_SIZE - k) / comb(MAX_NUMBER, TICKET_SIZE)
+    correction = together / (TICKET_SIZE / MAX_NUMBER) ** k
+    freq = number_counts[numbers] / n_draws
+    with np.errstate(divide='ignore', invalid='ignore'):
+        lift = counts / n_draws / (freq.prod(axis=1) * correction)
+    return np.nan_to_num(lift)
+
+class KTupleCounter:
+    # 各 k 碼組合的出現次數與最近一次開出的列位置；同一個計數器可由多個連線共用
+    def __init__(self, ks=(2, 3, 4)):
+        self.ks = tuple(ks)
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.n_draws = 0
+        self.number_counts = np.zeros(MAX_NUMBER + 1, dtype=np.int64)
+        self.counts = {k: np.zeros(comb(MAX_NUMBER, k), dtype=np.int32) for k in self.ks}
+        self.last_seen = {k: np.full(comb(MAX_NUMBER, k), -1, dtype=np.int64) for k in self.ks}
+        self._tail = None
+
+    def _extend(self, draws):
+        if len(draws) == 0:
+            return
+        rows = np.arange(self.n_draws, self.n_draws + len(draws))
+        self.number_counts += np.bincount(draws.ravel(), minlength=MAX_NUMBER + 1)
+        for k in self.ks:
+            ranks = draw_subset_ranks(draws, k)
+            self.counts[k] += np.bincount(ranks.ravel(), minlength=len(self.counts[k])).astype(np.int32)
+            np.maximum.at(self.last_seen[k], ranks.ravel(), np.repeat(rows, ranks.shape[1]))
+        self.n_draws += len(draws)
+        self._tail = draws[-1].copy()
+
+    # 數入新的期數，回傳 self
+    def extend(self, new_draws):
+        with self._lock:
+            self._extend(np.sort(np.asarray(new_draws), axis=1))
+        return self
+
+    # 與完整的開獎資料同步：前面的期數沒變就只數新附加的部分，否則 (資料被改寫) 全部重數
+    def sync(self, draws):
+        draws = np.sort(np.asarray(draws), axis=1)
+        with self._lock:
+            appended = self.n_draws <= len(draws) and (
+                self.n_draws == 0 or np.array_equal(draws[self.n_draws - 1], self._tail))
+            if not appended:
+                self._reset()
+            self._extend(draws[self.n_draws:])
+        return self
+
+    # 某個 k 目前的計數快照 (複本)，後續 extend 不會影響已取出的結果
+    def snapshot(self, k):
+        with self._lock:
+            return self.counts[k].copy(), self.last_seen[k].copy(), self.n_draws, self.number_counts.copy()
+
+# 由快照取出前 top 名組合 (top 為 None 時全部)：依出現次數 (sort_by='count') 或 Lift 排序，同分依組合排名
+# min_count 篩掉出現次數太少的組合，required 為一定要包含的號碼
+def top_ktuples(snapshot, k, top=50, min_count=1, sort_by='count', required=()):
+    counts, last_seen, n_draws, number_counts = snapshot
+    ranks = np.flatnonzero(counts >= max(min_count, 1))
+    numbers = unrank_combinations(ranks, k)
+    required = set(required)
+    if required:
+        keep = np.isin(numbers, list(required)).sum(axis=1) == len(required)
+        ranks, numbers = ranks[keep], numbers[keep]
+
+    tuple_counts = counts[ranks]
+    lift = calc_tuple_lift(numbers, tuple_counts, n_draws, number_counts)
+    key = tuple_counts if sort_by == 'count' else lift
+    order = np.argsort(-key, kind='stable')[:top]
+    return {
+        'numbers': numbers[order],
+        'count': tuple_counts[order],
+        'support': tuple_counts[order] / max(n_draws, 1),
+        'lift': lift[order],
+        'last_seen': last_seen[ranks[order]],
+    }
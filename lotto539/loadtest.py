@@ -0,0 +1,186 @@
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from .bench import DEFAULT_SEED, synthetic_csv_path
+from .indexes import calc_co_matrix, calc_skips, ranges_window_counts, select_row_ranges
+from .memo import MemoCache, data_version
+from .scoring import recommend_numbers
+from .shared import DatasetRegistry, load_dataset
+
+# ==========================================
+# 多連線負載測試：模擬 N 個連線反覆重跑 app 的主要計算 (篩選、遺漏、近期次數、電腦推薦、關係圖)，
+# 量測所有連線重跑完並保留各自結果後，每個連線多佔的記憶體與重跑延遲
+# shared 模式與 app 相同：資料集向 DatasetRegistry 借用、分析結果以 MemoCache 記憶化；
+# private 模式模擬每個連線各自載入資料、各自計算，作為對照
+# --updates 會在重跑之間改動 CSV 的 mtime，驗證版本切換且連線結束後舊版本都有釋放
+# 記憶體以 tracemalloc 量測，延遲含量測本身的額外成本，只適合兩種模式互相比較
+# 例：python -m lotto539.loadtest --sessions 1 10 50 --reruns 3 --updates 2
+# ==========================================
+
+DEFAULT_SESSIONS = (1, 10, 50)
+# 連線的參數從這些常用值裡挑，與實際使用時多數人停在預設值附近的情況相近
+YEAR_CHOICES = ((), (), (), ('-1',), ('-2', '-1'))
+WINDOW_CHOICES = (30, 30, 50, 100)
+WEIGHT_CHOICES = ((1.0, 1.0), (1.0, 1.0), (1.5, 0.5), (0.5, 1.5))
+CORR_CHOICES = (500, 500, 1000)
+
+def _session_params(rng, year_offsets):
+    years = sorted(year_offsets)
+    pick = YEAR_CHOICES[rng.integers(len(YEAR_CHOICES))]
+    return {
+        'years': tuple(years[int(y)] for y in pick if len(years) >= -int(y)),
+        'window': WINDOW_CHOICES[rng.integers(len(WINDOW_CHOICES))],
+        'weights': WEIGHT_CHOICES[rng.integers(len(WEIGHT_CHOICES))],
+        'corr_window': CORR_CHOICES[rng.integers(len(CORR_CHOICES))],
+    }
+
+# 一個連線在重跑之間保留的東西：亂數、借用憑證與這次重跑的結果
+class SimSession:
+    __slots__ = ('rng', 'lease', 'dataset', 'results')
+
+    def __init__(self, seed):
+        self.rng = np.random.default_rng(seed)
+        self.lease = None
+        self.dataset = None
+        self.results = None
+
+# 與 app 相同的流程：借用共用資料集，篩選與分析都經過記憶化
+def _rerun_shared(session, env):
+    lease = env['registry'].acquire()
+    if session.lease is not None:
+        session.lease.release()
+    session.lease = lease
+    dataset = lease.dataset
+    params = _session_params(session.rng, dataset.year_offsets)
+    memo, version = env['memo'], dataset.version
+
+    def memoized(name, key, func, *args):
+        return memo.get_or_compute(name, version, key, lambda: func(*args))
+
+    ranges = select_row_ranges(dataset.year_offsets, dataset.dates, params['years'])
+    range_key = tuple(ranges)
+    store, hits = memoized('rows', range_key, dataset.take, ranges)
+    skips = memoized('skips', range_key, calc_skips, hits)
+    recent = memoized('recent_freq', (range_key, params['window']),
+                      ranges_window_counts, dataset.cum, ranges, params['window'])
+    full_skips = memoized('skips', (), calc_skips, dataset.hits)
+    picks = memoized('recommend', params['weights'], recommend_numbers, dataset.hits, full_skips, *params['weights'])
+    co = memoized('co_matrix', (range_key, params['corr_window']), calc_co_matrix, hits, params['corr_window'])
+    session.results = (store, hits, skips, recent, picks, co)
+
+# 對照組：每個連線自己載入資料集並重算所有分析
+def _rerun_private(session, env):
+    if session.dataset is None or session.dataset.version != env['version']():
+        session.dataset = load_dataset(env['csv_path'])
+    dataset = session.dataset
+    params = _session_params(session.rng, dataset.year_offsets)
+    ranges = select_row_ranges(dataset.year_offsets, dataset.dates, params['years'])
+    store, hits = dataset.take(ranges)
+    session.results = (
+        store, hits, calc_skips(hits), ranges_window_counts(dataset.cum, ranges, params['window']),
+        recommend_numbers(dataset.hits, calc_skips(dataset.hits), *params['weights']),
+        calc_co_matrix(hits, params['corr_window']),
+    )
+
+def _timed(rerun, session, env):
+    started = time.perf_counter()
+    rerun(session, env)
+    return time.perf_counter() - started
+
+# 模擬 n_sessions 個連線，各重跑 reruns 次 (同一輪的重跑以 threads 個執行緒同時進行)
+def run_load_test(csv_path, n_sessions, mode='shared', reruns=3, threads=4, updates=0, seed=DEFAULT_SEED):
+    env = {'csv_path': csv_path, 'version': lambda: data_version(csv_path)}
+    tracemalloc.start()
+    try:
+        if mode == 'shared':
+            env['memo'] = MemoCache(maxsize=256, max_bytes=256 * 2**20)
+            env['registry'] = DatasetRegistry(csv_path, on_retire=env['memo'].drop_version)
+            env['registry'].acquire().release()
+        rerun = _rerun_shared if mode == 'shared' else _rerun_private
+        baseline = tracemalloc.get_traced_memory()[0]
+
+        sessions = [SimSession(seed + i) for i in range(n_sessions)]
+        update_rounds = set(np.linspace(1, reruns - 1, updates, dtype=int).tolist()) if reruns > 1 else set()
+        latencies = []
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            for r in range(reruns):
+                if r in update_rounds:
+                    # 模擬線上更新：CSV 換了版本，下一輪重跑的連線會借到新版本
+                    stat = os.stat(csv_path)
+                    os.utime(csv_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+                latencies.extend(pool.map(lambda s: _timed(rerun, s, env), sessions))
+
+        retained = tracemalloc.get_traced_memory()[0] - baseline
+    finally:
+        tracemalloc.stop()
+
+    # 連線全部結束後歸還借用，正常情況只剩目前的版本
+    for session in sessions:
+        if session.lease is not None:
+            session.lease.release()
+
+    result = {
+        'mode': mode,
+        'sessions': n_sessions,
+        'reruns': reruns,
+        'updates': len(update_rounds),
+        'retained_mb': round(retained / 2**20, 3),
+        'per_session_kb': round(retained / n_sessions / 1024, 1),
+        'p50_ms': round(float(np.percentile(latencies, 50)) * 1000, 2),
+        'p95_ms': round(float(np.percentile(latencies, 95)) * 1000, 2),
+    }
+    if mode == 'shared':
+        result['live_versions'] = len(env['registry'].stats())
+    return result
+
+def _format_result(r):
+    versions = f"  版本 {r['live_versions']}" if 'live_versions' in r else ""
+    return (f"{r['mode']:<8}{r['sessions']:>6} 連線  保留 {r['retained_mb']:>8.2f} MB  "
+            f"每連線 {r['per_session_kb']:>9.1f} KB  p50 {r['p50_ms']:>8.2f} ms  p95 {r['p95_ms']:>8.2f} ms{versions}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m lotto539.loadtest', description="539 多連線負載測試")
+    parser.add_argument('--csv', default=None, help="開獎資料 CSV (預設產生合成資料)")
+    parser.add_argument('--size', type=int, default=10_000, help="合成資料期數")
+    parser.add_argument('--sessions', type=int, nargs='+', default=list(DEFAULT_SESSIONS), help="同時連線數")
+    parser.add_argument('--modes', nargs='+', choices=['shared', 'private'], default=['shared', 'private'])
+    parser.add_argument('--reruns', type=int, default=3, help="每個連線重跑幾次")
+    parser.add_argument('--threads', type=int, default=4, help="同時重跑的執行緒數")
+    parser.add_argument('--updates', type=int, default=0, help="期間模擬幾次資料更新")
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED)
+    parser.add_argument('-o', '--output', default=None, help="結果另存為 JSON")
+    args = parser.parse_args(argv)
+
+    work_dir = tempfile.mkdtemp(prefix='lotto539-load-')
+    try:
+        source = args.csv or synthetic_csv_path(work_dir, args.size, args.seed)
+        # 在複本上測試，模擬更新時不會動到原本的檔案
+        csv_path = os.path.join(work_dir, 'load.csv')
+        shutil.copyfile(source, csv_path)
+
+        results = []
+        for mode in args.modes:
+            for n in args.sessions:
+                result = run_load_test(csv_path, n, mode, args.reruns, args.threads, args.updates, args.seed)
+                results.append(result)
+                print(_format_result(result), flush=True)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"結果已寫入 {args.output}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
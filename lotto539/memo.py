@@ -0,0 +1,140 @@
+import mmap
+import os
+import sys
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+# ==========================================
+# 分析結果的記憶化快取：以 (分析名稱, 資料版本, 篩選與參數) 為鍵，超過筆數或總位元組上限時淘汰最久沒用到的結果
+# 鍵只放小型值 (版本字串、列範圍、參數)，不像 st.cache_data 每次呼叫都要雜湊整個開出矩陣
+# 資料更新後只丟掉舊版本的結果，其他分析不受影響
+# ==========================================
+
+# 資料版本：CSV 的大小與 mtime，附加或重寫後就會改變；檔案不存在回傳 None
+def data_version(csv_path):
+    try:
+        stat = os.stat(csv_path)
+    except OSError:
+        return None
+    return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+# 快取的 numpy 結果由多個重跑共用，設成唯讀避免被呼叫端就地修改
+def _freeze(value):
+    if isinstance(value, np.ndarray):
+        value.setflags(write=False)
+    elif isinstance(value, tuple):
+        for item in value:
+            _freeze(item)
+    return value
+
+# 陣列的資料是否來自記憶體映射 (二進位快取的欄位)，這類資料在作業系統的頁快取裡，不算進快取大小
+def _is_mapped(arr):
+    base = arr
+    while isinstance(base, np.ndarray):
+        if isinstance(base, np.memmap):
+            return True
+        base = base.base
+    return isinstance(base, mmap.mmap)
+
+# 估計一筆結果佔用的位元組：陣列以 nbytes 計 (檢視也以本身大小計，寧可高估)，容器逐項加總
+def _nbytes(value):
+    if isinstance(value, np.ndarray):
+        return 0 if _is_mapped(value) else value.nbytes
+    if isinstance(value, (tuple, list)):
+        return sys.getsizeof(value) + sum(_nbytes(item) for item in value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(_nbytes(item) for item in value.values())
+    if hasattr(value, 'memory_usage'):
+        # pandas 的 DataFrame / Series
+        return int(np.sum(value.memory_usage(index=True, deep=True)))
+    slots = getattr(type(value), '__slots__', ())
+    if slots:
+        # DrawStore 等以 __slots__ 存放陣列的物件
+        return sys.getsizeof(value) + sum(_nbytes(getattr(value, name, None)) for name in slots)
+    return sys.getsizeof(value)
+
+class MemoCache:
+    # maxsize 是筆數上限，max_bytes 是所有結果合計的位元組上限 (None 表示不限)；只剩一筆時不再淘汰
+    def __init__(self, maxsize=256, max_bytes=256 * 2**20):
+        self.maxsize = maxsize
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._sizes = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def _count(self, name, field):
+        counters = self._stats.setdefault(name, {'hits': 0, 'misses': 0, 'evictions': 0})
+        counters[field] += 1
+
+    def _discard(self, entry_key):
+        del self._entries[entry_key]
+        self._bytes -= self._sizes.pop(entry_key)
+
+    def _over_budget(self):
+        if len(self._entries) > self.maxsize:
+            return True
+        return self.max_bytes is not None and self._bytes > self.max_bytes and len(self._entries) > 1
+
+    # 取得快取結果，沒有就呼叫 compute() 計算並存入；compute 拋出例外時不會存入
+    def get_or_compute(self, name, version, key, compute):
+        entry_key = (name, version, key)
+        with self._lock:
+            if entry_key in self._entries:
+                self._entries.move_to_end(entry_key)
+                self._count(name, 'hits')
+                return self._entries[entry_key]
+            self._count(name, 'misses')
+
+        value = _freeze(compute())
+        size = _nbytes(value)
+        with self._lock:
+            if entry_key in self._entries:
+                # 另一個重跑同時算好了同一筆，換成這次的結果
+                self._discard(entry_key)
+            self._entries[entry_key] = value
+            self._sizes[entry_key] = size
+            self._bytes += size
+            while self._over_budget():
+                evicted = next(iter(self._entries))
+                self._discard(evicted)
+                self._count(evicted[0], 'evictions')
+        return value
+
+    # 丟掉某個版本的結果 (該版本的資料集已沒有人使用時呼叫)，回傳丟掉的筆數
+    def drop_version(self, version):
+        with self._lock:
+            stale = [k for k in self._entries if k[1] == version]
+            for k in stale:
+                self._discard(k)
+        return len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._sizes.clear()
+            self._bytes = 0
+
+    # 所有結果合計的位元組
+    @property
+    def nbytes(self):
+        return self._bytes
+
+    # 各分析的命中 / 未命中 / 淘汰次數、目前筆數與位元組
+    def stats(self):
+        with self._lock:
+            entries, sizes = {}, {}
+            for entry_key, size in self._sizes.items():
+                name = entry_key[0]
+                entries[name] = entries.get(name, 0) + 1
+                sizes[name] = sizes.get(name, 0) + size
+            return {
+                name: {**counters, 'entries': entries.get(name, 0), 'bytes': sizes.get(name, 0)}
+                for name, counters in sorted(self._stats.items())
+            }
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,130 @@
+import os
+from math import comb
+from statistics import NormalDist
+
+import numpy as np
+
+from .combos import COMBO_COUNT, MAX_NUMBER, TICKET_SIZE, build_combinations, build_combo_features
+from .indexes import build_cum_counts
+from .pools import WorkerPool
+from .scoring import backtest_hits
+
+# ==========================================
+# 蒙地卡羅顯著性檢定：大量模擬「每期隨機買一張、隨機開一次獎」的回測成績，當作純靠運氣的虛無分佈，
+# 看 tab4 各策略的成績是否勝過隨機
+# 彩券與開獎都以組合排名 (0 ~ C(39, 5) - 1) 均勻抽樣後查 39 位元遮罩，中幾星就是兩個遮罩 AND 後的位元數
+# 模擬切成固定大小的任務分散到多核心，每個任務的亂數種子由同一個 SeedSequence 衍生，
+# 結果只取決於 seed 與模擬趟數，與核心數無關
+# ==========================================
+
+# 單一任務最多模擬的彩券張數，控制每個 worker 的記憶體用量
+BATCH_TICKETS = 1_000_000
+
+# 位元組 → 位元數的查表
+_BYTE_BITS = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+# uint64 陣列逐元素的位元數；np.bitwise_count 要 NumPy 2.0 以上，舊版改成每個位元組查表相加
+def _popcount_bytes(x):
+    x = np.ascontiguousarray(x, dtype=np.uint64)
+    return _BYTE_BITS[x.view(np.uint8)].reshape(*x.shape, 8).sum(axis=-1, dtype=np.uint8)
+
+popcount = getattr(np, 'bitwise_count', _popcount_bytes)
+
+# 每個 worker 只建一次全組合遮罩表 (在目前的 process 執行時也沿用)
+_worker_state = {}
+
+def _init_worker():
+    if 'masks' not in _worker_state:
+        _worker_state['masks'] = build_combo_features(build_combinations())['mask']
+
+# 模擬 trials 趟、每趟 periods 期，回傳 (每趟 2 星以上期數, 每趟總星數, 所有期的星數分佈)
+def _simulate_task(seed, trials, periods):
+    masks = _worker_state['masks']
+    rng = np.random.default_rng(seed)
+    tickets = masks[rng.integers(0, COMBO_COUNT, size=(trials, periods))]
+    draws = masks[rng.integers(0, COMBO_COUNT, size=(trials, periods))]
+    stars = popcount(tickets & draws)
+    return (
+        (stars >= 2).sum(axis=1, dtype=np.int32),
+        stars.sum(axis=1, dtype=np.int32),
+        np.bincount(stars.ravel(), minlength=TICKET_SIZE + 1),
+    )
+
+def _run_task(task):
+    return _simulate_task(*task)
+
+# 依模擬趟數切成任務，每個任務帶自己的亂數種子
+def build_null_tasks(periods, trials, seed=0):
+    per_task = max(1, BATCH_TICKETS // max(periods, 1))
+    sizes = [min(per_task, trials - start) for start in range(0, trials, per_task)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    return [(s, n, periods) for s, n in zip(seeds, sizes)]
+
+# 模擬虛無分佈；max_workers 為 1 時直接在目前的 process 執行，省下開 pool 的成本
+def simulate_null(periods, trials, seed=0, max_workers=None):
+    tasks = build_null_tasks(periods, trials, seed)
+    max_workers = min(max_workers or os.cpu_count() or 1, len(tasks))
+    if max_workers <= 1:
+        _init_worker()
+        results = [_run_task(task) for task in tasks]
+    else:
+        with WorkerPool(max_workers=max_workers, initializer=_init_worker) as pool:
+            results = list(pool.map(_run_task, tasks))
+    two_plus, stars, star_counts = zip(*results)
+    return {
+        'periods': periods,
+        'two_plus': np.concatenate(two_plus),
+        'stars': np.concatenate(stars),
+        'star_counts': np.sum(star_counts, axis=0),
+    }
+
+# 每期中 k 星的理論機率 (超幾何分佈)，用來核對模擬結果
+def exact_star_probs():
+    return np.array([
+        comb(TICKET_SIZE, k) * comb(MAX_NUMBER - TICKET_SIZE, TICKET_SIZE - k) / COMBO_COUNT
+        for k in range(TICKET_SIZE + 1)
+    ])
+
+# 比例的 Wilson 信賴區間
+def wilson_interval(successes, n, confidence=0.95):
+    if n == 0:
+        return 0.0, 0.0
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    p = successes / n
+    center = (p + z * z / (2 * n)) / (1 + z * z / n)
+    half = z * np.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / (1 + z * z / n)
+    return max(0.0, center - half), min(1.0, center + half)
+
+# 策略成績對虛無分佈的檢定：單尾 p 值 = (1 + 隨機成績 >= 策略成績的趟數) / (1 + 模擬趟數)
+def evaluate_against_null(win_history, null, confidence=0.95):
+    periods = len(win_history)
+    trials = len(null['two_plus'])
+    two_plus = int((win_history >= 2).sum())
+    total_stars = int(win_history.sum())
+    tail = (1 - confidence) / 2
+    ci_low, ci_high = wilson_interval(two_plus, periods, confidence)
+    null_low, null_high = np.quantile(null['two_plus'] / periods, [tail, 1 - tail])
+    return {
+        '期數': periods,
+        '2星+ (%)': round(two_plus / periods * 100, 2),
+        '2星+ 信賴區間 (%)': f"{ci_low * 100:.2f}-{ci_high * 100:.2f}",
+        '隨機 2星+ (%)': round(float(null['two_plus'].mean()) / periods * 100, 2),
+        '隨機 2星+ 範圍 (%)': f"{null_low * 100:.2f}-{null_high * 100:.2f}",
+        'p 值 (2星+)': round((1 + int((null['two_plus'] >= two_plus).sum())) / (1 + trials), 4),
+        '平均星數': round(total_stars / periods, 4),
+        '隨機平均星數': round(float(null['stars'].mean()) / periods, 4),
+        'p 值 (平均星數)': round((1 + int((null['stars'] >= total_stars).sum())) / (1 + trials), 4),
+    }
+
+# 各策略以相同的回測區間對同一份虛無分佈檢定，回傳 (每個策略一列的結果, 各策略每期中幾星, 虛無分佈)
+def evaluate_strategies(hits, strategies, lookback=30, periods=None, trials=10_000, seed=0,
+                        confidence=0.95, max_workers=None, cum=None):
+    if cum is None:
+        cum = build_cum_counts(hits)
+    histories = {s: backtest_hits(hits, s, lookback, periods, cum)[0] for s in strategies}
+    n_periods = len(next(iter(histories.values()), ()))
+    if n_periods == 0:
+        return [], histories, None
+    null = simulate_null(n_periods, trials, seed, max_workers)
+    rows = [{'策略': s, **evaluate_against_null(h, null, confidence)} for s, h in histories.items()]
+    return rows, histories, null
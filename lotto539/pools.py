@@ -0,0 +1,34 @@
+import multiprocessing
+import sys
+import threading
+import types
+from concurrent.futures import ProcessPoolExecutor
+
+# ==========================================
+# 多核心運算用的 process pool
+# Streamlit 伺服器是多執行緒的，直接 fork 的 worker 可能繼承到其他執行緒正握著的鎖而卡死，
+# 所以以 forkserver 啟動 worker (不支援的平台退回 spawn)
+# 這兩種方式會在 worker 裡重新執行主程式，而 Streamlit 把 app.py 登記成 __main__；
+# 啟動 worker 的期間暫時換上空的 __main__，worker 只載入任務所在的 lotto539 模組
+# ==========================================
+
+_main_lock = threading.Lock()
+
+def pool_context():
+    method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+    return multiprocessing.get_context(method)
+
+class WorkerPool(ProcessPoolExecutor):
+    def __init__(self, max_workers=None, initializer=None, initargs=()):
+        super().__init__(max_workers=max_workers, mp_context=pool_context(),
+                         initializer=initializer, initargs=initargs)
+
+    # worker 在 submit 時才依需要啟動 (map 也經過這裡)
+    def submit(self, fn, /, *args, **kwargs):
+        with _main_lock:
+            main = sys.modules['__main__']
+            sys.modules['__main__'] = types.ModuleType('__main__')
+            try:
+                return super().submit(fn, *args, **kwargs)
+            finally:
+                sys.modules['__main__'] = main
@@ -0,0 +1,130 @@
+import json
+import threading
+import time
+import tracemalloc
+import weakref
+from contextlib import contextmanager, nullcontext
+
+# ==========================================
+# 效能診斷：記錄每次重跑各區段的牆鐘時間、掃過的期數、記憶體配置峰值與快取命中
+# 預設關閉；關閉時 section() / begin() 只回傳空的 context，幾乎沒有額外成本
+# 記憶體以 tracemalloc 量測，只在啟用時開啟；巢狀區段的峰值會重設外層的峰值起點
+# tracemalloc 是整個 process 共用的：有任何一個 profiler 啟用就會開著，量到的配置也包含同時間其他連線的配置
+# ==========================================
+
+_NULL_SECTION = nullcontext()
+_active = threading.local()
+# 需要 tracemalloc 的 profiler 數：第一個啟用時開啟，最後一個結束時關閉 (只關閉由這裡開啟的)
+_tracing_lock = threading.Lock()
+_tracing_users = 0
+_started_tracing = False
+
+def _acquire_tracing():
+    global _tracing_users, _started_tracing
+    with _tracing_lock:
+        if _tracing_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _started_tracing = True
+        _tracing_users += 1
+
+def _release_tracing():
+    global _tracing_users, _started_tracing
+    with _tracing_lock:
+        _tracing_users -= 1
+        if _tracing_users == 0 and _started_tracing:
+            tracemalloc.stop()
+            _started_tracing = False
+
+class Profiler:
+    def __init__(self, enabled=False, cache_stats=None, trace_alloc=True):
+        self.enabled = enabled
+        self.records = []
+        self._cache_stats = cache_stats
+        self._segment = None
+        self._started = time.perf_counter()
+        # finish() 時歸還；重跑被 st.rerun() / st.stop() 中斷而沒有呼叫 finish() 時，profiler 被回收時歸還
+        self._tracing = None
+        if enabled and trace_alloc:
+            _acquire_tracing()
+            self._tracing = weakref.finalize(self, _release_tracing)
+
+    def _cache_totals(self):
+        if self._cache_stats is None:
+            return 0, 0
+        stats = self._cache_stats().values()
+        return sum(s['hits'] for s in stats), sum(s['misses'] for s in stats)
+
+    def _open(self, name, rows):
+        mem_base = 0
+        if tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+            mem_base = tracemalloc.get_traced_memory()[0]
+        return {'name': name, 'rows': rows, 'mem_base': mem_base,
+                'cache': self._cache_totals(), 'started': time.perf_counter()}
+
+    def _close(self, segment):
+        wall = time.perf_counter() - segment['started']
+        alloc = tracemalloc.get_traced_memory()[1] - segment['mem_base'] if tracemalloc.is_tracing() else None
+        hits, misses = self._cache_totals()
+        self.records.append({
+            'section': segment['name'],
+            'wall_ms': round(wall * 1000, 3),
+            'rows': segment['rows'],
+            'alloc_kb': round(alloc / 1024, 1) if alloc is not None else None,
+            'cache_hits': hits - segment['cache'][0],
+            'cache_misses': misses - segment['cache'][1],
+        })
+
+    # 量測一段程式：with profiler.section("名稱", rows=掃過的期數): ...
+    def section(self, name, rows=None):
+        if not self.enabled:
+            return _NULL_SECTION
+        return self._section(name, rows)
+
+    @contextmanager
+    def _section(self, name, rows):
+        segment = self._open(name, rows)
+        try:
+            yield
+        finally:
+            self._close(segment)
+
+    # 依序切段：結束上一段並開始新的一段，不必把整塊程式縮排到 with 底下
+    def begin(self, name, rows=None):
+        if not self.enabled:
+            return
+        if self._segment is not None:
+            self._close(self._segment)
+        self._segment = self._open(name, rows)
+
+    # 結束最後一段並回傳這次重跑的報告；停用時回傳 None
+    def finish(self):
+        if not self.enabled:
+            return None
+        if self._segment is not None:
+            self._close(self._segment)
+            self._segment = None
+        if self._tracing is not None:
+            self._tracing()
+        return {
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'total_ms': round((time.perf_counter() - self._started) * 1000, 3),
+            'sections': self.records,
+        }
+
+# 讓不認得 Profiler 的程式 (例如線上更新) 也能記錄區段：以執行緒為單位設定目前的 profiler，回傳原本的 profiler
+def activate(profiler):
+    previous = getattr(_active, 'profiler', None)
+    _active.profiler = profiler
+    return previous
+
+def profile_section(name, rows=None):
+    profiler = getattr(_active, 'profiler', None)
+    if profiler is None or not profiler.enabled:
+        return _NULL_SECTION
+    return profiler.section(name, rows)
+
+# 把一次重跑的報告附加到 JSON Lines 記錄檔，方便離線分析
+def append_profile_log(path, report, **extra):
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(json.dumps({**report, **extra}, ensure_ascii=False) + '\n')
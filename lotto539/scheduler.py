@@ -0,0 +1,166 @@
+import random
+import threading
+from datetime import datetime, time, timedelta
+from zoneinfo import ZoneInfo
+
+from .csvstore import CSV_FILE, csv_lock, read_last_record
+from .memo import data_version
+from .profiling import Profiler, activate
+
+# ==========================================
+# 背景自動更新：整個 process 只有一條排程執行緒，依開獎日曆 (週一到週六晚上) 加上隨機抖動去抓新資料
+# 抓到新資料後公布新的資料版本，各連線下次重跑時就會讀到；畫面上的更新按鈕只叫醒排程，不等網路
+# 同一時間只會有一個抓取在跑：process 內以 lock 互斥，多個 process 之間靠 csvstore 的 CSV 寫入鎖
+# 排程執行緒有自己的 profiler：每次抓取的各區段耗時 (連線、解析、存檔) 放在 status() 的 last_profile
+# ==========================================
+
+TAIPEI = ZoneInfo('Asia/Taipei')
+DRAW_WEEKDAYS = frozenset(range(6))  # 週一 ~ 週六
+# 晚上開獎後網站陸續更新，這段時間內每 15 分鐘抓一次，抓到當天資料就停
+POLL_START = time(20, 45)
+POLL_END = time(23, 30)
+POLL_INTERVAL = timedelta(minutes=15)
+JITTER_SECONDS = 120
+# 單次最多睡這麼久就重新檢查，避免系統休眠或調整時鐘後錯過時間
+MAX_SLEEP = 3600
+
+# 最近一個應該已經查得到開獎結果的開獎日 (今天過了 POLL_START 才算今天)
+def latest_draw_day(now):
+    day = now.date()
+    if now < datetime.combine(day, POLL_START, TAIPEI):
+        day -= timedelta(days=1)
+    while day.weekday() not in DRAW_WEEKDAYS:
+        day -= timedelta(days=1)
+    return day
+
+# now 之後第一個開獎日的抓取時段起點
+def next_window_start(now):
+    day = now.date()
+    while True:
+        start = datetime.combine(day, POLL_START, TAIPEI)
+        if day.weekday() in DRAW_WEEKDAYS and start > now:
+            return start
+        day += timedelta(days=1)
+
+# 下一次抓取時間：資料已跟上就等下一個開獎日；落後時啟動後立刻抓一次，
+# 之後在開獎日的抓取時段內每 POLL_INTERVAL 重試，時段外等下一個開獎日
+def next_poll_time(now, last_draw, last_poll=None):
+    if last_draw is not None and last_draw >= latest_draw_day(now):
+        return next_window_start(now)
+    if last_poll is None:
+        return now
+    retry = max(last_poll + POLL_INTERVAL, now)
+    window_end = datetime.combine(retry.date(), POLL_END, TAIPEI)
+    window_start = datetime.combine(retry.date(), POLL_START, TAIPEI)
+    if retry.weekday() in DRAW_WEEKDAYS and window_start <= retry <= window_end:
+        return retry
+    return next_window_start(now)
+
+def _default_update(csv_path):
+    from .updater import update_from_web
+
+    return update_from_web(csv_path)
+
+class UpdateScheduler:
+    # update(csv_path) 回傳訊息 (成功時含「成功」)；on_update(新版本) 在寫入新資料後呼叫
+    # auto=False 時不依日曆自動抓，只在 trigger() 時抓
+    def __init__(self, csv_path=CSV_FILE, update=None, on_update=None, auto=True, jitter=JITTER_SECONDS):
+        self.csv_path = csv_path
+        self.auto = auto
+        self.jitter = jitter
+        self.version = data_version(csv_path)
+        self.last_checked = None
+        self.last_message = None
+        self.last_profile = None
+        self.next_poll = None
+        self._update = update or _default_update
+        self._on_update = on_update
+        self._fetch_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='lotto539-updater', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    # 叫醒排程執行緒立刻抓一次，不等結果
+    def trigger(self):
+        self.start()
+        self._wake.set()
+
+    @property
+    def busy(self):
+        return self._fetch_lock.locked()
+
+    def _last_draw(self):
+        try:
+            record = read_last_record(self.csv_path)
+        except OSError:
+            return None
+        return datetime.fromisoformat(record['record_date']).date() if record else None
+
+    # 在目前的執行緒抓一次；已經有抓取在跑就不重複抓，回傳 None
+    def refresh(self):
+        if not self._fetch_lock.acquire(blocking=False):
+            return None
+        # 只記耗時，不開 tracemalloc (會拖慢同一個 process 裡的所有連線)
+        profiler = Profiler(enabled=True, trace_alloc=False)
+        previous = activate(profiler)
+        try:
+            # 與 CLI update、backfill 共用 CSV 寫入鎖；拿不到代表其他執行緒或 process 正在寫入
+            with csv_lock(self.csv_path, blocking=False) as acquired:
+                message = self._update(self.csv_path) if acquired else "⏳ 其他程序正在更新"
+            self.last_checked = datetime.now(TAIPEI)
+            self.last_message = message
+            if "成功" in message:
+                self.version = data_version(self.csv_path)
+                if self._on_update is not None:
+                    with profiler.section("更新：載入新版本"):
+                        self._on_update(self.version)
+            return message
+        finally:
+            activate(previous)
+            self.last_profile = profiler.finish()
+            self._fetch_lock.release()
+
+    def _schedule(self):
+        target = next_poll_time(datetime.now(TAIPEI), self._last_draw(), self.last_checked)
+        return target + timedelta(seconds=random.uniform(0, self.jitter))
+
+    def _run(self):
+        while not self._stop.is_set():
+            if self.next_poll is None and self.auto:
+                self.next_poll = self._schedule()
+            delay = MAX_SLEEP if self.next_poll is None else (self.next_poll - datetime.now(TAIPEI)).total_seconds()
+            if delay > 0 and not self._wake.wait(min(delay, MAX_SLEEP)):
+                continue
+            self._wake.clear()
+            if self._stop.is_set():
+                break
+            try:
+                self.refresh()
+            except Exception as e:
+                self.last_checked = datetime.now(TAIPEI)
+                self.last_message = f"❌ 更新錯誤: {e}"
+            self.next_poll = None
+
+    # 給畫面顯示的狀態
+    def status(self):
+        return {
+            'busy': self.busy,
+            'version': self.version,
+            'last_checked': self.last_checked,
+            'last_message': self.last_message,
+            'last_profile': self.last_profile,
+            'next_poll': self.next_poll,
+        }
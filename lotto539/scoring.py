@@ -0,0 +1,84 @@
+import numpy as np
+
+from .indexes import build_cum_counts, calc_transition_matrix, window_counts
+
+# ==========================================
+# 電腦推薦評分與回測策略選號
+# ==========================================
+
+BACKTEST_STRATEGIES = ["🔥 追熱門牌", "❄️ 抓冷門牌", "⚖️ 陰陽調和"]
+
+# 電腦推薦評分：拖牌次數 × 好朋友權重，遺漏落在 miss_range 內的號碼再加 50 × 冷門權重
+# friend_counts / skips 可為單期 (40,) 或多期 (M, 40)
+def calc_recommend_scores(friend_counts, skips, w_friend, w_miss, miss_range=(5, 12)):
+    scores = friend_counts * w_friend
+    in_range = (skips >= miss_range[0]) & (skips <= miss_range[1])
+    scores = scores + in_range * (50 * w_miss)
+    scores[..., 0] = 0
+    return scores
+
+# 依分數由高到低取前 k 個號碼 (同分取小號)；多期分數回傳 (M, k) 陣列
+def pick_top_numbers(scores, k=5):
+    ranked = np.argsort(-scores[..., 1:], axis=-1, kind='stable')[..., :k] + 1
+    if ranked.ndim == 1:
+        return [int(n) for n in ranked]
+    return ranked
+
+# 電腦推薦：以最近 lag 期前開出的號碼查拖牌矩陣，配合目前遺漏評分，回傳 (前 5 名號碼, 各號分數)
+def recommend_numbers(hits, skips, w_friend, w_miss, lag=1, miss_range=(5, 12), transition=None):
+    if transition is None:
+        transition = calc_transition_matrix(hits, lag)
+    source_nums = np.flatnonzero(hits[-lag])
+    friend_counts = transition[source_nums].sum(axis=0)
+    scores = calc_recommend_scores(friend_counts, skips, w_friend, w_miss, miss_range)
+    return pick_top_numbers(scores, 5), scores
+
+# 回測策略選號：window_counts 為 (M, 40) 每期參考區間內的各號次數，回傳 (M, 5) 選號
+# 同次數時一律取小號
+def pick_strategy_numbers(window_counts, strategy):
+    counts = window_counts[:, 1:]
+    hot_picks = np.argsort(-counts, axis=1, kind='stable')[:, :5] + 1
+    if "熱門" in strategy:
+        return hot_picks
+    if "冷門" in strategy:
+        return np.argsort(counts, axis=1, kind='stable')[:, :5] + 1
+    # 陰陽調和：最熱的 3 個單號 + 2 個雙號，出現過的單雙號不夠時退回追熱門
+    odd_counts, even_counts = window_counts[:, 1::2], window_counts[:, 2::2]
+    odd_picks = np.argsort(-odd_counts, axis=1, kind='stable')[:, :3] * 2 + 1
+    even_picks = np.argsort(-even_counts, axis=1, kind='stable')[:, :2] * 2 + 2
+    balanced = ((odd_counts > 0).sum(axis=1) >= 3) & ((even_counts > 0).sum(axis=1) >= 2)
+    return np.where(balanced[:, None], np.hstack([odd_picks, even_picks]), hot_picks)
+
+# 回測引擎：以累積次數一次算出每期前 lookback 期的各號次數，對最近 periods 期 (None 為全歷史) 選號對獎
+# 回傳 (每期中幾星, 對應的列位置)
+def backtest_hits(hits, strategy, lookback=30, periods=None, cum=None):
+    if cum is None:
+        cum = build_cum_counts(hits)
+    first = lookback if periods is None else max(lookback, len(hits) - periods)
+    target_rows = np.arange(first, len(hits))
+    picks = pick_strategy_numbers(window_counts(cum, lookback, target_rows), strategy)
+    return hits[target_rows[:, None], picks].sum(axis=1), target_rows
+
+# 電腦推薦的歷史拖牌次數：對每個目標期 t，以 t-1 期號碼為來源，
+# 只統計 t 之前最近 window 段 (None 為全部) 的拖牌，避免偷看未來資料
+def calc_friend_history(hits, target_rows, window=None):
+    counts_hits = hits.astype(np.int64)
+    transition = np.zeros((40, 40), dtype=np.int64)
+    friend_counts = np.zeros((len(target_rows), 40), dtype=np.int64)
+    added = removed = 0
+    for k, t in enumerate(target_rows):
+        while added < t - 1:
+            transition += np.outer(counts_hits[added], counts_hits[added + 1])
+            added += 1
+        while window is not None and removed < t - 1 - window:
+            transition -= np.outer(counts_hits[removed], counts_hits[removed + 1])
+            removed += 1
+        friend_counts[k] = transition[hits[t - 1]].sum(axis=0)
+    return friend_counts
+
+# 每個目標期 t 當下 (只看 t 之前) 的各號遺漏期數，從未開出則為 t
+def calc_skip_history(hits, target_rows):
+    hit_rows = np.where(hits, np.arange(len(hits))[:, None], -1)
+    last_hit = np.maximum.accumulate(hit_rows, axis=0)[target_rows - 1]
+    prev_rows = (target_rows - 1)[:, None]
+    return np.where(last_hit >= 0, prev_rows - last_hit, target_rows[:, None])
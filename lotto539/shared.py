@@ -0,0 +1,137 @@
+import threading
+import weakref
+
+from .csvstore import CSV_FILE
+from .data import load_draw_store
+from .datacache import mapped_generation, prune_column_cache
+from .indexes import build_cum_counts, build_hit_matrix, build_number_bitsets, build_year_offsets, take_row_ranges
+from .memo import data_version
+
+# ==========================================
+# 整個 process 共用的資料集：每個資料版本只載入一次開獎資料並建好衍生索引，所有連線唯讀共用
+# 連線每次重跑向 DatasetRegistry 借用 (lease) 目前的版本，重跑期間拿到的一直是同一份資料；
+# 資料更新時建好新版本後才一次切換，舊版本等最後一個借用者歸還後才釋放，連同它的快取檔一起刪除
+# ==========================================
+
+# 一個資料版本的開獎資料與衍生索引，建好後不再修改
+class Dataset:
+    __slots__ = ('version', 'store', 'cache_generation', 'hits', 'bitsets', 'cum', 'dates', 'year_offsets',
+                 '__weakref__')
+
+    def __init__(self, version, store):
+        self.version = version
+        self.store = store
+        self.cache_generation = mapped_generation(store.balls)  # 開獎資料來自哪一份快取檔 (不是 memory map 時為 None)
+        self.hits = build_hit_matrix(store.balls)
+        self.bitsets = build_number_bitsets(self.hits)
+        self.cum = build_cum_counts(self.hits)
+        self.dates = store.dates
+        self.year_offsets = build_year_offsets(store.years)
+        for arr in (self.hits, self.bitsets, self.cum, self.dates):
+            arr.setflags(write=False)
+
+    def __len__(self):
+        return len(self.store)
+
+    # 全部陣列的大小 (memory map 的開獎資料也算在內)
+    @property
+    def nbytes(self):
+        return self.store.nbytes + sum(a.nbytes for a in (self.hits, self.bitsets, self.cum, self.dates))
+
+    # 依列範圍取出 (開獎資料, 開出矩陣)：只有一段時都是切片，不複製
+    def take(self, ranges):
+        return self.store.take(ranges), take_row_ranges(self.hits, ranges)
+
+def load_dataset(csv_path=CSV_FILE, version=None):
+    return Dataset(version if version is not None else data_version(csv_path), load_draw_store(csv_path))
+
+# 借用憑證：release() 或被回收時歸還，重複歸還不會多扣
+class Lease:
+    __slots__ = ('dataset', '_release', '__weakref__')
+
+    def __init__(self, registry, dataset):
+        self.dataset = dataset
+        self._release = weakref.finalize(self, registry._release, dataset.version)
+
+    def release(self):
+        self._release()
+
+class DatasetRegistry:
+    # loader(version) 回傳該版本的 Dataset；on_retire(version) 在舊版本的最後一個借用者歸還後呼叫
+    def __init__(self, csv_path=CSV_FILE, loader=None, on_retire=None):
+        self.csv_path = csv_path
+        self._loader = loader or (lambda version: load_dataset(csv_path, version))
+        self._on_retire = on_retire
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+        self._current = None
+        self._datasets = {}
+        self._refs = {}
+
+    @property
+    def current(self):
+        return self._current
+
+    # CSV 版本變了就載入新版本並切換；已經有別的執行緒在載入時，有舊版本可用就不等
+    def refresh(self, version=None):
+        version = version if version is not None else data_version(self.csv_path)
+        current = self._current
+        if current is not None and current.version == version:
+            return current
+        if not self._build_lock.acquire(blocking=current is None):
+            return current
+        try:
+            current = self._current
+            if current is None or current.version != version:
+                self.publish(self._loader(version))
+            return self._current
+        finally:
+            self._build_lock.release()
+
+    # 切換到新版本；舊版本沒有人借用就立刻釋放
+    def publish(self, dataset):
+        with self._lock:
+            old, self._current = self._current, dataset
+            self._datasets[dataset.version] = dataset
+            self._refs.setdefault(dataset.version, 0)
+            retired = old is not None and old.version != dataset.version and self._refs.get(old.version, 0) == 0
+            if retired:
+                self._forget(old.version)
+        if retired:
+            self._retire(old.version)
+
+    # 借用目前的版本 (先檢查 CSV 是否更新)
+    def acquire(self):
+        self.refresh()
+        with self._lock:
+            dataset = self._current
+            self._refs[dataset.version] += 1
+        return Lease(self, dataset)
+
+    def _forget(self, version):
+        self._datasets.pop(version, None)
+        self._refs.pop(version, None)
+
+    def _release(self, version):
+        with self._lock:
+            self._refs[version] -= 1
+            retired = self._refs[version] == 0 and (self._current is None or self._current.version != version)
+            if retired:
+                self._forget(version)
+        if retired:
+            self._retire(version)
+
+    # 舊版本已經沒有人借用：通知 on_retire，再刪掉只有它在用的快取檔
+    def _retire(self, version):
+        if self._on_retire is not None:
+            self._on_retire(version)
+        with self._lock:
+            keep = {d.cache_generation for d in self._datasets.values() if d.cache_generation is not None}
+        prune_column_cache(self.csv_path, keep)
+
+    # 各版本目前的借用數 (還留著的版本才會列出)
+    def stats(self):
+        with self._lock:
+            current = self._current.version if self._current is not None else None
+            return {v: {'refs': n, 'current': v == current, 'bytes': self._datasets[v].nbytes}
+                    for v, n in self._refs.items()}
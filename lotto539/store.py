@@ -0,0 +1,95 @@
+import numpy as np
+
+from .indexes import take_row_ranges
+
+# ==========================================
+# 精簡的開獎資料：所有欄位都是連續的小整數陣列，一期約 30 bytes
+# 號碼 (N, 5) uint8、開獎日 int32 (1970-01-01 起的天數)、年份 int32、期數 int16、總期數 int32、特徵 uint8；
+# 39 位元號碼遮罩 (uint64) 用到時才算。依列範圍篩選時只有一段就直接切片共用記憶體
+# 需要表格顯示時再以 to_frame() 轉成 DataFrame
+# ==========================================
+
+NUM_COLS = ['N1', 'N2', 'N3', 'N4', 'N5']
+
+class DrawStore:
+    __slots__ = ('balls', 'days', 'years', 'draw_nums', 'total_ids', 'features', '_masks')
+
+    def __init__(self, balls, days, years, draw_nums, total_ids, features, masks=None):
+        self.balls = balls
+        self.days = days
+        self.years = years
+        self.draw_nums = draw_nums
+        self.total_ids = total_ids
+        self.features = features
+        self._masks = masks
+
+    def __len__(self):
+        return len(self.balls)
+
+    # 開獎日 datetime64[D]，遞增，可直接二分搜尋
+    @property
+    def dates(self):
+        return self.days.astype('datetime64[D]')
+
+    # 每期的 39 位元號碼遮罩 (第 n 位元代表 n 號)，第一次取用時才計算
+    @property
+    def masks(self):
+        if self._masks is None:
+            self._masks = np.bitwise_or.reduce(np.left_shift(np.uint64(1), self.balls.astype(np.uint64)), axis=1)
+        return self._masks
+
+    # 畫面顯示用的日期文字，例如「1月5日」
+    # 以月份數與天數計算，不轉成 datetime.date (只到 9999 年)
+    def date_label(self, i):
+        date = self.dates[i]
+        month = date.astype('datetime64[M]')
+        return f"{month.astype(np.int64) % 12 + 1}月{(date - month).astype(np.int64) + 1}日"
+
+    @property
+    def nbytes(self):
+        arrays = [self.balls, self.days, self.years, self.draw_nums, self.total_ids, *self.features.values()]
+        if self._masks is not None:
+            arrays.append(self._masks)
+        return sum(a.nbytes for a in arrays)
+
+    # 依列範圍取出資料 (select_row_ranges 的結果)：只有一段時每個陣列都是切片，不複製
+    def take(self, ranges):
+        return DrawStore(
+            take_row_ranges(self.balls, ranges), take_row_ranges(self.days, ranges),
+            take_row_ranges(self.years, ranges), take_row_ranges(self.draw_nums, ranges),
+            take_row_ranges(self.total_ids, ranges),
+            {name: take_row_ranges(values, ranges) for name, values in self.features.items()},
+            None if self._masks is None else take_row_ranges(self._masks, ranges),
+        )
+
+    # 二進位快取用的欄位 (名稱 → 陣列)，與 from_columns 互為反向
+    def to_columns(self):
+        return {
+            'balls': self.balls, 'days': self.days, 'years': self.years,
+            'draw_nums': self.draw_nums, 'total_ids': self.total_ids,
+            **{f"feature:{name}": values for name, values in self.features.items()},
+        }
+
+    @classmethod
+    def from_columns(cls, columns):
+        features = {name.split(':', 1)[1]: values for name, values in columns.items() if name.startswith('feature:')}
+        return cls(columns['balls'], columns['days'], columns['years'],
+                   columns['draw_nums'], columns['total_ids'], features)
+
+    # 轉成與舊版 load_draws 相同欄名的 DataFrame (CLI 與表格顯示用)
+    def to_frame(self):
+        import pandas as pd
+
+        dates = self.dates
+        months = dates.astype('datetime64[M]')
+        month_nums = months.astype(np.int64) % 12 + 1
+        day_nums = (dates - months).astype(np.int64) + 1
+        frame = {
+            'Total_ID': self.total_ids,
+            'Year': self.years,
+            'Date': [f"{m}月{d}日" for m, d in zip(month_nums, day_nums)],
+            'Draw_Num': self.draw_nums,
+            **{col: self.balls[:, i] for i, col in enumerate(NUM_COLS)},
+            **self.features,
+        }
+        return pd.DataFrame(frame)
@@ -0,0 +1,110 @@
+import itertools
+import os
+from concurrent.futures import as_completed
+
+import numpy as np
+import pandas as pd
+
+from .indexes import build_cum_counts
+from .pools import WorkerPool
+from .scoring import (
+    backtest_hits, calc_friend_history, calc_recommend_scores, calc_skip_history, pick_top_numbers
+)
+
+# ==========================================
+# 參數掃描：把 (權重, 參考期數, 遺漏區間) 的組合分散到多核心，在歷史資料上評估命中率
+# 電腦推薦的參考期數即 app 的「拖牌統計期數」，拖牌間隔固定為 1 期
+# ==========================================
+
+RECOMMEND_LABEL = "🤖 電腦推薦"
+
+# 每個 worker 只在啟動時收一次開出矩陣，任務本身只帶參數
+_worker_state = {}
+
+def _init_worker(hits, periods):
+    target_rows = np.arange(max(1, len(hits) - periods), len(hits))
+    _worker_state.update(
+        hits=hits,
+        periods=periods,
+        target_rows=target_rows,
+        skips=calc_skip_history(hits, target_rows),
+        cum=build_cum_counts(hits),
+        friend_cache={},
+    )
+
+def _hit_metrics(win_history):
+    return {
+        '期數': len(win_history),
+        '平均星數': round(float(win_history.mean()), 4),
+        '2星+ (%)': round(float((win_history >= 2).mean() * 100), 2),
+        '3星+ (%)': round(float((win_history >= 3).mean() * 100), 2),
+    }
+
+# 電腦推薦任務：固定 (參考期數, 好朋友權重)，掃過所有冷門權重與遺漏區間
+def _run_recommend_task(lookback, w_friend, w_misses, miss_ranges):
+    state = _worker_state
+    hits, target_rows = state['hits'], state['target_rows']
+    if lookback not in state['friend_cache']:
+        state['friend_cache'][lookback] = calc_friend_history(hits, target_rows, lookback)
+    friend_counts = state['friend_cache'][lookback]
+
+    rows = []
+    for w_miss, miss_range in itertools.product(w_misses, miss_ranges):
+        scores = calc_recommend_scores(friend_counts, state['skips'], w_friend, w_miss, miss_range)
+        picks = pick_top_numbers(scores, 5)
+        win_history = hits[target_rows[:, None], picks].sum(axis=1)
+        rows.append({
+            '策略': RECOMMEND_LABEL, '參考期數': lookback, '好朋友權重': w_friend,
+            '冷門權重': w_miss, '遺漏區間': f"{miss_range[0]}-{miss_range[1]}",
+            **_hit_metrics(win_history)
+        })
+    return rows
+
+# 回測策略任務：tab4 的策略搭配不同參考期數
+def _run_strategy_task(strategy, lookback):
+    state = _worker_state
+    win_history, _ = backtest_hits(state['hits'], strategy, lookback, state['periods'], state['cum'])
+    return [{
+        '策略': strategy, '參考期數': lookback, '好朋友權重': None,
+        '冷門權重': None, '遺漏區間': None,
+        **_hit_metrics(win_history)
+    }]
+
+def _run_task(task):
+    kind, args = task
+    if kind == 'recommend':
+        return _run_recommend_task(*args)
+    return _run_strategy_task(*args)
+
+# 依掃描網格拆成任務：電腦推薦以 (參考期數, 好朋友權重) 為一個任務，回測策略以 (策略, 參考期數) 為一個任務
+def build_sweep_tasks(w_friends, w_misses, lookbacks, miss_ranges, strategies=()):
+    tasks = []
+    if w_misses and miss_ranges:
+        for lookback, w_friend in itertools.product(lookbacks, w_friends):
+            tasks.append(('recommend', (lookback, w_friend, tuple(w_misses), tuple(miss_ranges))))
+    for strategy, lookback in itertools.product(strategies, lookbacks):
+        tasks.append(('strategy', (strategy, lookback)))
+    return tasks
+
+# 以 process pool 執行掃描，每完成一個任務就回報 (已完成數, 總任務數, 結果列)
+# 呼叫端中途停止迭代 (例如使用者按下停止) 時，尚未開始的任務會被取消
+def iter_param_sweep(hits, tasks, periods=300, max_workers=None):
+    pool = WorkerPool(
+        max_workers=max_workers or os.cpu_count(),
+        initializer=_init_worker,
+        initargs=(hits, periods),
+    )
+    try:
+        futures = [pool.submit(_run_task, task) for task in tasks]
+        for done, future in enumerate(as_completed(futures), 1):
+            yield done, len(futures), future.result()
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+# 掃描結果排序：先比 2 星以上比例，再比平均星數
+def rank_sweep_results(rows):
+    if not rows:
+        return pd.DataFrame()
+    return (pd.DataFrame(rows)
+            .sort_values(['2星+ (%)', '平均星數'], ascending=False, kind='stable')
+            .reset_index(drop=True))
@@ -0,0 +1,96 @@
+from datetime import datetime
+
+from .csvstore import CSV_FILE, append_rows, csv_lock, read_last_record
+from .fetch import PILIO_URL, fetch_page, parse_draw_rows, remember_validators
+from .profiling import profile_section
+
+# ==========================================
+# 線上更新：抓最新開獎頁，只把比 CSV 最後一筆還新的資料附加到檔尾
+# ==========================================
+
+# 強健版爬蟲更新函數：回傳給使用者看的訊息，成功時訊息含「成功」
+# 從讀最後一筆到附加存檔都持有 CSV 寫入鎖，與排程、CLI update、backfill 互斥，同一期不會附加兩次
+def update_from_web(csv_path=CSV_FILE, url=PILIO_URL):
+    with csv_lock(csv_path):
+        return _update_from_web(csv_path, url)
+
+def _update_from_web(csv_path, url):
+    try:
+        # 1. 取得最後一筆紀錄 (讀 .last.json 或只讀檔尾，不解析整個 CSV)
+        try:
+            with profile_section("更新：讀取最後一筆"):
+                last_record = read_last_record(csv_path)
+        except OSError:
+            last_record = None
+
+        if last_record:
+            last_record_date = datetime.fromisoformat(last_record['record_date'])
+            last_total_id = last_record['total_id'] or 0
+            last_draw_id = last_record['draw_id'] or 0
+            last_year = last_record['year']
+        else:
+            # 如果讀取失敗或為空，設初始值
+            last_record_date = datetime(2000, 1, 1)
+            last_total_id = 0
+            last_draw_id = 0
+            last_year = None
+
+        # 2. 抓取網頁資料 (共用連線池、逾時重試；網頁沒變動時伺服器回 304，直接略過解析)
+        with profile_section("更新：連線抓取"):
+            page = fetch_page(url)
+        if page.not_modified:
+            return "✅ 資料已是最新"
+
+        with profile_section("更新：解析網頁"):
+            draw_rows = parse_draw_rows(page.text)
+        if not draw_rows:
+            return "❌ 抓不到網頁表格，請檢查網站結構"
+
+        # 3. 篩出新資料 (若網頁日期 <= CSV日期，跳過)
+        new_rows = []
+        for current_date, nums in draw_rows:
+            if current_date <= last_record_date:
+                continue
+            new_rows.append({
+                'dt': current_date,
+                '年份': str(current_date.year),
+                '日期': f"{current_date.month}月{current_date.day}日",
+                '球號 1': nums[0], '球號 2': nums[1], '球號 3': nums[2], '球號 4': nums[3], '球號 5': nums[4]
+            })
+        
+        if not new_rows:
+            remember_validators(page)
+            return "✅ 資料已是最新"
+
+        # 4. 附加存檔
+        new_rows.sort(key=lambda x: x['dt'])
+
+        # --- 防呆保護 ---
+        if last_total_id + len(new_rows) < 1000:
+             return f"⚠️ 警告：資料庫似乎遺失，目前僅有 {last_total_id} 筆資料。請執行 `python -m lotto539.backfill` 回補歷史資料。"
+        # --------------------
+
+        rows_to_add = []
+        for item in new_rows:
+            last_total_id += 1
+            # 期數每年從 1 重新起算
+            last_draw_id = last_draw_id + 1 if item['年份'] == last_year else 1
+            last_year = item['年份']
+            rows_to_add.append({
+                'total_id': last_total_id,
+                'year': item['年份'],
+                'date': item['日期'],
+                'draw_id': last_draw_id,
+                'nums': [item['球號 1'], item['球號 2'], item['球號 3'], item['球號 4'], item['球號 5']],
+                'record_date': item['dt'].isoformat(),
+            })
+
+        # 只在檔尾附加新資料 (先寫 WAL 再 fsync 附加)，不重寫整個檔案
+        with profile_section("更新：附加存檔", rows=len(rows_to_add)):
+            append_rows(csv_path, rows_to_add, last_record)
+        remember_validators(page)
+        
+        return f"🎉 成功更新 {len(rows_to_add)} 筆資料！(最新: {new_rows[-1]['年份']}/{new_rows[-1]['日期']})"
+
+    except Exception as e:
+        return f"❌ 更新錯誤: {str(e)}"
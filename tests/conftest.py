@@ -0,0 +1,91 @@
+import hashlib
+import http.server
+import os
+import shutil
+import sys
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lotto539.bench import generate_synthetic_csv, synthetic_csv_path  # noqa: E402
+
+# 每個測試各自一份合成開獎資料 (2,000 期)，可以放心改寫或 touch
+@pytest.fixture
+def draws_csv(tmp_path_factory, tmp_path):
+    source = synthetic_csv_path(str(tmp_path_factory.getbasetemp()), 2000)
+    path = tmp_path / 'draws.csv'
+    shutil.copyfile(source, path)
+    return str(path)
+
+# 以另一個種子重寫 CSV 內容 (模擬線上更新寫入新資料)；mtime 往後推一秒，確保資料版本一定不同
+@pytest.fixture
+def rewrite_csv():
+    def rewrite(path, seed, n_draws=2000):
+        mtime_ns = os.stat(path).st_mtime_ns + 1_000_000_000
+        tmp_path = f"{path}.new"
+        generate_synthetic_csv(tmp_path, n_draws, seed)
+        os.replace(tmp_path, path)
+        os.utime(path, ns=(mtime_ns, mtime_ns))
+    return rewrite
+
+# 本機的開獎網站替身：pages[路徑] 為網頁內容 (bytes) 或依序回應的 [(狀態碼, 內容), ...] (最後一個重複使用)
+# delays[路徑] 為回應前等待的秒數；每個請求記在 hits (路徑, 標頭)
+class StandInSite(http.server.BaseHTTPRequestHandler):
+    def do_GET(self):
+        site = self.server.site
+        with site.lock:
+            site.hits.append((self.path, dict(self.headers)))
+            entry = site.pages.get(self.path)
+            if isinstance(entry, list):
+                status, body = entry.pop(0) if len(entry) > 1 else entry[0]
+            else:
+                status, body = (404, b'') if entry is None else (200, entry)
+        time.sleep(site.delays.get(self.path, 0))
+
+        etag = '"%s"' % hashlib.md5(body).hexdigest()
+        if status == 200 and self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+        self.send_response(status)
+        if status == 200:
+            self.send_header('ETag', etag)
+        self.send_header('Content-Type', 'text/html; charset=big5')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+        except OSError:
+            pass  # 用戶端已逾時斷線
+
+    def log_message(self, *args):
+        pass
+
+# 仿照 pilio 的版面：前面有選單表格，開獎表格每列為「日期 (星期) | 號碼, 號碼, ...」，big5 編碼
+def _draw_page(rows):
+    trs = ''.join(f"<tr><td><font>{d}(二)</font></td><td>{n}</td></tr>" for d, n in rows)
+    return (
+        "<html><head><title>今彩539</title></head><body>"
+        "<table><tr><td>選單</td><td>歷史開獎</td></tr></table>"
+        f"<table border=1><tr><th>日期</th><th>號碼</th></tr>{trs}</table></body></html>"
+    ).encode('big5')
+
+@pytest.fixture
+def draw_page():
+    return _draw_page
+
+@pytest.fixture
+def stand_in():
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), StandInSite)
+    server.site = SimpleNamespace(pages={}, delays={}, hits=[], lock=threading.Lock(),
+                                  url=lambda path: f"http://127.0.0.1:{server.server_port}{path}")
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server.site
+    server.shutdown()
+    server.server_close()
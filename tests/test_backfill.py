@@ -0,0 +1,86 @@
+import os
+from datetime import datetime
+
+import pytest
+import requests
+
+from lotto539.backfill import backfill_history, build_csv_rows
+from lotto539.csvstore import read_all_records, write_rows_atomic
+from lotto539.fetch import create_session
+
+# 分頁由新到舊，第 2 頁開頭與第 1 頁結尾重複 (換頁時網站多了一期)，第 4 頁起不存在 (404)
+PAGES = {
+    1: [('2025/01/06', '01, 02, 03, 04, 05'), ('2025/01/04', '06, 07, 08, 09, 10'),
+        ('2025/01/03', '11, 12, 13, 14, 15')],
+    2: [('2025/01/03', '11, 12, 13, 14, 15'), ('2025/01/02', '21, 22, 23, 24, 25'),
+        ('2024/12/31', '16, 17, 18, 19, 20')],
+    3: [('2024/12/30', '26, 27, 28, 29, 30'), ('2024/12/28', '31, 32, 33, 34, 35')],
+}
+EXISTING = [
+    (datetime(2024, 12, 30), ['26', '27', '28', '29', '30']),
+    (datetime(2025, 1, 2), ['1', '3', '5', '7', '9']),  # 與網頁不同時以既有紀錄為準
+]
+
+def _serve(stand_in, draw_page):
+    for page, rows in PAGES.items():
+        stand_in.pages[f"/list?page={page}"] = draw_page(rows)
+    # 第 2 頁第一次回 503，靠重試補回來
+    stand_in.pages['/list?page=2'] = [(503, b''), (200, stand_in.pages['/list?page=2'])]
+    return stand_in.url('/list?page={page}')
+
+def _backfill(csv_path, url_template):
+    session = create_session(pool_size=3, backoff=0)
+    try:
+        return backfill_history(csv_path, url_template, max_pages=20, max_workers=3, rate=0, session=session)
+    finally:
+        session.close()
+
+def test_backfill_merges_pages_in_date_order(tmp_path, stand_in, draw_page):
+    csv_path = str(tmp_path / 'draws.csv')
+    write_rows_atomic(csv_path, build_csv_rows(EXISTING))
+    url_template = _serve(stand_in, draw_page)
+
+    assert _backfill(csv_path, url_template) == (2, 7)
+    records = read_all_records(csv_path)
+    assert [r['record_date'][:10] for r in records] == [
+        '2024-12-28', '2024-12-30', '2024-12-31', '2025-01-02', '2025-01-03', '2025-01-04', '2025-01-06',
+    ]
+    assert [r['total_id'] for r in records] == list(range(1, 8))
+    assert [(r['year'], r['draw_id']) for r in records] == [
+        ('2024', 1), ('2024', 2), ('2024', 3), ('2025', 1), ('2025', 2), ('2025', 3), ('2025', 4),
+    ]
+    assert records[3]['nums'] == ['1', '3', '5', '7', '9']
+    assert records[-1]['nums'] == ['1', '2', '3', '4', '5']
+
+# 中斷後重跑時已抓過的分頁直接讀磁碟快取，不再連線；完成後快取清掉
+def test_backfill_resumes_after_interruption(tmp_path, stand_in, draw_page):
+    csv_path = str(tmp_path / 'draws.csv')
+    url_template = _serve(stand_in, draw_page)
+    page3 = stand_in.pages['/list?page=3']
+    stand_in.pages['/list?page=3'] = [(500, b'')]
+    with pytest.raises(requests.RequestException):
+        _backfill(csv_path, url_template)
+    assert not os.path.exists(csv_path)
+
+    stand_in.pages['/list?page=3'] = page3
+    stand_in.hits.clear()
+    assert _backfill(csv_path, url_template) == (0, 7)
+    fetched = {path for path, _ in stand_in.hits}
+    assert not fetched & {'/list?page=1', '/list?page=2'}
+    assert '/list?page=3' in fetched
+    assert not os.path.exists(f"{csv_path}.backfill")
+
+# 之後網站多開了一期 (所有分頁往後移一格)：重新回補要抓到新的一期，不能沿用上次的分頁
+def test_backfill_picks_up_new_draws_on_rerun(tmp_path, stand_in, draw_page):
+    csv_path = str(tmp_path / 'draws.csv')
+    url_template = _serve(stand_in, draw_page)
+    assert _backfill(csv_path, url_template) == (0, 7)
+
+    draws = [row for page in PAGES.values() for row in page]
+    draws.insert(0, ('2025/01/07', '35, 36, 37, 38, 39'))
+    for page in PAGES:
+        stand_in.pages[f"/list?page={page}"] = draw_page(draws[(page - 1) * 3:page * 3])
+    assert _backfill(csv_path, url_template) == (7, 8)
+    records = read_all_records(csv_path)
+    assert records[-1]['record_date'][:10] == '2025-01-07'
+    assert records[-1]['nums'] == ['35', '36', '37', '38', '39']
@@ -0,0 +1,12 @@
+import numpy as np
+
+from lotto539.combos import rank_combinations
+
+# 分數高者一定排前面，即使分數只差 0.5 而近期次數差很多；同分才比近期次數
+def test_rank_combinations_orders_by_score_before_heat():
+    features = {'sum': np.arange(6) * 10, 'mask': np.zeros(6, dtype=np.uint64)}
+    points = {'rule': np.array([0, 0.5, 0, 1, 0, 0.5])}
+    history = {'heat': np.array([100, 0, 99, 0, 5, 1])}
+    picked, scores = rank_combinations(points, history, features, {'rule': 1.0}, k=4)
+    assert picked.tolist() == [3, 5, 1, 0]
+    assert scores.tolist() == [61.0, 60.5, 60.5, 60.0]
@@ -0,0 +1,86 @@
+import json
+import os
+import subprocess
+import sys
+import threading
+from datetime import datetime
+
+from lotto539.backfill import build_csv_rows
+from lotto539.csvstore import (
+    append_rows, csv_lock, read_all_records, recover_pending_append, wal_path_for, write_rows_atomic
+)
+
+DRAWS = [(datetime(2025, 1, d), [str(n) for n in range(d, d + 5)]) for d in range(1, 5)]
+
+# 前兩期整檔寫入、第三期以 append_rows 附加，回傳 (CSV 路徑, 附加前大小, 第三期附加的內容)
+def _csv_with_append(tmp_path):
+    csv_path = str(tmp_path / 'draws.csv')
+    rows = build_csv_rows(DRAWS)
+    write_rows_atomic(csv_path, rows[:2])
+    base_size = os.path.getsize(csv_path)
+    append_rows(csv_path, rows[2:3])
+    with open(csv_path, 'rb') as f:
+        payload = f.read()[base_size:]
+    return csv_path, base_size, payload
+
+def _leave_wal(csv_path, base_size, payload):
+    with open(wal_path_for(csv_path), 'wb') as f:
+        f.write(json.dumps({'base_size': base_size}).encode('utf-8') + b'\n' + payload)
+
+def _dates(csv_path):
+    return [r['record_date'][:10] for r in read_all_records(csv_path)]
+
+# 附加到一半中斷：截回原大小後重新附加
+def test_recover_redoes_partial_append(tmp_path):
+    csv_path, base_size, payload = _csv_with_append(tmp_path)
+    _leave_wal(csv_path, base_size, payload)
+    os.truncate(csv_path, base_size + len(payload) // 2)
+
+    assert recover_pending_append(csv_path)
+    assert _dates(csv_path) == ['2025-01-01', '2025-01-02', '2025-01-03']
+    assert not os.path.exists(wal_path_for(csv_path))
+
+# .wal 沒刪掉但之後又有資料附加上去：不可截斷，只清掉 .wal
+def test_recover_keeps_later_appends(tmp_path):
+    csv_path, base_size, payload = _csv_with_append(tmp_path)
+    append_rows(csv_path, build_csv_rows(DRAWS)[3:])
+    _leave_wal(csv_path, base_size, payload)
+    size = os.path.getsize(csv_path)
+
+    assert recover_pending_append(csv_path)
+    assert os.path.getsize(csv_path) == size
+    assert _dates(csv_path) == ['2025-01-01', '2025-01-02', '2025-01-03', '2025-01-04']
+    assert not os.path.exists(wal_path_for(csv_path))
+
+# 寫入鎖：同一個執行緒可以重複進入，其他執行緒與其他 process 在持有期間拿不到
+def test_csv_lock_is_reentrant_and_exclusive(tmp_path):
+    csv_path, _, _ = _csv_with_append(tmp_path)
+    other_thread = []
+    probe = (
+        "import sys; from lotto539.csvstore import csv_lock\n"
+        "with csv_lock(sys.argv[1], blocking=False) as ok: print(ok)"
+    )
+
+    def run_probe():
+        result = subprocess.run([sys.executable, '-c', probe, csv_path], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))), check=True)
+        return result.stdout.strip()
+
+    def try_lock():
+        with csv_lock(csv_path, blocking=False) as ok:
+            other_thread.append(ok)
+
+    with csv_lock(csv_path) as outer:
+        assert outer
+        with csv_lock(csv_path, blocking=False) as inner:
+            assert inner
+            append_rows(csv_path, build_csv_rows(DRAWS)[3:])
+        thread = threading.Thread(target=try_lock)
+        thread.start()
+        thread.join()
+        assert run_probe() == 'False'
+
+    try_lock()
+    assert other_thread == [False, True]
+    assert run_probe() == 'True'
+    assert len(read_all_records(csv_path)) == 4
@@ -0,0 +1,27 @@
+import numpy as np
+import pandas as pd
+
+from lotto539.data import build_draw_store, calc_draw_dates
+
+def _frame(years, dates):
+    n = len(years)
+    return pd.DataFrame({
+        'Total_ID': [str(i + 1) for i in range(n)], 'Year': years, 'Date': dates,
+        'Draw_Num': ['1'] * n, **{f'N{i + 1}': [i + 1] * n for i in range(5)},
+    })
+
+# 合成資料 100 萬期後年份超過 2262 (datetime64[ns] 的上限)，1,000 萬期後超過 int16
+def test_dates_past_nanosecond_range():
+    df = _frame(['2262', '2263', '9999', '10000', '33956'], ['4月11日', '1月5日', '12/31', '1月1日', '02/ 29'])
+    dates = calc_draw_dates(df)
+    assert dates.astype(str).tolist() == ['2262-04-11', '2263-01-05', '9999-12-31', '10000-01-01', '33956-02-29']
+
+    store = build_draw_store(df)
+    assert store.years.tolist() == [2262, 2263, 9999, 10000, 33956]
+    assert store.date_label(-1) == "2月29日"
+    assert store.to_frame()['Date'].tolist()[-2:] == ["1月1日", "2月29日"]
+
+# 不存在或無法解析的日期沿用前一期
+def test_invalid_dates_carry_forward():
+    df = _frame(['2024', '2024', '2100', 'x', '2024'], ['2/28', '2月30日', '2/29', '3/1', '13/1'])
+    assert calc_draw_dates(df).astype(str).tolist() == ['2024-02-28'] * 5
@@ -0,0 +1,60 @@
+import os
+
+import numpy as np
+import pytest
+
+import lotto539.data as data
+from lotto539.datacache import mapped_generation
+
+@pytest.fixture
+def parse_count(monkeypatch):
+    calls = []
+    parse = data.read_draw_store
+
+    def counting(csv_path):
+        calls.append(csv_path)
+        return parse(csv_path)
+
+    monkeypatch.setattr(data, 'read_draw_store', counting)
+    return calls
+
+def test_cache_hit_skips_parsing(draws_csv, parse_count):
+    first = data.load_draw_store(draws_csv)
+    second = data.load_draw_store(draws_csv)
+    assert len(parse_count) == 1
+    assert mapped_generation(second.balls) is not None
+    assert np.array_equal(first.balls, second.balls)
+
+def test_cache_miss_after_rewrite(draws_csv, rewrite_csv, parse_count):
+    before = data.load_draw_store(draws_csv)
+    rewrite_csv(draws_csv, seed=1, n_draws=2100)
+    after = data.load_draw_store(draws_csv)
+    assert len(parse_count) == 2
+    assert len(before) == 2000 and len(after) == 2100
+    assert np.array_equal(after.balls, data.read_draw_store(draws_csv).balls)
+
+# 只有 mtime 變了 (touch)：比對內容雜湊後沿用快取
+def test_touch_reuses_cache(draws_csv, parse_count):
+    data.load_draw_store(draws_csv)
+    stat = os.stat(draws_csv)
+    os.utime(draws_csv, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    touched = data.load_draw_store(draws_csv)
+    assert len(parse_count) == 1
+    assert mapped_generation(touched.balls) is not None
+    data.load_draw_store(draws_csv)
+    assert len(parse_count) == 1
+
+# 解析途中 CSV 被改寫：這次的結果不能寫成新檔案的快取，下次載入要讀到新資料
+def test_change_during_parse_is_not_cached(draws_csv, rewrite_csv, monkeypatch):
+    parse = data.read_draw_store
+
+    def racing(csv_path):
+        store = parse(csv_path)
+        rewrite_csv(csv_path, seed=1, n_draws=2001)
+        return store
+
+    monkeypatch.setattr(data, 'read_draw_store', racing)
+    assert len(data.load_draw_store(draws_csv)) == 2000
+    monkeypatch.setattr(data, 'read_draw_store', parse)
+    assert len(data.load_draw_store(draws_csv)) == 2001
+    assert len(data.load_draw_store(draws_csv)) == 2001
@@ -0,0 +1,69 @@
+import time
+from datetime import datetime
+
+import pytest
+import requests
+
+from lotto539.fetch import create_session, fetch_page, forget_validators, parse_draw_rows, remember_validators
+
+@pytest.fixture
+def session():
+    session = create_session(retries=2, backoff=0)
+    yield session
+    session.close()
+
+def test_parse_draw_rows_skips_menus_and_malformed_rows(draw_page):
+    html = draw_page([
+        ('2025/11/26', '01, 02, 03, 04, 05'),
+        ('2025-11-25', '09，30，36，38，39'),  # 全形逗號
+        ('2025/02/30', '01, 02, 03, 04, 05'),  # 不存在的日期
+        ('2025/11/24', '01, 02, 03, 04'),  # 號碼不足 5 個
+        ('開獎日', '01, 02, 03, 04, 05'),
+    ]).decode('big5')
+    assert parse_draw_rows(html) == [
+        (datetime(2025, 11, 26), ['1', '2', '3', '4', '5']),
+        (datetime(2025, 11, 25), ['9', '30', '36', '38', '39']),
+    ]
+    assert parse_draw_rows('') == []
+
+def test_fetch_page_retries_server_errors(stand_in, session, draw_page):
+    body = draw_page([('2025/11/26', '01, 02, 03, 04, 05')])
+    stand_in.pages['/list'] = [(503, b''), (502, b''), (200, body)]
+    page = fetch_page(stand_in.url('/list'), session=session, conditional=False)
+    assert not page.not_modified
+    assert parse_draw_rows(page.text) == [(datetime(2025, 11, 26), ['1', '2', '3', '4', '5'])]
+    assert len(stand_in.hits) == 3
+
+def test_fetch_page_gives_up_after_retries(stand_in, session):
+    stand_in.pages['/list'] = [(500, b'')]
+    with pytest.raises(requests.RequestException):
+        fetch_page(stand_in.url('/list'), session=session, conditional=False)
+    assert len(stand_in.hits) == 3  # 第一次 + 重試 2 次
+
+# 讀取逾時也會重試，重試用完就放棄，不會卡住等伺服器
+def test_fetch_page_times_out(stand_in):
+    stand_in.pages['/slow'] = b'<html></html>'
+    stand_in.delays['/slow'] = 1.0
+    session = create_session(retries=1, backoff=0)
+    started = time.monotonic()
+    with pytest.raises(requests.RequestException, match='Read timed out'):
+        fetch_page(stand_in.url('/slow'), session=session, timeout=(1, 0.2), conditional=False)
+    assert time.monotonic() - started < 1.0
+    assert len(stand_in.hits) == 2
+    session.close()
+
+def test_fetch_page_conditional_request(stand_in, session, draw_page):
+    url = stand_in.url('/list')
+    stand_in.pages['/list'] = draw_page([('2025/11/26', '01, 02, 03, 04, 05')])
+    forget_validators(url)
+    try:
+        first = fetch_page(url, session=session)
+        assert first.etag and not first.not_modified
+        # 呼叫端確認處理完才記錄驗證標頭，之後內容沒變時伺服器回 304
+        assert not fetch_page(url, session=session).not_modified
+        remember_validators(first)
+        again = fetch_page(url, session=session)
+        assert again.not_modified and again.text is None
+        assert stand_in.hits[-1][1]['If-None-Match'] == first.etag
+    finally:
+        forget_validators(url)
@@ -0,0 +1,55 @@
+import numpy as np
+
+import lotto539.data as data
+from lotto539.memo import MemoCache, _nbytes
+
+def _block(n_bytes, fill=0):
+    return np.full(n_bytes, fill, dtype=np.uint8)
+
+# 每筆都不大，但合計超過位元組上限時淘汰最久沒用的
+def test_evicts_by_total_bytes():
+    memo = MemoCache(maxsize=256, max_bytes=3 * 2**20)
+    for band in range(5):
+        memo.get_or_compute('combo_points', 'v1', band, lambda: _block(2**20, band))
+    assert len(memo) == 3
+    assert memo.nbytes <= 3 * 2**20
+    stats = memo.stats()['combo_points']
+    assert stats['evictions'] == 2 and stats['entries'] == 3
+    assert stats['bytes'] == memo.nbytes
+
+    # 最早的兩筆已淘汰，要重算
+    calls = []
+    memo.get_or_compute('combo_points', 'v1', 0, lambda: calls.append(0) or _block(2**20))
+    assert calls == [0]
+
+def test_recently_used_entry_survives():
+    memo = MemoCache(maxsize=256, max_bytes=2 * 2**20)
+    memo.get_or_compute('a', 'v1', 0, lambda: _block(2**20))
+    memo.get_or_compute('a', 'v1', 1, lambda: _block(2**20))
+    memo.get_or_compute('a', 'v1', 0, lambda: None)  # 命中，移到最新
+    memo.get_or_compute('a', 'v1', 2, lambda: _block(2**20))
+    hit = memo.get_or_compute('a', 'v1', 0, lambda: None)
+    assert hit is not None and memo.stats()['a']['hits'] == 2
+
+# 單筆就超過上限時仍保留最新的一筆
+def test_oversized_entry_is_kept():
+    memo = MemoCache(maxsize=256, max_bytes=2**20)
+    memo.get_or_compute('a', 'v1', 0, lambda: _block(2**19))
+    value = memo.get_or_compute('a', 'v1', 1, lambda: _block(2**21))
+    assert len(memo) == 1 and memo.nbytes == value.nbytes
+
+def test_drop_version_releases_bytes():
+    memo = MemoCache()
+    memo.get_or_compute('a', 'v1', 0, lambda: (_block(1000), _block(2000)))
+    memo.get_or_compute('a', 'v2', 0, lambda: _block(500))
+    assert memo.drop_version('v1') == 1
+    assert memo.nbytes == 500
+    memo.clear()
+    assert memo.nbytes == 0 and len(memo) == 0
+
+# 記憶體映射的快取欄位不算進大小，解出來的陣列照實計算
+def test_mapped_columns_not_counted(draws_csv):
+    data.load_draw_store(draws_csv)
+    store = data.load_draw_store(draws_csv)
+    assert _nbytes(store.balls) == 0
+    assert _nbytes(np.array(store.balls)) == store.balls.nbytes
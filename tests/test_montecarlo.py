@@ -0,0 +1,27 @@
+import numpy as np
+
+import lotto539.montecarlo as montecarlo
+from lotto539.montecarlo import _popcount_bytes, simulate_null
+
+# 舊版 NumPy 用的查表位元數與 np.bitwise_count 結果相同
+def test_popcount_fallback_matches_bitwise_count():
+    rng = np.random.default_rng(0)
+    values = rng.integers(0, 2**63, size=(3, 1000), dtype=np.uint64) | np.uint64(1 << 63)
+    expected = np.array([[bin(int(v)).count('1') for v in row] for row in values], dtype=np.uint8)
+    assert np.array_equal(_popcount_bytes(values), expected)
+    if hasattr(np, 'bitwise_count'):
+        assert np.array_equal(np.bitwise_count(values), expected)
+
+def test_simulate_null_works_without_bitwise_count(monkeypatch):
+    expected = simulate_null(periods=50, trials=200, seed=1, max_workers=1)
+    monkeypatch.setattr(montecarlo, 'popcount', _popcount_bytes)
+    result = simulate_null(periods=50, trials=200, seed=1, max_workers=1)
+    assert expected.keys() == result.keys()
+    assert all(np.array_equal(expected[key], result[key]) for key in expected)
+
+# 分散到 worker (forkserver / spawn 啟動) 的結果與在目前 process 執行相同
+def test_simulate_null_pool_matches_inline():
+    assert len(montecarlo.build_null_tasks(500, 6_000, seed=2)) == 3
+    expected = simulate_null(periods=500, trials=6_000, seed=2, max_workers=1)
+    result = simulate_null(periods=500, trials=6_000, seed=2, max_workers=2)
+    assert all(np.array_equal(expected[key], result[key]) for key in expected)
@@ -0,0 +1,20 @@
+import os
+import sys
+import types
+
+from lotto539.pools import WorkerPool
+
+# Streamlit 把 app.py 登記成 __main__；worker 啟動時不能重跑它
+def test_worker_does_not_rerun_main(tmp_path, monkeypatch):
+    marker = tmp_path / 'ran.txt'
+    script = tmp_path / 'fake_app.py'
+    script.write_text(f"open({str(marker)!r}, 'w').close()\n")
+    fake_main = types.ModuleType('__main__')
+    fake_main.__file__ = str(script)
+    monkeypatch.setitem(sys.modules, '__main__', fake_main)
+
+    with WorkerPool(max_workers=2) as pool:
+        pids = [pool.submit(os.getpid).result() for _ in range(4)]
+    assert os.getpid() not in pids
+    assert not marker.exists()
+    assert sys.modules['__main__'] is fake_main
@@ -0,0 +1,28 @@
+import gc
+import tracemalloc
+
+from lotto539.profiling import Profiler
+
+# tracemalloc 由所有啟用中的 profiler 共用：最後一個結束才關閉，停用的 profiler 不會關掉別人的量測
+def test_tracing_is_shared_between_profilers():
+    assert not tracemalloc.is_tracing()
+    first = Profiler(enabled=True)
+    second = Profiler(enabled=True)
+    Profiler(enabled=False).finish()
+    assert tracemalloc.is_tracing()
+
+    first.finish()
+    first.finish()  # 重複結束不會多扣
+    assert tracemalloc.is_tracing()
+    with second.section("配置"):
+        _ = [0] * 10_000
+    assert second.finish()['sections'][0]['alloc_kb'] > 0
+    assert not tracemalloc.is_tracing()
+
+# 重跑被中斷而沒有 finish() 時，profiler 被回收也會歸還
+def test_unfinished_profiler_releases_tracing_on_collect():
+    profiler = Profiler(enabled=True)
+    assert tracemalloc.is_tracing()
+    del profiler
+    gc.collect()
+    assert not tracemalloc.is_tracing()
@@ -0,0 +1,76 @@
+import threading
+from datetime import date, datetime
+
+import pytest
+
+from lotto539.csvstore import csv_lock
+from lotto539.scheduler import TAIPEI, UpdateScheduler, latest_draw_day, next_poll_time, next_window_start
+
+def at(month, day, hour, minute=0):
+    return datetime(2026, month, day, hour, minute, tzinfo=TAIPEI)
+
+# 2026/10/17 為週六、10/18 週日、10/19 週一
+@pytest.mark.parametrize('now, expected', [
+    (at(10, 18, 12), date(2026, 10, 17)),  # 週日沒有開獎
+    (at(10, 19, 8), date(2026, 10, 17)),  # 週一開獎前，最近一期還是週六
+    (at(10, 19, 20, 45), date(2026, 10, 19)),
+    (at(10, 20, 20, 44), date(2026, 10, 19)),
+])
+def test_latest_draw_day(now, expected):
+    assert latest_draw_day(now) == expected
+
+def test_next_window_start_skips_sunday():
+    assert next_window_start(at(10, 17, 21)) == at(10, 19, 20, 45)
+    assert next_window_start(at(10, 19, 12)) == at(10, 19, 20, 45)
+
+# 資料已跟上：等下一個開獎日的抓取時段
+def test_next_poll_when_up_to_date():
+    assert next_poll_time(at(10, 18, 12), date(2026, 10, 17)) == at(10, 19, 20, 45)
+    assert next_poll_time(at(10, 19, 21), date(2026, 10, 19)) == at(10, 20, 20, 45)
+
+# 資料落後：啟動後立刻抓一次，之後在時段內每 15 分鐘重試，過了時段就等下一個開獎日
+@pytest.mark.parametrize('now, last_poll, expected', [
+    (at(10, 19, 21), None, at(10, 19, 21)),
+    (at(10, 19, 21), at(10, 19, 21), at(10, 19, 21, 15)),
+    (at(10, 19, 22), at(10, 19, 21), at(10, 19, 22)),  # 上次抓取已經很久，立刻再抓
+    (at(10, 19, 23, 20), at(10, 19, 23, 20), at(10, 20, 20, 45)),  # 23:35 超過時段
+    (at(10, 19, 12), at(10, 19, 11), at(10, 19, 20, 45)),  # 時段外不重試
+    (at(10, 18, 21), at(10, 18, 21), at(10, 19, 20, 45)),  # 週日不重試
+])
+def test_next_poll_backs_off_within_window(now, last_poll, expected):
+    assert next_poll_time(now, date(2026, 10, 17), last_poll) == expected
+
+def test_refresh_publishes_new_version(draws_csv):
+    versions = []
+
+    def update(csv_path):
+        with open(csv_path, 'a', encoding='utf-8') as f:
+            f.write('\n')
+        return "🎉 成功更新 1 筆資料"
+
+    scheduler = UpdateScheduler(draws_csv, update=update, on_update=versions.append, auto=False)
+    before = scheduler.version
+    assert "成功" in scheduler.refresh()
+    assert versions == [scheduler.version] and scheduler.version != before
+    assert [s['section'] for s in scheduler.status()['last_profile']['sections']] == ["更新：載入新版本"]
+
+# 其他寫入者 (CLI update、backfill) 持有 CSV 寫入鎖時不搶，也不呼叫 update
+def test_refresh_skips_while_csv_is_locked(draws_csv):
+    calls = []
+    scheduler = UpdateScheduler(draws_csv, update=calls.append, auto=False)
+    holding, done = threading.Event(), threading.Event()
+
+    def writer():
+        with csv_lock(draws_csv):
+            holding.set()
+            done.wait()
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    holding.wait()
+    try:
+        assert scheduler.refresh() == "⏳ 其他程序正在更新"
+    finally:
+        done.set()
+        thread.join()
+    assert calls == []
@@ -0,0 +1,79 @@
+import gc
+import os
+
+import numpy as np
+
+from lotto539.datacache import cache_dir_for
+from lotto539.indexes import build_hit_matrix
+from lotto539.loadtest import run_load_test
+from lotto539.memo import MemoCache
+from lotto539.shared import DatasetRegistry
+
+def _generations(csv_path):
+    return sorted(e.name for e in os.scandir(cache_dir_for(csv_path)) if e.is_dir())
+
+def test_lease_keeps_old_version_until_release(draws_csv, rewrite_csv):
+    memo = MemoCache()
+    registry = DatasetRegistry(draws_csv, on_retire=memo.drop_version)
+    registry.acquire().release()  # 先建好快取，之後的載入都是 memory map
+    old_lease = registry.acquire()
+    old = old_lease.dataset
+    old_balls = np.array(old.store.balls)
+    memo.get_or_compute('skips', old.version, (), lambda: np.zeros(3))
+
+    rewrite_csv(draws_csv, seed=1)
+    new_lease = registry.acquire()
+    new = new_lease.dataset
+    assert new.version != old.version
+    assert registry.current is new
+    assert set(registry.stats()) == {old.version, new.version}
+
+    # 借用中的舊版本不受新版本的快取寫入影響，開獎資料與衍生索引仍然一致
+    assert np.array_equal(old.store.balls, old_balls)
+    assert np.array_equal(build_hit_matrix(old.store.balls), old.hits)
+    assert not np.array_equal(new.store.balls, old_balls)
+    assert len(_generations(draws_csv)) == 2
+
+    # 最後一個借用者歸還後才退休：記憶化結果與快取檔一起清掉
+    old_lease.release()
+    old_lease.release()  # 重複歸還不會多扣
+    assert set(registry.stats()) == {new.version}
+    assert registry.stats()[new.version]['refs'] == 1
+    assert len(memo) == 0
+    assert _generations(draws_csv) == [new.cache_generation]
+    new_lease.release()
+    assert registry.stats()[new.version]['refs'] == 0
+
+def test_lease_is_released_when_collected(draws_csv, rewrite_csv):
+    retired = []
+    registry = DatasetRegistry(draws_csv, on_retire=retired.append)
+    lease = registry.acquire()
+    old_version = lease.dataset.version
+    rewrite_csv(draws_csv, seed=2)
+    registry.refresh()
+    assert retired == []
+
+    del lease
+    gc.collect()
+    assert retired == [old_version]
+    assert list(registry.stats()) == [registry.current.version]
+
+def test_publish_without_leases_retires_immediately(draws_csv, rewrite_csv):
+    retired = []
+    registry = DatasetRegistry(draws_csv, on_retire=retired.append)
+    first = registry.refresh()
+    rewrite_csv(draws_csv, seed=3)
+    second = registry.refresh()
+    assert retired == [first.version]
+    assert list(registry.stats()) == [second.version]
+
+# 共用模式下保留的記憶體只跟分析參數的組合數有關，不隨連線數成長；更新過後只剩一個版本
+def test_shared_sessions_memory_stays_flat(draws_csv):
+    few = run_load_test(draws_csv, 5, 'shared', reruns=3, threads=2, updates=1)
+    many = run_load_test(draws_csv, 60, 'shared', reruns=3, threads=2, updates=1)
+    private = run_load_test(draws_csv, 5, 'private', reruns=2, threads=2)
+
+    assert few['live_versions'] == 1
+    assert many['live_versions'] == 1
+    assert many['retained_mb'] < few['retained_mb'] * 4
+    assert many['per_session_kb'] * 10 < private['per_session_kb']
@@ -0,0 +1,45 @@
+import numpy as np
+
+import lotto539.sweep as sweep
+from lotto539.indexes import calc_transition_matrix
+from lotto539.pools import pool_context
+from lotto539.scoring import calc_friend_history, recommend_numbers
+
+def _random_hits(n_draws, seed=0):
+    rng = np.random.default_rng(seed)
+    hits = np.zeros((n_draws, 40), dtype=bool)
+    for row in hits:
+        row[rng.choice(np.arange(1, 40), 5, replace=False)] = True
+    return hits
+
+# 掃描的「參考期數」與 app 電腦推薦的「拖牌統計期數」算出同樣的拖牌次數
+def test_sweep_lookback_matches_live_window():
+    hits = _random_hits(400)
+    target = len(hits) - 1
+    history = hits[:target]
+    for window in (10, 30, None):
+        expected = calc_friend_history(hits, np.array([target]), window)[0]
+        rows = history if window is None else history[-(window + 1):]
+        live = calc_transition_matrix(rows, 1)[np.flatnonzero(history[-1])].sum(axis=0)
+        assert np.array_equal(expected, live)
+
+def test_recommend_uses_miss_range():
+    hits = _random_hits(200)
+    skips = np.arange(40)
+    transition = np.zeros((40, 40), dtype=np.int64)
+    picks, _ = recommend_numbers(hits, skips, 0.0, 1.0, miss_range=(20, 24), transition=transition)
+    assert picks == [20, 21, 22, 23, 24]
+
+# worker 不以 fork 啟動；pool 跑出的結果與在目前 process 直接跑相同
+def test_sweep_pool_matches_inline():
+    assert pool_context().get_start_method() != 'fork'
+    hits = _random_hits(300, seed=1)
+    tasks = sweep.build_sweep_tasks([0.8, 1.2], [0.3], [20, 50], [(5, 12)], ["🔥 追熱門牌"])
+    pooled = []
+    for _, _, rows in sweep.iter_param_sweep(hits, tasks, periods=100, max_workers=1):
+        pooled.extend(rows)
+
+    sweep._init_worker(hits, 100)
+    inline = [row for task in tasks for row in sweep._run_task(task)]
+    key = lambda row: (row['策略'], row['參考期數'], str(row['好朋友權重']))
+    assert sorted(pooled, key=key) == sorted(inline, key=key)